@@ -73,170 +73,250 @@ edition, 1988.
 '''
 
 import math
-from PIL import Image, ImageTk
-import Tkinter
-import tkFileDialog
-import tkMessageBox
+
+import fractal
+import Queue
+
+#imported when the window is first opened (see fractal/lazy.py), so that
+#the render functions can be imported and used headless
+Image = fractal.lazyImport('PIL.Image')
+ImageTk = fractal.lazyImport('PIL.ImageTk')
+Tkinter = fractal.lazyImport('Tkinter')
+tkFileDialog = fractal.lazyImport('tkFileDialog')
+tkMessageBox = fractal.lazyImport('tkMessageBox')
+
+#iteration counts of the tiles rendered so far, so that pressing a button
+#again with the same parameters (or returning to earlier ones) only computes
+#tiles which are not already known. Tiles of 200 x 200 divide the 800 x 600
+#window exactly; they are also the steps at which a render job can be
+#cancelled.
+tileCache = fractal.TileCache(tileSize=200)
+
+#render requests go through a RenderJobs queue which fills tileCache on a
+#background thread; a new request cancels the one in progress at its next
+#tile. Only the pixels an update changed (job.dirty) are colored, on the
+#render thread, and handed over through renderQueue, since Tk may only be
+#used from the main thread.
+renderQueue = Queue.Queue()
+
+def queueUpdate(job):
+    left, top, right, bottom = job.dirty
+    image = job.frame.crop(left, top, right - left, bottom - top).image()
+    renderQueue.put((job, job.progress, (left, top), image))
+
+renderJobs = fractal.RenderJobs(tileCache, onUpdate=queueUpdate)
+
+#the view on screen: its viewport, fractal kind and Julia constant, and its
+#counts once they are all exact (None while a render job is filling them in)
+viewport = fractal.Viewport(800, 600)
+viewKind = 'mandelbrot'
+viewC = (0.0, 0.0)
+viewFrame = None
+
+#last pointer position of a drag, and the corner and canvas item of a
+#rubber band
+dragLast = None
+bandStart = None
+bandItem = None
 
 def mandelbrotImageIterate():
     #function to test values of c = a + i*b for inclusion in Mandelbrot set
-    global fracImage
-
-    fracImageWidth = 800
-    fracImageHeight = 600
-
-    fracImage = Image.new("RGB", (fracImageWidth, fracImageHeight))
-
-    for m in range(800):
-        a_system = m
-        a = -1.5 + a_system/200.00
-        #transforms m to a value in the complex plane with the origin placed
-        #somewhat ofset from the center of the window, to provide a good image
-        #of the set
-
-        for n in range(600):
-            b_system = n
-            b = 1.5 - b_system/200.00
-            #transforms n to a value in the complex plane
-            x = 0.0
-            y = 0.0
-            mzsq = 0.00
-            counter = 0
-
-            while (counter <= 20):
-                #loop to iterate function z = z*z - c
-                x_new = x*x - y*y - a
-                y_new = 2.00*x*y - b
-                #calculate square of the modulus of z
-                mzsq = x_new*x_new + y_new*y_new
-
-                #series of tests to determine if c is a member of he Mandelbrot
-                #set and to color the screen pixels according to whether or not
-                #the value of c is included in the set, and how many iterations
-                #have been performed
-
-                """if(mzsq>4.0 and 0 <= counter <= 20):
-                    fracImage.putpixel ( (m, n)
-
-                elif(mzsq<=4.0):
-                    fracImage.putpixel ( (m, n), (0, 0, 0))"""
-
 
-                if(mzsq>4.0 and 0 <= counter <= 13):
-                    fracImage.putpixel ( (m, n), (25, 15, 105))
-                    """tkCanvas.create_line (m, n, m, n,
-                    fill=("#%02x%02x%02x" % (25, 15, 105)))"""
-
-                elif(mzsq>4.0 and 14 <= counter <= 15):
-                    fracImage.putpixel ( (m, n), (45, 20, 160))
-                elif(mzsq>4.0 and 16 <= counter <= 17):
-                    fracImage.putpixel ( (m, n), (65, 25, 180))
-
-                elif(mzsq>4.0 and 18 <= counter <= 20):
-                    fracImage.putpixel ( (m, n), (75, 30, 235))
-
-
-                elif(mzsq<=4.0):
-                    fracImage.putpixel ( (m, n), (0, 0, 0))
-
-                x = x_new
-                y = y_new
-                counter = counter + 1
-
-    imageDisplay()
+    #the whole window is iterated by the fractal engine: m runs across the 800
+    #columns with a = -1.5 + m/200.00, n down the 600 rows with
+    #b = 1.5 - n/200.00, and each pixel is colored by the iteration at which
+    #the square modulus of z first exceeded 4.0 (see fractal/kernels.py)
+    startRender('mandelbrot', (0.0, 0.0))
 
 
 def juliaImageIterate():
-    #function to test values of c = a + i*b for inclusion in Mandelbrot set
-    global fracImage
-
-    fracImageWidth = 800
-    fracImageHeight = 600
-
-    fracImage = Image.new("RGB", (fracImageWidth, fracImageHeight))
-
+    #function to test values of z = a + i*b for inclusion in the Julia set
+    #for c = c1 + i*c2
     c1 = float(c1Entry.get())
     c2 = float(c2Entry.get())
 
-    for m in range(800):
-        a_system = m
-        a = -1.5 + a_system/200.00
-        #transforms m to a value in the complex plane with the origin placed
-        #somewhat ofset from the center of the window, to provide a good image
-        #of the set
-
-        for n in range(600):
-            b_system = n
-            b = 1.5 - b_system/200.00
-            #transforms n to a value in the complex plane
-            x = a
-            y = b
-            mzsq = 0.00
-            counter = 0
-
-            while (counter <= 20):
-                #loop to iterate function z = z*z - c
-                x_new = x*x - y*y - c1
-                y_new = 2.00*x*y - c2
-                #calculate square of the modulus of z
-                mzsq = x_new*x_new + y_new*y_new
-
-                #series of tests to determine if c is a member of he Julia
-                #set and to color the screen pixels according to whether or not
-                #the value of c is included in the set, and how many iterations
-                #have been performed
-
-                """if(mzsq>4.0 and 0 <= counter <= 20):
-                    fracImage.putpixel ( (m, n), (25, 15, 105))
-
-                elif(mzsq<=4.0):
-                    fracImage.putpixel ( (m, n), (0, 0, 0))"""
-
-
-                if(mzsq>4.0 and 0 <= counter <= 13):
-                    fracImage.putpixel ( (m, n), (25, 15, 105))
-                    """tkCanvas.create_line (m, n, m, n,
-                    fill=("#%02x%02x%02x" % (25, 15, 105)))"""
-
-                elif(mzsq>4.0 and 14 <= counter <= 15):
-                    fracImage.putpixel ( (m, n), (45, 20, 160))
-
-                elif(mzsq>4.0 and 16 <= counter <= 17):
-                    fracImage.putpixel ( (m, n), (65, 25, 180))
-
-                elif(mzsq>4.0 and 18 <= counter <= 20):
-                    fracImage.putpixel ( (m, n), (75, 30, 235))
-
-
-                elif(mzsq<=4.0):
-                    fracImage.putpixel ( (m, n), (0, 0, 0))
+    startRender('julia', (c1, c2))
 
-                x = x_new
-                y = y_new
-                counter = counter + 1
 
-    imageDisplay()
+def startRender(kind, c):
+    #render kind in the default window
+    global viewKind
+    global viewC
 
-
-def imageDisplay():
+    fracImageWidth = 800
+    fracImageHeight = 600
+    viewKind = kind
+    viewC = c
+    showView(fractal.Viewport(fracImageWidth, fracImageHeight), reuse=False)
+
+
+def showView(newViewport, reuse=True):
+    #move to newViewport. When it lines up with the exact counts on screen
+    #(a pan, or a zoom by a power of two) the counts are reused and only the
+    #pixels which do not line up are computed, at once; otherwise (a
+    #rubber-band zoom, or no exact counts yet) a render job is submitted,
+    #superseding any job still running: a 1/16 resolution preview appears at
+    #once and exact tiles replace it (straight from the tile cache when they
+    #are there) while the window stays live
+    global viewport
+    global viewFrame
+
+    if (reuse and viewFrame is not None and fractal.kernels.numpy is not None
+            and fractal.linesUp(viewFrame, newViewport)):
+        viewFrame = fractal.reuseFrame(viewFrame, newViewport)
+        imageDisplay(viewFrame.image())
+    else:
+        renderJobs.submit(newViewport, viewKind, viewC)
+        viewFrame = None
+    viewport = newViewport
+
+
+def keepView():
+    #cache the tiles of counts computed by panning and zooming, so that
+    #coming back to them later costs nothing
+    if viewFrame is not None:
+        tileCache.storeFrame(viewFrame)
+
+
+def dragStart(event):
+    global dragLast
+    dragLast = (event.x, event.y)
+
+def dragMove(event):
+    #pan so that the point under the pointer follows it
+    global dragLast
+    if dragLast is None:
+        return
+    dm = dragLast[0] - event.x
+    dn = dragLast[1] - event.y
+    dragLast = (event.x, event.y)
+    if dm or dn:
+        showView(fractal.panViewport(viewport, dm, dn))
+
+def dragEnd(event):
+    global dragLast
+    dragMove(event)
+    dragLast = None
+    keepView()
+
+
+def wheelZoom(event):
+    #zoom in or out by 2 about the pointer; Linux reports the wheel as
+    #buttons 4 and 5, other systems as MouseWheel events with a delta
+    if event.num == 4 or getattr(event, 'delta', 0) > 0:
+        zoom = 2.0
+    else:
+        zoom = 0.5
+    showView(fractal.zoomViewport(viewport, event.x, event.y, zoom))
+    keepView()
+
+
+def bandStartEvent(event):
+    global bandStart
+    global bandItem
+    global dragLast
+    dragLast = None
+    bandStart = (event.x, event.y)
+    bandItem = tkCanvas.create_rectangle(event.x, event.y, event.x, event.y,
+                                         outline='white', dash=(4, 4))
+
+def bandMove(event):
+    if bandItem is None:
+        return
+    tkCanvas.coords(bandItem, bandStart[0], bandStart[1], event.x, event.y)
+
+def bandEnd(event):
+    #zoom so that the rubber band fills the window; tiny bands are ignored
+    global bandItem
+    if bandItem is None:
+        return
+    tkCanvas.delete(bandItem)
+    bandItem = None
+    bandWidth = abs(event.x - bandStart[0])
+    bandHeight = abs(event.y - bandStart[1])
+    if bandWidth < 4 or bandHeight < 4:
+        return
+    zoom = min(viewport.width/float(bandWidth),
+               viewport.height/float(bandHeight))
+    centerM = (event.x + bandStart[0])/2.0
+    centerN = (event.y + bandStart[1])/2.0
+    showView(fractal.Viewport(viewport.width, viewport.height, viewport.left,
+             viewport.top, viewport.scale*zoom,
+             int(round((viewport.mOffset + centerM)*zoom
+                       - viewport.width/2.0)),
+             int(round((viewport.nOffset + centerN)*zoom
+                       - viewport.height/2.0))))
+
+
+def pollRender():
+    #paste the updates of the current job finished since the last poll, then
+    #poll again shortly; updates of superseded jobs are dropped
+    global tkRoot
+    global viewFrame
+
+    progress = None
+    while True:
+        try:
+            job, progress, corner, image = renderQueue.get_nowait()
+        except Queue.Empty:
+            break
+        if renderJobs.isCurrent(job):
+            imageDisplay(image, corner)
+            if progress == 1.0:
+                viewFrame = job.frame
+        else:
+            progress = None
+    if progress is not None:
+        if progress < 1.0:
+            tkRoot.title('fractal 1.0.1 - rendering %.0f%%' % (100*progress))
+        else:
+            tkRoot.title('fractal 1.0.1')
+
+    tkRoot.after(20, pollRender)
+
+
+class CanvasImage(object):
+    #the one PhotoImage and canvas item showing fracImage for the life of
+    #the window. paste() copies only the rectangle which changed into both,
+    #so a tile costs a tile's worth of Tk work and nothing piles up on the
+    #canvas however many renders are shown.
+
+    def __init__(self, canvas, width, height):
+        self.photo = ImageTk.PhotoImage('RGB', (width, height))
+        self.item = canvas.create_image(0, 0, image=self.photo, anchor='nw')
+        self.size = (width, height)
+
+    def paste(self, image, corner=(0, 0)):
+        if corner == (0, 0) and image.size == self.size:
+            self.photo.paste(image)
+            return
+        #PhotoImage.paste() always writes at the top left corner, so the
+        #rectangle goes through a photo of its own size and Tk's copy -to
+        patch = ImageTk.PhotoImage(image)
+        self.photo.tk.call(str(self.photo), 'copy', str(patch), '-to',
+                           corner[0], corner[1])
+
+    def clear(self):
+        self.photo.tk.call(str(self.photo), 'blank')
+
+
+def imageDisplay(image, corner=(0, 0)):
+    #show image with its top left corner at corner, keeping fracImage (the
+    #picture saved by Save) up to date
     global fracImage
-    global tkCanvas
 
-    img = ImageTk.PhotoImage(fracImage)
-    tkCanvas.create_image(400, 300, image=img)
-    tkCanvas.image = img
+    with fractal.instrument.stage('display'):
+        fracImage.paste(image, corner)
+        canvasImage.paste(image, corner)
 
 def openImage():
-    global fracImage
-    global tkCanvas
-
     filename=tkFileDialog.askopenfilename(title='Open File',
     defaultextension='.bmp', filetypes=(("BMP", "*.bmp"),("PNG", "*.png"),
     ("JPEG", "*.jpg"), ("All Files", "*.*")))
 
-    img = ImageTk.PhotoImage(file=filename)
-    tkCanvas.create_image(400, 300, image=img)
-    tkCanvas.image = img
+    #cropped (or padded with black) to the canvas
+    image = Image.open(filename).convert('RGB')
+    imageDisplay(image.crop((0, 0) + fracImage.size))
 
 def saveImage():
     global fracImage
@@ -244,17 +324,36 @@ def saveImage():
     filename = tkFileDialog.asksaveasfilename(title='Save to File',
     defaultextension='.bmp', filetypes=(("BMP", "*.bmp"),("PNG", "*.png"),
     ("JPEG", "*.jpg"), ("All Files", "*.*")))
-    fracImage.save(filename)
+    with fractal.instrument.stage('save'):
+        fracImage.save(filename)
 
 def clearImage():
-    global tkCanvas
+    #blank the canvas and the picture Save writes, so a save after Clear
+    #does not bring the old render back
+    global fracImage
 
-    tkCanvas.delete('all')
+    canvasImage.clear()
+    fracImage = Image.new('RGB', fracImage.size)
 
 def infoBox():
     tkMessageBox.showinfo('About fractal 1.0.1',
     'Python fractal generating script\n\nfoustja@gmail.com\n2016')
 
+def cacheBox():
+    stats = tileCache.stats()
+    tkMessageBox.showinfo('Tile Cache',
+    'tiles held: %d\nmemory: %.1f of %.1f MB\nhits: %d\nmisses: %d\n'
+    'evictions: %d\nhit rate: %.0f%%' % (stats['tiles'],
+    stats['bytes']/1048576.0, stats['maxBytes']/1048576.0, stats['hits'],
+    stats['misses'], stats['evictions'], 100*stats['hitRate']))
+
+def timingsBox():
+    if not fractal.instrument.enabled():
+        tkMessageBox.showinfo('Render Timings',
+        'Timings are off. Start with FRACTAL_PROFILE=1 to record them.')
+        return
+    tkMessageBox.showinfo('Render Timings', fractal.instrument.formatSnapshot())
+
 def textBox():
     global tkRoot
 
@@ -317,6 +416,8 @@ def displayTkWindow():
     #function to display results of Mandelbrot in a simple Tk window
     global tkRoot
     global tkCanvas
+    global canvasImage
+    global fracImage
     global c1Entry
     global c2Entry
 
@@ -331,6 +432,20 @@ def displayTkWindow():
     tkCanvas = Tkinter.Canvas(tkRoot, width=tkCanvas_width,
     height=tkCanvas_height)
     tkCanvas.pack()
+    canvasImage = CanvasImage(tkCanvas, tkCanvas_width, tkCanvas_height)
+
+    #drag to pan, turn the wheel to zoom by 2, shift-drag a rubber band to
+    #zoom into it
+    tkCanvas.bind('<ButtonPress-1>', dragStart)
+    tkCanvas.bind('<B1-Motion>', dragMove)
+    tkCanvas.bind('<ButtonRelease-1>', dragEnd)
+    tkCanvas.bind('<Shift-ButtonPress-1>', bandStartEvent)
+    tkCanvas.bind('<Shift-B1-Motion>', bandMove)
+    tkCanvas.bind('<Shift-ButtonRelease-1>', bandEnd)
+    tkCanvas.bind('<Button-4>', wheelZoom)
+    tkCanvas.bind('<Button-5>', wheelZoom)
+    tkCanvas.bind('<MouseWheel>', wheelZoom)
+    fracImage = Image.new('RGB', (tkCanvas_width, tkCanvas_height))
 
     tkFrame = Tkinter.Frame(tkRoot)
     tkFrame.pack(side=Tkinter.LEFT)
@@ -383,11 +498,14 @@ def displayTkWindow():
     filemenu2 = Tkinter.Menu(menubar, tearoff=0)
     filemenu2.add_command(label='About fractal 1.0.1', command=infoBox)
     filemenu2.add_command(label='Information and Reference', command=textBox)
+    filemenu2.add_command(label='Tile Cache', command=cacheBox)
+    filemenu2.add_command(label='Render Timings', command=timingsBox)
 
     menubar.add_cascade(label='File', menu=filemenu)
     menubar.add_cascade(label='About', menu=filemenu2)
     tkRoot.config(menu=menubar)
 
+    tkRoot.after(20, pollRender)
 
     Tkinter.mainloop()
 
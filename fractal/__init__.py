@@ -0,0 +1,45 @@
+#fractal
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Shared escape-time engine for frac1.py, mandelbrot.py, mandel2.py, mandel3.py
+and mandel_music.py.
+
+from fractal import Viewport, renderImage
+
+image = renderImage(Viewport(800, 600), 'julia', c=(0.8, 0.12))
+'''
+
+from . import instrument
+from .lazy import lazyImport
+from .viewport import Viewport
+from .palette import (BANDS, INTERIOR, GRADIENT, bandColor, colorTable,
+                      BandPalette, GradientPalette)
+from .kernels import KINDS, numpyCounts, pythonCounts, putpixelImage
+from .render import Frame, computeFrame, renderImage
+from .deepzoom import deepZoomCounts, deepZoomFrame
+from .cache import TileCache
+from .progressive import ProgressiveRender, progressivePasses
+from .jobs import RenderJob, RenderJobs, JobCancelled
+from .navigate import (panViewport, zoomViewport, linesUp, reuseFrame,
+                       panFrame, zoomFrame)
+from .mariani import marianiCounts
+from .symmetry import symmetricCounts
+from .stream import streamImage, streamFrame
+from .store import saveFrame, renderToFile, loadFrame
+from .music import NoteSequence, noteSequence, Player
+
+
+def __getattr__(name):
+    #parallelCounts and scheduledRender import parallel.py and schedule.py
+    #(and with them concurrent.futures and multiprocessing) on first use
+    #only, so that a headless import stays quick (Python 3.7+; both need
+    #Python 3 in any case)
+    if name == 'parallelCounts':
+        from .parallel import parallelCounts
+        return parallelCounts
+    if name == 'scheduledRender':
+        from .schedule import scheduledRender
+        return scheduledRender
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
@@ -0,0 +1,13 @@
+#__main__.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+python -m fractal: the headless batch renderer of cli.py.
+'''
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,302 @@
+#animate.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Zoom animations.
+
+zoomPath() interpolates between a start and an end viewport of the same size.
+The scale grows geometrically, so every frame zooms in by the same factor,
+and the center moves along the line between the two centers so that one
+point stays put on the screen, as it would for a single continuous zoom.
+That point is the fixed point of the zoom taking the first view onto the
+last, (s1*E - s0*S)/(s1 - s0) for centers S and E at scales s0 and s1: not
+the center E of the last frame, though close to it when s1 is much larger
+than s0.
+
+renderAnimation() renders the frames and writes them either as a numbered
+PNG sequence (a path containing a % format, e.g. 'zoom/frame%04d.png') or as
+one animated GIF or PNG (APNG) through PIL. Frames are independent, so they
+are rendered in parallel, one per worker process of the parallel.py pool
+(each with a single-process backend such as numpy).
+
+preview=True trades accuracy for speed. Only every keyEvery-th frame is
+computed in full; each frame in between is resampled from the last of those
+keyframes (the nearest keyframe pixel for each new pixel, with its
+magnitude for a smooth palette), and only the pixels the keyframe does not
+cover are computed. The result is a little blocky while zooming in, which is
+what a preview is for. The report returned gives the pixels reused.
+
+python -m fractal.animate --from 0.5,0,4 --to 0.745,-0.113,0.02 \\
+    --frames 120 --maxiter 200 -o zoom/frame%04d.png
+
+The report also gives the throughput in frames per minute.
+'''
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+from . import kernels
+from .render import Frame, computeFrame
+from .viewport import Viewport
+
+#frames between fully computed keyframes of a preview
+KEY_EVERY = 8
+
+#delay between the frames of an animated GIF or PNG, in milliseconds
+FRAME_DURATION = 40
+
+
+def zoomPath(start, end, frames):
+    #list of frames viewports from start to end (inclusive)
+    if start.width != end.width or start.height != end.height:
+        raise ValueError('start and end viewports must be the same size')
+    if frames < 1:
+        raise ValueError('an animation needs at least one frame')
+    width = start.width
+    height = start.height
+    startA = start.aValue(width/2.0)
+    startB = start.bValue(height/2.0)
+    endA = end.aValue(width/2.0)
+    endB = end.bValue(height/2.0)
+    viewports = []
+    for frame in range(frames):
+        t = frame/float(frames - 1) if frames > 1 else 0.0
+        scale = start.scale*(end.scale/start.scale)**t
+        if start.scale == end.scale:
+            share = t
+        else:
+            #share of the way along which keeps the zoom's fixed point still
+            share = ((1.0/start.scale - 1.0/scale)
+                     / (1.0/start.scale - 1.0/end.scale))
+        viewports.append(Viewport(width, height,
+                                  startA + (endA - startA)*share
+                                  - (width/2.0)/scale,
+                                  startB + (endB - startB)*share
+                                  + (height/2.0)/scale,
+                                  scale))
+    return viewports
+
+
+def resampleFrame(source, viewport, magnitudes=False, **options):
+    #Frame of viewport taking each pixel from the nearest pixel of the source
+    #frame, and computing the pixels which fall outside it with the numpy
+    #kernel; stats['reusedPixels'] counts the pixels taken over.
+    #magnitudes=True resamples the source's magnitudes too, for smooth
+    #coloring.
+    numpy = kernels.numpy
+    if numpy is None:
+        raise ImportError('preview resampling requires NumPy')
+    if magnitudes and source.magnitudes is None:
+        raise ValueError('the source frame has no magnitudes to resample')
+    old = source.viewport
+    columns = numpy.arange(viewport.width)
+    rows = numpy.arange(viewport.height)
+    a = viewport.left + (viewport.mOffset + columns)/viewport.scale
+    b = viewport.top - (viewport.nOffset + rows)/viewport.scale
+    oldColumns = numpy.rint((a - old.left)*old.scale - old.mOffset
+                            ).astype(numpy.intp)
+    oldRows = numpy.rint((old.top - b)*old.scale - old.nOffset
+                         ).astype(numpy.intp)
+    columnInside = (oldColumns >= 0) & (oldColumns < old.width)
+    rowInside = (oldRows >= 0) & (oldRows < old.height)
+
+    nearest = (numpy.clip(oldRows, 0, old.height - 1)[:, None],
+               numpy.clip(oldColumns, 0, old.width - 1)[None, :])
+    oldCounts = numpy.asarray(source.counts).reshape(old.height, old.width)
+    counts = oldCounts[nearest].astype(numpy.int32)
+    mzsq = None
+    if magnitudes:
+        mzsq = numpy.asarray(source.magnitudes).reshape(old.height,
+                                                        old.width)[nearest]
+    missing = ~(rowInside[:, None] & columnInside[None, :])
+    stats = {}
+    if missing.any():
+        missingRows, missingColumns = numpy.nonzero(missing)
+        missingMagnitudes = None
+        if magnitudes:
+            missingMagnitudes = numpy.empty(len(missingRows))
+        counts[missingRows, missingColumns] = kernels.numpyPixelCounts(
+            viewport, missingColumns, missingRows, source.kind, source.c[0],
+            source.c[1], source.maxiter, stats=stats,
+            magnitudes=missingMagnitudes, **options)
+        if magnitudes:
+            mzsq[missingRows, missingColumns] = missingMagnitudes
+    stats['reusedPixels'] = viewport.pixels - int(numpy.count_nonzero(missing))
+    return Frame(counts, viewport, source.maxiter, source.kind, source.c,
+                 stats, mzsq)
+
+
+def _renderFrame(viewport, kind, c, maxiter, backend, palette, path, options):
+    #render one frame in a worker; saves it to path if given, otherwise
+    #returns the image
+    start = time.time()
+    image = computeFrame(viewport, kind, c, maxiter, backend,
+                         **options).image(palette)
+    if path is not None:
+        image.save(path)
+        image = None
+    return image, time.time() - start
+
+
+def _framePath(path, number):
+    if '%' in path:
+        return path % number
+    return None
+
+
+def renderAnimation(path, start, end, frames, kind='mandelbrot', c=(0.0, 0.0),
+                    maxiter=20, backend=None, workers=None, preview=False,
+                    keyEvery=KEY_EVERY, palette=None, duration=FRAME_DURATION,
+                    onFrame=None, **options):
+    #render a zoom from start to end into path (a numbered PNG pattern, or a
+    #.gif or .png for an animated image); onFrame(number, seconds) is called
+    #as frames finish. Returns a report of the time and throughput.
+    viewports = zoomPath(start, end, frames)
+    numbered = '%' in path
+    if not numbered:
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in ('.gif', '.png'):
+            raise ValueError('%s: use a .gif or .png file, or a numbered '
+                             'pattern such as frame%%04d.png' % (path,))
+    if palette is not None and palette.smooth:
+        options['magnitudes'] = True
+    images = [None]*frames
+    reused = 0
+    begin = time.time()
+
+    if preview:
+        key = None
+        for number, viewport in enumerate(viewports):
+            frameStart = time.time()
+            if number % keyEvery == 0:
+                key = computeFrame(viewport, kind, c, maxiter, backend,
+                                   **options)
+                frame = key
+            else:
+                frame = resampleFrame(key, viewport, **options)
+                reused = reused + frame.stats['reusedPixels']
+            image = frame.image(palette)
+            if numbered:
+                image.save(_framePath(path, number))
+            else:
+                images[number] = image
+            if onFrame is not None:
+                onFrame(number, time.time() - frameStart)
+    else:
+        try:
+            from . import parallel
+        except ImportError:
+            parallel = None
+        workers = parallel.workerCount(workers) if parallel else 1
+        if workers == 1:
+            for number, viewport in enumerate(viewports):
+                image, seconds = _renderFrame(viewport, kind, c, maxiter,
+                                              backend, palette,
+                                              _framePath(path, number),
+                                              options)
+                images[number] = image
+                if onFrame is not None:
+                    onFrame(number, seconds)
+        else:
+            pool = parallel.getPool(workers)
+            futures = [pool.submit(_renderFrame, viewport, kind, c, maxiter,
+                                   backend, palette, _framePath(path, number),
+                                   options)
+                       for number, viewport in enumerate(viewports)]
+            for number, future in enumerate(futures):
+                images[number], seconds = future.result()
+                if onFrame is not None:
+                    onFrame(number, seconds)
+
+    if not numbered:
+        images[0].save(path, save_all=True, append_images=images[1:],
+                       duration=duration, loop=0)
+    seconds = time.time() - begin
+    return {'frames': frames,
+            'seconds': seconds,
+            'framesPerMinute': 60.0*frames/seconds if seconds else 0.0,
+            'reusedPixels': reused,
+            'preview': preview}
+
+
+def _centered(text):
+    try:
+        centerA, centerB, span = [float(value) for value in text.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected A,B,SPAN, not %r' % (text,))
+    if not span > 0:
+        raise argparse.ArgumentTypeError('SPAN must be positive, not %r'
+                                         % (text,))
+    return centerA, centerB, span
+
+
+def main(argv=None):
+    from .cli import parseSize
+
+    parser = argparse.ArgumentParser(
+        prog='python -m fractal.animate',
+        description='Render a zoom between two views as an image sequence or '
+                    'an animated GIF or PNG.')
+    parser.add_argument('-o', '--output', default='zoom%04d.png',
+                        help='numbered pattern, or a .gif or .png for an '
+                             'animated image (default: %(default)s)')
+    parser.add_argument('--from', dest='start', type=_centered,
+                        default=(0.5, 0.0, 4.0),
+                        help='center a, center b and width of the first '
+                             'view (default: 0.5,0,4, the default window)')
+    parser.add_argument('--to', dest='end', type=_centered,
+                        default=(0.745, -0.113, 0.02),
+                        help='center a, center b and width of the last view')
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--size', type=parseSize, default=(800, 600))
+    parser.add_argument('--kind', choices=kernels.KINDS, default='mandelbrot')
+    parser.add_argument('--c1', type=float, default=0.0)
+    parser.add_argument('--c2', type=float, default=0.0)
+    parser.add_argument('--maxiter', type=int, default=100)
+    parser.add_argument('--backend', default=None,
+                        help='single-process backend used for each frame')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='frames rendered at once (default: CPUs)')
+    parser.add_argument('--preview', action='store_true',
+                        help='resample frames between keyframes')
+    parser.add_argument('--duration', type=int, default=FRAME_DURATION,
+                        help='milliseconds per frame of an animated image')
+    arguments = parser.parse_args(argv)
+    #checked before the output directory is created
+    if arguments.frames < 1:
+        parser.error('--frames must be at least 1')
+
+    width, height = arguments.size
+    start = Viewport.centered(*arguments.start, width=width, height=height)
+    end = Viewport.centered(*arguments.end, width=width, height=height)
+    directory = os.path.dirname(arguments.output)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    def progress(number, seconds):
+        print('frame %d/%d %.3f s' % (number + 1, arguments.frames, seconds))
+
+    try:
+        report = renderAnimation(arguments.output, start, end, arguments.frames,
+                                 arguments.kind, (arguments.c1, arguments.c2),
+                                 arguments.maxiter, arguments.backend,
+                                 arguments.workers, arguments.preview,
+                                 duration=arguments.duration,
+                                 onFrame=progress)
+    except (ValueError, ImportError) as error:
+        print('error: %s' % (error,), file=sys.stderr)
+        return 2
+    print('%d frames in %.2f s, %.1f frames/minute'
+          % (report['frames'], report['seconds'], report['framesPerMinute']))
+    if report['preview']:
+        print('%d pixels reused from keyframes' % report['reusedPixels'])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
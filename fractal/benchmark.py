@@ -0,0 +1,304 @@
+#benchmark.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Benchmarks for every backend.
+
+Times each registered backend (the numpy and python kernels, putpixel,
+parallel, scheduled, mariani and any registered later) over a matrix of
+resolutions, iteration limits and views:
+
+default    the 800 x 600 window of frac1.py, scaled to the resolution
+boundary   a zoom into the boundary near a = 0.745, b = -0.113 (the
+           "seahorse valley"), where most pixels take many iterations
+julia      the Julia set for c1 = 0.8, c2 = 0.12 over the default window
+
+Every case is rendered `repeat` times and the best time is kept. Throughput
+is given in Mpix/s and in iterations/s, where the iterations are those a
+first-escape loop needs for the frame, so the figure is the same work for
+every backend and backends which skip work (cardioid test, Mariani fills)
+show up as faster.
+
+python -m fractal.benchmark -o results.json
+python -m fractal.benchmark --baseline results.json
+
+With --baseline, each case is compared with the same case of an earlier run
+and reported as a regression when its Mpix/s has dropped by more than
+--tolerance (10% by default); the exit status is then 1.
+
+Every run also measures the time a fresh interpreter takes to import the
+package (the best of IMPORT_REPEAT runs) and lists any GUI, audio or process
+pool modules the import loaded; there should be none, so that worker
+processes and command-line renders start quickly. --import-time measures
+only that.
+
+The python and putpixel loops are slow enough that large cases would take
+hours, so cases whose estimated work exceeds SLOW_LIMITS are skipped and
+listed as such.
+'''
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from . import kernels
+from .render import computeFrame, renderImage
+from .viewport import Viewport
+
+#name: (kind, (c1, c2), center a, center b, span in units of a)
+CASES = {'default': ('mandelbrot', (0.0, 0.0), 0.5, 0.0, 4.0),
+         'boundary': ('mandelbrot', (0.0, 0.0), 0.745, -0.113, 0.02),
+         'julia': ('julia', (0.8, 0.12), 0.5, 0.0, 4.0)}
+
+RESOLUTIONS = ((320, 240), (800, 600), (1600, 1200))
+
+MAXITERS = (20, 200, 1000)
+
+REPEAT = 3
+
+#largest estimated work per render for the slow backends: orbit iterations
+#for python, loop passes (pixels x (maxiter + 1)) for putpixel
+SLOW_LIMITS = {'python': 2e7, 'putpixel': 2e6}
+
+#fractional drop in Mpix/s reported as a regression
+TOLERANCE = 0.10
+
+IMPORT_REPEAT = 5
+
+#modules a headless import of the package should not load
+HEAVY_MODULES = ('tkinter', 'Tkinter', 'PIL.ImageTk', 'tkSnack',
+                 'concurrent.futures', 'multiprocessing')
+
+_IMPORT_SCRIPT = '''
+import sys, time
+clock = getattr(time, 'perf_counter', time.time)
+start = clock()
+import %s
+print(clock() - start)
+print(' '.join(name for name in %r if name in sys.modules))
+'''
+
+
+def caseViewport(case, width, height):
+    kind, c, centerA, centerB, span = CASES[case]
+    return Viewport.centered(centerA, centerB, span, width, height)
+
+
+def _timeBackend(backend, viewport, kind, c, maxiter, repeat, options):
+    #best time of repeat renders, and the frame's kernel stats
+    best = None
+    stats = {}
+    for run in range(repeat):
+        start = time.time()
+        if backend in kernels.IMAGE_BACKENDS:
+            renderImage(viewport, kind, c, maxiter, backend)
+        else:
+            stats = computeFrame(viewport, kind, c, maxiter, backend,
+                                 **options).stats
+        seconds = time.time() - start
+        if stats and stats.get('jitFallback'):
+            #the jit backend ran the numpy (or python) kernel, which is timed
+            #under its own name
+            raise ImportError('Numba unavailable, the jit backend fell back '
+                              'to %s'
+                              % ('numpy' if kernels.numpy else 'python'))
+        if best is None or seconds < best:
+            best = seconds
+    return best, stats
+
+
+def runBenchmarks(backends=None, cases=None, resolutions=RESOLUTIONS,
+                  maxiters=MAXITERS, repeat=REPEAT, limits=SLOW_LIMITS,
+                  report=None, **options):
+    #list of result dictionaries, one per (backend, case, resolution,
+    #maxiter); report(result) is called as each one finishes
+    if backends is None:
+        backends = kernels.backendNames()
+    if cases is None:
+        cases = sorted(CASES)
+    results = []
+    for case in cases:
+        kind, c = CASES[case][:2]
+        for width, height in resolutions:
+            viewport = caseViewport(case, width, height)
+            for maxiter in maxiters:
+                #the work in the frame, measured once with a counting kernel
+                reference = computeFrame(viewport, kind, c, maxiter,
+                                         symmetry=False)
+                iterations = reference.iterations()
+                for backend in backends:
+                    result = {'backend': backend, 'case': case,
+                              'width': width, 'height': height,
+                              'maxiter': maxiter, 'iterations': iterations}
+                    work = (viewport.pixels*(maxiter + 1)
+                            if backend == 'putpixel' else iterations)
+                    if backend in limits and work > limits[backend]:
+                        result['skipped'] = 'estimated work %.3g' % work
+                    else:
+                        try:
+                            seconds, stats = _timeBackend(backend, viewport,
+                                                          kind, c, maxiter,
+                                                          repeat, options)
+                        except (ImportError, ValueError) as error:
+                            result['skipped'] = str(error)
+                        else:
+                            result['seconds'] = seconds
+                            result['mpixPerSecond'] = \
+                                viewport.pixels/1e6/seconds if seconds else 0.0
+                            result['iterationsPerSecond'] = \
+                                iterations/seconds if seconds else 0.0
+                            result['stats'] = stats
+                    results.append(result)
+                    if report is not None:
+                        report(result)
+    return results
+
+
+def importTime(module='fractal', repeat=IMPORT_REPEAT):
+    #best time in seconds to import module in a fresh interpreter, and the
+    #HEAVY_MODULES it loaded
+    best = None
+    loaded = []
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for run in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, '-c', _IMPORT_SCRIPT % (module, HEAVY_MODULES)],
+            cwd=root).decode('ascii').split('\n')
+        seconds = float(output[0])
+        loaded = output[1].split()
+        if best is None or seconds < best:
+            best = seconds
+    return {'module': module, 'seconds': best, 'heavyModules': loaded}
+
+
+def formatImportTime(result):
+    line = 'import %s: %.1f ms' % (result['module'], 1000*result['seconds'])
+    if result['heavyModules']:
+        line = line + ' (loaded %s)' % ', '.join(result['heavyModules'])
+    return line
+
+
+def resultKey(result):
+    return (result['backend'], result['case'], result['width'],
+            result['height'], result['maxiter'])
+
+
+def compareResults(results, baseline, tolerance=TOLERANCE):
+    #(result, baseline result) pairs whose Mpix/s dropped by more than
+    #tolerance
+    previous = dict((resultKey(result), result) for result in baseline)
+    regressions = []
+    for result in results:
+        old = previous.get(resultKey(result))
+        if (old is None or 'mpixPerSecond' not in result
+                or 'mpixPerSecond' not in old):
+            continue
+        if result['mpixPerSecond'] < (1.0 - tolerance)*old['mpixPerSecond']:
+            regressions.append((result, old))
+    return regressions
+
+
+def environment():
+    #where the results were measured
+    return {'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'numpy': kernels.numpy.__version__ if kernels.numpy else None,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count() if hasattr(os, 'cpu_count') else None,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def formatResult(result):
+    name = '%-10s %-9s %4dx%-4d %5d' % (result['backend'], result['case'],
+                                        result['width'], result['height'],
+                                        result['maxiter'])
+    if 'skipped' in result:
+        return '%s  skipped (%s)' % (name, result['skipped'])
+    return '%s  %8.3f s %8.2f Mpix/s %8.1f Miter/s' % (
+        name, result['seconds'], result['mpixPerSecond'],
+        result['iterationsPerSecond']/1e6)
+
+
+def _list(text, convert=str):
+    return [convert(value) for value in text.split(',') if value]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m fractal.benchmark',
+        description='Time every backend over resolutions, iteration limits '
+                    'and views.')
+    parser.add_argument('-o', '--output', default=None,
+                        help='write the results as JSON')
+    parser.add_argument('--baseline', default=None,
+                        help='JSON results of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='drop in Mpix/s flagged as a regression '
+                             '(default: %(default)s)')
+    parser.add_argument('--backends', type=_list, default=None,
+                        help='comma separated backends (default: all)')
+    parser.add_argument('--cases', type=_list, default=None,
+                        help='comma separated views: %s'
+                             % ', '.join(sorted(CASES)))
+    parser.add_argument('--sizes', default=None,
+                        type=lambda text: _list(text, lambda size: tuple(
+                            int(value) for value in size.split('x'))),
+                        help='comma separated WIDTHxHEIGHT (default: %s)'
+                             % ','.join('%dx%d' % size for size in RESOLUTIONS))
+    parser.add_argument('--maxiters', type=lambda text: _list(text, int),
+                        default=None,
+                        help='comma separated iteration limits (default: %s)'
+                             % ','.join(str(value) for value in MAXITERS))
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--all', action='store_true',
+                        help='do not skip large cases of the slow backends')
+    parser.add_argument('--import-time', dest='importOnly',
+                        action='store_true',
+                        help='only measure the time to import the package')
+    arguments = parser.parse_args(argv)
+
+    imports = importTime()
+    print(formatImportTime(imports))
+    if arguments.importOnly:
+        return 0
+
+    for case in arguments.cases or []:
+        if case not in CASES:
+            parser.error('unknown case %r' % (case,))
+
+    results = runBenchmarks(arguments.backends, arguments.cases,
+                            arguments.sizes or RESOLUTIONS,
+                            arguments.maxiters or MAXITERS, arguments.repeat,
+                            {} if arguments.all else SLOW_LIMITS,
+                            report=lambda result: print(formatResult(result)))
+
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            json.dump({'environment': environment(), 'imports': imports,
+                       'results': results},
+                      output, indent=1, sort_keys=True)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as baselineFile:
+            baseline = json.load(baselineFile)['results']
+        regressions = compareResults(results, baseline, arguments.tolerance)
+        for result, old in regressions:
+            print('REGRESSION %s: %.2f Mpix/s, was %.2f'
+                  % (' '.join(str(part) for part in resultKey(result)),
+                     result['mpixPerSecond'], old['mpixPerSecond']))
+        if regressions:
+            return 1
+        print('no regressions against %s' % (arguments.baseline,))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
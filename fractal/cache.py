@@ -0,0 +1,213 @@
+#cache.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+In-memory cache of iteration-count tiles.
+
+The plane is divided into square tiles of tileSize x tileSize pixels, counted
+from the pixel (0, 0) of a viewport's left/top origin, so a tile is identified
+by
+
+(kind, c1, c2, maxiter, left, top, scale, tileSize, tile column, tile row)
+
+that is by fractal kind, Julia constant, iteration limit, zoom level (scale,
+with the origin it is measured from) and tile coordinates. frame() renders a
+viewport by looking up every tile it touches, computing only the missing ones,
+and copying the overlapping parts into the frame.
+
+Tiles are kept in least-recently-used order, and the oldest are dropped once
+the counts held exceed maxBytes. hits, misses and evictions count tile
+lookups, so that the cache can be sized from real use.
+
+A lock guards the tiles, so one thread may fill the cache (a render job, see
+jobs.py) while another looks at it.
+'''
+
+import threading
+from array import array
+from collections import OrderedDict
+
+from . import instrument
+from . import kernels
+from .render import Frame, computeFrame
+
+#default memory cap, enough for about 70 frames of 800 x 600 int32 counts
+MAX_BYTES = 128 << 20
+
+TILE_SIZE = 128
+
+
+def countBytes(counts):
+    if isinstance(counts, array):
+        return len(counts)*counts.itemsize
+    return counts.nbytes
+
+
+class TileCache(object):
+    #LRU cache of count tiles with a memory cap
+
+    def __init__(self, maxBytes=MAX_BYTES, tileSize=TILE_SIZE):
+        self.maxBytes = maxBytes
+        self.tileSize = tileSize
+        self.tiles = OrderedDict()
+        self.lock = threading.RLock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'tiles': len(self.tiles),
+                    'bytes': self.bytes,
+                    'maxBytes': self.maxBytes,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'hitRate': float(self.hits)/lookups if lookups else 0.0}
+
+    def clear(self):
+        with self.lock:
+            self.tiles.clear()
+            self.bytes = 0
+
+    def get(self, key):
+        #cached tile counts, or None; a hit makes the tile most recent
+        with self.lock:
+            tile = self.tiles.get(key)
+            if tile is None:
+                self.misses = self.misses + 1
+                instrument.count(cacheMisses=1)
+                return None
+            self.tiles[key] = self.tiles.pop(key)
+            self.hits = self.hits + 1
+        instrument.count(cacheHits=1)
+        return tile
+
+    def put(self, key, counts):
+        with self.lock:
+            if key in self.tiles:
+                self.bytes = self.bytes - countBytes(self.tiles.pop(key))
+            self.tiles[key] = counts
+            self.bytes = self.bytes + countBytes(counts)
+            while self.bytes > self.maxBytes and len(self.tiles) > 1:
+                oldKey, oldCounts = self.tiles.popitem(last=False)
+                self.bytes = self.bytes - countBytes(oldCounts)
+                self.evictions = self.evictions + 1
+
+    def tileKey(self, viewport, kind, c, maxiter, column, row):
+        return (kind, float(c[0]), float(c[1]), maxiter, viewport.left,
+                viewport.top, viewport.scale, self.tileSize, column, row)
+
+    def _tileRange(self, viewport):
+        #(column, row) of every tile touched by viewport
+        size = self.tileSize
+        m0 = viewport.mOffset
+        n0 = viewport.nOffset
+        m1 = m0 + viewport.width
+        n1 = n0 + viewport.height
+        return [(column, row) for row in range(n0 // size, -(-n1 // size))
+                for column in range(m0 // size, -(-m1 // size))]
+
+    def contains(self, viewport, kind='mandelbrot', c=(0.0, 0.0), maxiter=20):
+        #True if frame() could assemble viewport without computing anything;
+        #does not count as a lookup
+        with self.lock:
+            return all(self.tileKey(viewport, kind, c, maxiter, column, row)
+                       in self.tiles
+                       for column, row in self._tileRange(viewport))
+
+    def storeFrame(self, frame):
+        #cache the tiles lying wholly inside a frame computed elsewhere, e.g.
+        #by a progressive render
+        size = self.tileSize
+        viewport = frame.viewport
+        numpy = kernels.numpy
+        for column, row in self._tileRange(viewport):
+            m = column*size - viewport.mOffset
+            n = row*size - viewport.nOffset
+            if (m < 0 or n < 0 or m + size > viewport.width
+                    or n + size > viewport.height):
+                continue
+            if isinstance(frame.counts, array):
+                tile = array('i')
+                for line in range(n, n + size):
+                    start = line*viewport.width + m
+                    tile.extend(frame.counts[start:start + size])
+            else:
+                tile = numpy.array(frame.counts[n:n + size, m:m + size],
+                                   dtype=numpy.int32)
+            self.put(self.tileKey(viewport, frame.kind, frame.c,
+                                  frame.maxiter, column, row), tile)
+
+    def frame(self, viewport, kind='mandelbrot', c=(0.0, 0.0), maxiter=20,
+              backend=None, **options):
+        #Frame of viewport assembled from cached tiles, computing the
+        #missing ones with computeFrame(..., backend, **options)
+        counts = newCounts(viewport)
+        for done, total, box in self.fillTiles(counts, viewport, kind, c,
+                                               maxiter, backend, **options):
+            pass
+        return Frame(counts, viewport, maxiter, kind,
+                     (float(c[0]), float(c[1])))
+
+    def fillTiles(self, counts, viewport, kind='mandelbrot', c=(0.0, 0.0),
+                  maxiter=20, backend=None, **options):
+        #generator copying every tile of viewport into counts (see
+        #newCounts()), computing the missing ones; yields (tiles done, tiles,
+        #box) after each tile, box being the (left, top, right, bottom)
+        #pixels of the frame it covered, so that the caller can stop between
+        #tiles or show each tile as it arrives
+        size = self.tileSize
+        origin = viewport.subViewport(-viewport.mOffset, -viewport.nOffset,
+                                      size, size)
+        tiles = self._tileRange(viewport)
+        for done, (column, row) in enumerate(tiles):
+            key = self.tileKey(viewport, kind, c, maxiter, column, row)
+            tile = self.get(key)
+            if tile is None:
+                tileViewport = origin.subViewport(column*size, row*size,
+                                                  size, size)
+                with instrument.stage('cacheFill'):
+                    tile = computeFrame(tileViewport, kind, c, maxiter,
+                                        backend, **options).counts
+                self.put(key, tile)
+            m = column*size - viewport.mOffset
+            n = row*size - viewport.nOffset
+            _copyTile(counts, viewport, tile, size, m, n)
+            yield done + 1, len(tiles), (max(0, m), max(0, n),
+                                         min(viewport.width, m + size),
+                                         min(viewport.height, n + size))
+
+
+def newCounts(viewport):
+    #an empty counts buffer for viewport: height x width int32, or a flat
+    #array('i') without NumPy
+    if kernels.numpy is not None:
+        return kernels.numpy.empty((viewport.height, viewport.width),
+                                   dtype=kernels.numpy.int32)
+    return array('i', [0])*viewport.pixels
+
+
+def _copyTile(counts, viewport, tile, size, m, n):
+    #copy the part of a size x size tile whose top left pixel is at (m, n)
+    #of the frame that overlaps the frame
+    left = max(0, -m)
+    top = max(0, -n)
+    right = min(size, viewport.width - m)
+    bottom = min(size, viewport.height - n)
+    if isinstance(counts, array):
+        for row in range(top, bottom):
+            start = (n + row)*viewport.width + m
+            counts[start + left:start + right] = \
+                array('i', tile[row*size + left:row*size + right])
+    else:
+        if isinstance(tile, array):
+            tile = kernels.numpy.array(tile).reshape(size, size)
+        counts[n + top:n + bottom, m + left:m + right] = \
+            tile[top:bottom, left:right]
@@ -0,0 +1,288 @@
+#cli.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Headless batch renderer.
+
+Renders one image straight to a file, without opening a window, and prints
+how long each stage took:
+
+python -m fractal -o mandelbrot.png
+python -m fractal --kind julia --c1 0.8 --c2 0.12 --size 1920x1080 \\
+    --scale 400 --left -2.4 --top 1.35 --maxiter 200 -o julia.png
+python -m fractal --size 8000x6000 --scale 2000 --workers 16 -o big.bmp
+python -m fractal --size 100000x75000 --scale 25000 --stream -o print.png
+
+The viewport is given as in Viewport: the value of a at the left edge, the
+value of b at the top edge and the number of pixels per unit. The output
+format follows the file extension unless --format is given; a format PIL
+cannot write, or a missing output directory, is reported before anything is
+rendered. --workers renders on the parallel backend unless another one
+(scheduled or jit) is named. --stream writes PNG, PPM or BMP strip by strip
+(stream.py), for images too large to hold in memory.
+
+Only PIL's Image module is used, never Tkinter or ImageTk, so this runs on
+machines without a display.
+'''
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+from . import instrument
+from . import kernels
+from .palette import GRADIENT, GradientPalette
+from .render import computeFrame, renderImage
+from .stream import STRIP_PIXELS, streamFormat, streamImage
+from .viewport import Viewport
+
+#backends which take a worker count: processes for parallel and scheduled,
+#threads for jit
+PARALLEL_BACKENDS = ('parallel', 'scheduled', 'jit')
+
+
+def parseSize(text):
+    try:
+        width, height = [int(value) for value in text.lower().split('x')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('size must be WIDTHxHEIGHT, not %r'
+                                         % (text,))
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError('size must be positive')
+    return width, height
+
+
+def parseColors(text):
+    try:
+        colors = [tuple(int(value.strip().lstrip('#')[i:i + 2], 16)
+                        for i in (0, 2, 4))
+                  for value in text.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('colors must be hex RRGGBB values, '
+                                         'not %r' % (text,))
+    if len(colors) < 2:
+        raise argparse.ArgumentTypeError('a gradient needs at least two '
+                                         'colors')
+    return colors
+
+
+def imageFormat(path, format=None):
+    #PIL's name for the format of path, from format or the file extension;
+    #ValueError if PIL cannot write it
+    from PIL import Image
+    Image.init()
+    if format is None:
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in Image.EXTENSION:
+            raise ValueError('no image format for the extension %r of %s; '
+                             'give --format' % (extension, path))
+        format = Image.EXTENSION[extension]
+    if format.upper() not in Image.SAVE:
+        raise ValueError('PIL cannot write %r images' % (format,))
+    return format.upper()
+
+
+def makePalette(arguments):
+    if arguments.colors is None and not arguments.smooth:
+        return None
+    return GradientPalette(arguments.colors or GRADIENT, arguments.period,
+                           smooth=arguments.smooth)
+
+
+def makeParser():
+    parser = argparse.ArgumentParser(
+        prog='python -m fractal',
+        description='Render the Mandelbrot or a Julia set to an image file.')
+    parser.add_argument('-o', '--output', default='fractal.png',
+                        help='image file to write (default: %(default)s)')
+    parser.add_argument('--format', default=None,
+                        help='PIL image format, e.g. PNG, PPM or BMP '
+                             '(default: from the file extension)')
+    parser.add_argument('--size', type=parseSize, default=(800, 600),
+                        help='WIDTHxHEIGHT in pixels (default: 800x600)')
+    parser.add_argument('--left', type=float, default=-1.5,
+                        help='value of a at the left edge (default: %(default)s)')
+    parser.add_argument('--top', type=float, default=1.5,
+                        help='value of b at the top edge (default: %(default)s)')
+    parser.add_argument('--scale', type=float, default=200.0,
+                        help='pixels per unit (default: %(default)s)')
+    parser.add_argument('--kind', choices=kernels.KINDS, default='mandelbrot')
+    parser.add_argument('--c1', type=float, default=0.0,
+                        help='real part of the Julia constant')
+    parser.add_argument('--c2', type=float, default=0.0,
+                        help='imaginary part of the Julia constant')
+    parser.add_argument('--maxiter', type=int, default=20,
+                        help='iteration limit (default: %(default)s)')
+    parser.add_argument('--backend', default=None,
+                        help='one of %s (default: FRACTAL_BACKEND, numpy or '
+                             'python)' % ', '.join(kernels.backendNames()))
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes for the parallel and '
+                             'scheduled backends, or threads for jit')
+    parser.add_argument('--symmetry', action='store_true',
+                        help='copy the mirrored half of symmetric views '
+                             '(faster, but a few boundary pixels can differ '
+                             'from a full render)')
+    parser.add_argument('--colors', type=parseColors, default=None,
+                        help='comma separated hex colors of a cyclic '
+                             'gradient, e.g. 000764,206bcb,edffff (default: '
+                             'the five blue bands)')
+    parser.add_argument('--period', type=float, default=32.0,
+                        help='iterations per cycle of the gradient '
+                             '(default: %(default)s)')
+    parser.add_argument('--smooth', action='store_true',
+                        help='smooth gradient coloring (numpy backend)')
+    parser.add_argument('--stream', action='store_true',
+                        help='render and encode in strips with bounded memory '
+                             '(PNG, PPM or BMP)')
+    parser.add_argument('--strip-rows', dest='stripRows', type=int,
+                        default=None,
+                        help='rows per strip when streaming (default: about '
+                             '%d pixels per strip)' % STRIP_PIXELS)
+    parser.add_argument('--profile', default=None, metavar='JSON',
+                        help='write per-stage timings and counters to JSON')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='do not print timings')
+    return parser
+
+
+def parseArgs(argv=None):
+    #the parsed arguments; values argparse cannot check by type alone end
+    #in a usage message and exit status 2, as argparse's own errors do
+    parser = makeParser()
+    arguments = parser.parse_args(argv)
+    if arguments.maxiter < 1:
+        parser.error('--maxiter must be at least 1')
+    if not arguments.scale > 0:
+        parser.error('--scale must be positive')
+    if arguments.workers is not None and arguments.workers < 1:
+        parser.error('--workers must be at least 1')
+    if arguments.stripRows is not None and arguments.stripRows < 1:
+        parser.error('--strip-rows must be at least 1')
+    if not arguments.period > 0:
+        parser.error('--period must be positive')
+    directory = os.path.dirname(os.path.abspath(arguments.output))
+    if not os.path.isdir(directory):
+        parser.error('--output: no directory %s' % directory)
+    try:
+        if arguments.stream:
+            streamFormat(arguments.output, arguments.format)
+        else:
+            imageFormat(arguments.output, arguments.format)
+    except ImportError:
+        #without PIL the render itself reports it
+        pass
+    except ValueError as error:
+        parser.error(str(error))
+    return arguments
+
+
+def main(argv=None):
+    arguments = parseArgs(argv)
+    width, height = arguments.size
+    viewport = Viewport(width, height, arguments.left, arguments.top,
+                        arguments.scale)
+    backend = arguments.backend
+    options = {}
+    if arguments.workers is not None:
+        if backend is None:
+            backend = 'parallel'
+        if backend not in PARALLEL_BACKENDS:
+            print('--workers needs one of the backends %s'
+                  % ', '.join(PARALLEL_BACKENDS), file=sys.stderr)
+            return 2
+        options['workers'] = arguments.workers
+    if backend is None:
+        backend = kernels.defaultBackend()
+    c = (arguments.c1, arguments.c2)
+    if arguments.profile:
+        instrument.enable()
+    palette = makePalette(arguments)
+    if palette is not None and palette.smooth:
+        options['magnitudes'] = True
+
+    if arguments.stream:
+        status = streamMain(arguments, viewport, backend, c, palette, options)
+    else:
+        status = renderMain(arguments, viewport, backend, c, palette, options)
+    if arguments.profile and status == 0:
+        instrument.dump(arguments.profile)
+    return status
+
+
+def renderMain(arguments, viewport, backend, c, palette, options):
+    width = viewport.width
+    height = viewport.height
+
+    start = time.time()
+    try:
+        if backend in kernels.IMAGE_BACKENDS:
+            frame = None
+            image = renderImage(viewport, arguments.kind, c, arguments.maxiter,
+                                backend, palette)
+            computed = time.time()
+        else:
+            frame = computeFrame(viewport, arguments.kind, c, arguments.maxiter,
+                                 backend, arguments.symmetry, **options)
+            computed = time.time()
+            image = frame.image(palette)
+    except (ValueError, ImportError) as error:
+        print('error: %s' % (error,), file=sys.stderr)
+        return 2
+    colored = time.time()
+    try:
+        with instrument.stage('save'):
+            image.save(arguments.output, arguments.format)
+    except (IOError, OSError, ValueError, KeyError) as error:
+        print('error: %s' % (error,), file=sys.stderr)
+        return 2
+    saved = time.time()
+
+    if not arguments.quiet:
+        computeTime = computed - start
+        megapixels = viewport.pixels/1e6
+        print('%s: %dx%d %s, maxiter %d, backend %s'
+              % (arguments.output, width, height, arguments.kind,
+                 arguments.maxiter, backend))
+        print('compute %.3f s, color %.3f s, save %.3f s, total %.3f s'
+              % (computeTime, colored - computed, saved - colored,
+                 saved - start))
+        line = '%.2f Mpix/s' % (megapixels/computeTime if computeTime else 0.0)
+        if frame is not None:
+            iterations = frame.iterations()
+            line = line + ', %.1f Miter/s (%d iterations)' % (
+                iterations/1e6/computeTime if computeTime else 0.0, iterations)
+        print(line)
+        if frame is not None and frame.stats:
+            print('stats: %s' % ', '.join('%s %s' % item for item
+                                          in sorted(frame.stats.items())))
+    return 0
+
+
+def streamMain(arguments, viewport, backend, c, palette, options):
+    start = time.time()
+    options.pop('magnitudes', None)
+    try:
+        stats = streamImage(arguments.output, viewport, arguments.kind, c,
+                            arguments.maxiter, backend, arguments.format,
+                            arguments.stripRows, palette=palette,
+                            symmetry=arguments.symmetry, **options)
+    except (IOError, OSError, ValueError, ImportError) as error:
+        print('error: %s' % (error,), file=sys.stderr)
+        return 2
+    seconds = time.time() - start
+
+    if not arguments.quiet:
+        print('%s: %dx%d %s, maxiter %d, backend %s, streamed'
+              % (arguments.output, viewport.width, viewport.height,
+                 arguments.kind, arguments.maxiter, backend))
+        print('total %.3f s, %.2f Mpix/s'
+              % (seconds, viewport.pixels/1e6/seconds if seconds else 0.0))
+        if stats:
+            print('stats: %s' % ', '.join('%s %s' % item for item
+                                          in sorted(stats.items())))
+    return 0
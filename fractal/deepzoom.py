@@ -0,0 +1,180 @@
+#deepzoom.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Deep zoom by perturbation.
+
+Double precision carries about 16 significant digits, so once the distance
+between neighbouring pixels falls below about 1e-13 of the coordinates
+themselves, neighbouring pixels get the same value of c and the image breaks
+up into blocks. Perturbation gets round this by computing a single reference
+orbit Z at the center of the view in high precision (with the decimal module)
+and iterating every pixel only as its small difference from that orbit.
+
+Writing the pixel as c = C + dc and its orbit as z = Z + d, the iteration
+z_new = z*z - c becomes
+
+d_new = 2*Z*d + d*d - dc
+
+which only involves small numbers and can be done for all pixels at once in
+ordinary NumPy doubles. For the Julia set c is fixed, the pixel gives the
+starting value z = Z + d, and dc = 0.
+
+When the pixel's orbit passes closer to 0 than the difference d itself, or
+the reference orbit runs out (it escaped, or reached maxiter), the difference
+loses its precision and the pixel is "glitched". Such pixels are rebased: the
+difference is restarted from the beginning of the reference orbit, d = z - Z0,
+and iteration continues. The number of rebases is reported in stats.
+
+The view is given by its center and scale (pixels per unit, as in Viewport)
+as strings, so that they can carry as many digits as the zoom needs:
+
+counts = deepZoomCounts('0.743643887037158704752191506114774',
+                        '-0.131825904205311970493132056385139', '1e25')
+
+Pixel (m, n) lies at a = centerA + (m - width//2)/scale and
+b = centerB - (n - height//2)/scale. Scales up to about 1e300 are supported
+(the range of a double).
+'''
+
+import decimal
+from decimal import Decimal
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from . import kernels
+from .render import Frame
+from .viewport import Viewport
+
+#significant digits carried by the reference orbit beyond those of the scale
+GUARD_DIGITS = 20
+
+
+def referenceOrbit(centerA, centerB, kind='mandelbrot', c1=0.0, c2=0.0,
+                   maxiter=20, digits=None):
+    #high precision orbit of the center of the view, as lists of doubles
+    #ending at the first point outside |z| = 2 or after maxiter + 1 steps
+    context = decimal.Context(prec=digits or 50)
+    A = context.create_decimal(centerA)
+    B = context.create_decimal(centerB)
+    if kind == 'mandelbrot':
+        X = Decimal(0)
+        Y = Decimal(0)
+    else:
+        X = A
+        Y = B
+        A = context.create_decimal(repr(float(c1)))
+        B = context.create_decimal(repr(float(c2)))
+
+    two = Decimal(2)
+    refX = [float(X)]
+    refY = [float(Y)]
+    for counter in range(maxiter + 1):
+        X, Y = (context.subtract(context.subtract(context.multiply(X, X),
+                                                  context.multiply(Y, Y)), A),
+                context.subtract(context.multiply(context.multiply(two, X), Y),
+                                 B))
+        refX.append(float(X))
+        refY.append(float(Y))
+        if refX[-1]*refX[-1] + refY[-1]*refY[-1] > 4.0:
+            break
+    return refX, refY
+
+
+def deepZoomCounts(centerA, centerB, scale, width=800, height=600,
+                   kind='mandelbrot', c1=0.0, c2=0.0, maxiter=20, stats=None):
+    #iteration counts of a view of any depth, laid out like the kernels'
+    if numpy is None:
+        raise ImportError('deep zoom requires NumPy')
+    if kind not in kernels.KINDS:
+        raise ValueError('unknown fractal kind %r' % (kind,))
+
+    scaleValue = Decimal(scale)
+    digits = max(0, scaleValue.adjusted()) + GUARD_DIGITS
+    refX, refY = referenceOrbit(centerA, centerB, kind, c1, c2, maxiter,
+                                digits)
+    refX = numpy.array(refX)
+    refY = numpy.array(refY)
+    last = len(refX) - 1
+
+    #pixel offsets from the center, which is pixel (width//2, height//2)
+    step = 1.0/float(scaleValue)
+    da = (numpy.arange(width) - width//2)*step
+    db = -(numpy.arange(height) - height//2)*step
+    da = numpy.tile(da, height)
+    db = numpy.repeat(db, width)
+
+    counts = numpy.empty(width*height, dtype=numpy.int32)
+    counts.fill(maxiter + 1)
+    active = numpy.arange(width*height)
+    if kind == 'mandelbrot':
+        dx = numpy.zeros_like(da)
+        dy = numpy.zeros_like(db)
+        dca = da
+        dcb = db
+    else:
+        dx = da
+        dy = db
+        dca = 0.0
+        dcb = 0.0
+    j = numpy.zeros(width*height, dtype=numpy.intp)
+    rebases = 0
+
+    for counter in range(maxiter + 1):
+        Zx = refX[j]
+        Zy = refY[j]
+        dx, dy = (2.00*(Zx*dx - Zy*dy) + dx*dx - dy*dy - dca,
+                  2.00*(Zx*dy + Zy*dx) + 2.00*dx*dy - dcb)
+        j = j + 1
+        x = refX[j] + dx
+        y = refY[j] + dy
+        mzsq = x*x + y*y
+
+        escaped = mzsq > 4.0
+        if escaped.any():
+            counts[active[escaped]] = counter
+            inside = ~escaped
+            active = active[inside]
+            dx = dx[inside]
+            dy = dy[inside]
+            x = x[inside]
+            y = y[inside]
+            j = j[inside]
+            mzsq = mzsq[inside]
+            if kind == 'mandelbrot':
+                dca = dca[inside]
+                dcb = dcb[inside]
+            if not active.size:
+                break
+
+        #glitch: z has come closer to 0 than the difference is large, or the
+        #reference orbit has run out; restart from the reference's first point
+        glitched = (mzsq < dx*dx + dy*dy) | (j == last)
+        if glitched.any():
+            rebases = rebases + int(numpy.count_nonzero(glitched))
+            dx = numpy.where(glitched, x - refX[0], dx)
+            dy = numpy.where(glitched, y - refY[0], dy)
+            j = numpy.where(glitched, 0, j)
+
+    kernels.addStats(stats, rebases=rebases, referenceLength=len(refX))
+    return counts.reshape(height, width)
+
+
+def deepZoomFrame(centerA, centerB, scale, width=800, height=600,
+                  kind='mandelbrot', c=(0.0, 0.0), maxiter=20):
+    #Frame of a deep zoom view; its viewport holds the nearest doubles and is
+    #only good for display, not for further rendering
+    stats = {}
+    counts = deepZoomCounts(centerA, centerB, scale, width, height, kind,
+                            float(c[0]), float(c[1]), maxiter, stats)
+    scaleValue = float(Decimal(scale))
+    viewport = Viewport(width, height,
+                        float(Decimal(centerA)) - (width//2)/scaleValue,
+                        float(Decimal(centerB)) + (height//2)/scaleValue,
+                        scaleValue)
+    return Frame(counts, viewport, maxiter, kind, (float(c[0]), float(c[1])),
+                 stats)
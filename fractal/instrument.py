@@ -0,0 +1,219 @@
+#instrument.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Timers and counters for the render pipeline.
+
+Instrumentation is off until enable() is called. While it is off, stage()
+returns a shared do-nothing context manager and count() and record() return
+at once, so the cost on a render is a few function calls.
+
+Once enabled, the pipeline reports these stages:
+
+compute      computeFrame(): pixels, iterations (as in Frame.iterations()),
+             escaped and interior pixels, and the kernel's own stats
+color        Frame.image()
+tile         each tile of the parallel and scheduled backends, as timed by
+             the worker
+cacheFill    each tile a TileCache had to compute; cacheHits and
+             cacheMisses are counted on every lookup
+encode       the strips written by stream.py
+save         image files written by the command-line renderer
+display      PhotoImage conversion in frac1.py
+
+Every stage adds its time to a timer of the same name (calls, total and
+longest time) and its counters, which only compute has, to the running
+totals. Callbacks registered
+with enable(callback) or addCallback() receive every stage as it finishes,
+as callback(name, seconds, counters). snapshot() returns the totals and
+dump() writes them as JSON, and formatSnapshot() as text:
+
+instrument.enable(lambda name, seconds, counters: print(name, seconds))
+frame = computeFrame()
+frame.image()
+instrument.dump('timings.json')
+
+Setting the FRACTAL_PROFILE environment variable turns instrumentation on
+when the package is imported, e.g. FRACTAL_PROFILE=1 ./frac1.py, whose
+About menu then shows the timings.
+'''
+
+import os
+import threading
+import time
+
+#the highest-resolution clock available
+clock = getattr(time, 'perf_counter', time.time)
+
+#the active Recorder, or None while instrumentation is off
+recorder = None
+
+
+class Recorder(object):
+    #totals of every stage timer and counter
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.callbacks = []
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.timers = {}
+            self.counters = {}
+
+    def record(self, name, seconds, counters):
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = {'calls': 0, 'seconds': 0.0,
+                                             'max': 0.0}
+            timer['calls'] = timer['calls'] + 1
+            timer['seconds'] = timer['seconds'] + seconds
+            timer['max'] = max(timer['max'], seconds)
+            for counter, value in counters.items():
+                self.counters[counter] = self.counters.get(counter, 0) + value
+            callbacks = list(self.callbacks)
+        for callback in callbacks:
+            callback(name, seconds, counters)
+
+    def count(self, counters):
+        with self.lock:
+            for counter, value in counters.items():
+                self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def snapshot(self):
+        with self.lock:
+            timers = dict((name, dict(timer))
+                          for name, timer in self.timers.items())
+            return {'stages': timers, 'counters': dict(self.counters)}
+
+
+class _NullStage(object):
+    #stage() while instrumentation is off
+
+    active = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+    def count(self, **counters):
+        pass
+
+
+NULL_STAGE = _NullStage()
+
+
+class _Stage(object):
+    #times a with block and records it, with the counters added to it, when
+    #the block ends
+
+    active = True
+
+    def __init__(self, recorder, name, counters):
+        self.recorder = recorder
+        self.name = name
+        self.counters = counters
+
+    def __enter__(self):
+        self.start = clock()
+        return self
+
+    def __exit__(self, *exception):
+        self.recorder.record(self.name, clock() - self.start, self.counters)
+        return False
+
+    def count(self, **counters):
+        for counter, value in counters.items():
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+
+def enable(callback=None):
+    #turn instrumentation on (keeping the totals if it already was)
+    global recorder
+    if recorder is None:
+        recorder = Recorder()
+    if callback is not None:
+        addCallback(callback)
+    return recorder
+
+
+def disable():
+    global recorder
+    recorder = None
+
+
+def enabled():
+    return recorder is not None
+
+
+def addCallback(callback):
+    #callback(name, seconds, counters) is called as every stage finishes
+    enable().callbacks.append(callback)
+
+
+def removeCallback(callback):
+    if recorder is not None and callback in recorder.callbacks:
+        recorder.callbacks.remove(callback)
+
+
+def stage(name, **counters):
+    #context manager timing one stage; .active tells whether anything is
+    #recorded and .count() adds counters to the stage
+    if recorder is None:
+        return NULL_STAGE
+    return _Stage(recorder, name, counters)
+
+
+def record(name, seconds, **counters):
+    #a stage timed elsewhere, e.g. a tile timed in a worker process
+    if recorder is not None:
+        recorder.record(name, seconds, counters)
+
+
+def count(**counters):
+    #add to the running counters without timing anything
+    if recorder is not None:
+        recorder.count(counters)
+
+
+def snapshot():
+    #{'stages': {name: {calls, seconds, max}}, 'counters': {...}}
+    if recorder is None:
+        return {'stages': {}, 'counters': {}}
+    return recorder.snapshot()
+
+
+def reset():
+    if recorder is not None:
+        recorder.reset()
+
+
+def dump(path):
+    #write snapshot() to path as JSON
+    import json
+    with open(path, 'w') as output:
+        json.dump(snapshot(), output, indent=1, sort_keys=True)
+
+
+def formatSnapshot(totals=None):
+    #one line per stage and per counter, for printing
+    if totals is None:
+        totals = snapshot()
+    lines = []
+    for name, timer in sorted(totals['stages'].items()):
+        lines.append('%-10s %6d calls %9.3f s total %8.2f ms mean %8.2f ms max'
+                     % (name, timer['calls'], timer['seconds'],
+                        1000*timer['seconds']/timer['calls'],
+                        1000*timer['max']))
+    for name, value in sorted(totals['counters'].items()):
+        lines.append('%-20s %d' % (name, value))
+    return '\n'.join(lines)
+
+
+if os.environ.get('FRACTAL_PROFILE'):
+    enable()
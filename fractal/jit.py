@@ -0,0 +1,188 @@
+#jit.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+JIT-compiled kernel (Numba).
+
+The escape loop is a few multiplications per iteration, which Numba compiles
+to machine code. Unlike the numpy kernel, which iterates every active pixel
+together and pays for dropping escaped pixels from its arrays, the compiled
+loop leaves each pixel at its first escape, as the python kernel does, and
+the rows of the frame are shared out between threads with prange.
+
+The "jit" backend takes the same arguments and gives the same counts as the
+numpy kernel (the coordinates and the iteration are computed in the same
+order, so the counts agree to the last pixel), including interiorTest,
+periodicity, tolerance, stats and magnitudes; workers= limits the number of
+threads for that call.
+
+FRACTAL_BACKEND=jit ./frac1.py
+python -m fractal --backend jit --maxiter 1000 -o detail.png
+
+The compiled function is cached on disk (Numba's cache=True, in
+__pycache__ or NUMBA_CACHE_DIR), so only the first run on a machine pays
+for compilation, which takes a few seconds; later runs load it in a fraction
+of a second. Importing Numba is itself slow, so this module is only loaded
+when the jit backend is first asked for (see kernels.LAZY_BACKENDS).
+
+Where Numba is not installed, or the compilation fails, the backend falls
+back to the numpy kernel (or the python kernel without NumPy), so selecting
+it never breaks a script; stats['jitFallback'] is then set, and the
+benchmark lists the jit cases as skipped rather than timing the fallback
+under the jit name.
+'''
+
+import warnings
+
+try:
+    import numba
+    prange = numba.prange
+except ImportError:
+    numba = None
+    prange = range
+
+from . import kernels
+
+#True once compilation has failed, so that it is not tried again
+_broken = False
+
+
+def _countRows(left, top, scale, mOffset, nOffset, width, height, julia, c1,
+               c2, maxiter, interiorTest, periodicity, tolerance, counts,
+               magnitudes, keepMagnitudes, periodic, saved):
+    #the escape loop of every pixel, rows shared out by prange; periodic[n]
+    #and saved[n] receive the periodicity stats of row n
+    for n in prange(height):
+        b0 = top - (nOffset + n)/scale
+        rowPeriodic = 0
+        rowSaved = 0
+        for m in range(width):
+            a0 = left + (mOffset + m)/scale
+            counts[n, m] = maxiter + 1
+            if keepMagnitudes:
+                magnitudes[n, m] = 0.0
+            if julia:
+                x = a0
+                y = b0
+                ca = c1
+                cb = c2
+            else:
+                x = 0.0
+                y = 0.0
+                ca = a0
+                cb = b0
+                if interiorTest:
+                    #kernels.inMainBulbs
+                    p = -ca
+                    q = -cb
+                    qsq = q*q
+                    xr = p - 0.25
+                    r = xr*xr + qsq
+                    if (r*(r + xr) <= 0.25*qsq
+                            or (p + 1.0)*(p + 1.0) + qsq <= 0.0625):
+                        continue
+            xs = x
+            ys = y
+            check = 0
+            for counter in range(maxiter + 1):
+                x_new = x*x - y*y - ca
+                y_new = 2.00*x*y - cb
+                mzsq = x_new*x_new + y_new*y_new
+                if mzsq > 4.0:
+                    counts[n, m] = counter
+                    if keepMagnitudes:
+                        magnitudes[n, m] = mzsq
+                    break
+                if periodicity:
+                    if abs(x_new - xs) < tolerance and abs(y_new - ys) < tolerance:
+                        rowPeriodic = rowPeriodic + 1
+                        rowSaved = rowSaved + maxiter - counter
+                        break
+                    if counter == check:
+                        xs = x_new
+                        ys = y_new
+                        check = 2*check + 1
+                x = x_new
+                y = y_new
+        periodic[n] = rowPeriodic
+        saved[n] = rowSaved
+
+
+if numba is not None:
+    _compiledRows = numba.njit(parallel=True, cache=True, nogil=True)(
+        _countRows)
+else:
+    _compiledRows = None
+
+
+def available():
+    #True if the jit backend compiles (as far as is known without trying)
+    return _compiledRows is not None and not _broken
+
+
+def jitCounts(viewport, kind='mandelbrot', c1=0.0, c2=0.0, maxiter=20,
+              interiorTest=True, periodicity=False,
+              tolerance=kernels.PERIODICITY_TOLERANCE, stats=None,
+              magnitudes=None, workers=None):
+    #compiled kernel: height x width int32 counts, as numpyCounts
+    global _broken
+    numpy = kernels.numpy
+    if not available() or numpy is None:
+        return _fallback(viewport, kind, c1, c2, maxiter, interiorTest,
+                         periodicity, tolerance, stats, magnitudes)
+
+    height = viewport.height
+    width = viewport.width
+    counts = numpy.empty((height, width), dtype=numpy.int32)
+    keepMagnitudes = magnitudes is not None
+    if keepMagnitudes:
+        target = numpy.empty((height, width))
+    else:
+        target = numpy.empty((1, 1))
+    periodic = numpy.zeros(height, dtype=numpy.int64)
+    saved = numpy.zeros(height, dtype=numpy.int64)
+    threads = numba.get_num_threads()
+    try:
+        if workers is not None:
+            numba.set_num_threads(max(1, min(int(workers),
+                                             numba.config.NUMBA_NUM_THREADS)))
+        _compiledRows(viewport.left, viewport.top, viewport.scale,
+                      viewport.mOffset, viewport.nOffset, width, height,
+                      kind != 'mandelbrot', float(c1), float(c2), int(maxiter),
+                      bool(interiorTest), bool(periodicity), float(tolerance),
+                      counts, target, keepMagnitudes, periodic, saved)
+    except Exception as error:
+        #a Numba which cannot compile the loop here (an unsupported
+        #platform or version)
+        _broken = True
+        warnings.warn('jit backend unavailable, using the numpy kernel: %s'
+                      % (error,))
+        return _fallback(viewport, kind, c1, c2, maxiter, interiorTest,
+                         periodicity, tolerance, stats, magnitudes)
+    finally:
+        #workers= applies to this call only
+        numba.set_num_threads(threads)
+    if keepMagnitudes:
+        magnitudes[...] = target.reshape(magnitudes.shape)
+    kernels.addStats(stats, periodicPixels=int(periodic.sum()),
+                     iterationsSaved=int(saved.sum()))
+    return counts
+
+
+def _fallback(viewport, kind, c1, c2, maxiter, interiorTest, periodicity,
+              tolerance, stats, magnitudes):
+    kernels.addStats(stats, jitFallback=1)
+    if kernels.numpy is not None:
+        return kernels.numpyCounts(viewport, kind, c1, c2, maxiter,
+                                   magnitudes=magnitudes,
+                                   interiorTest=interiorTest,
+                                   periodicity=periodicity,
+                                   tolerance=tolerance, stats=stats)
+    if magnitudes is not None:
+        raise ImportError('magnitudes require NumPy')
+    return kernels.pythonCounts(viewport, kind, c1, c2, maxiter, interiorTest,
+                                periodicity, tolerance, stats)
+
+
+kernels.registerBackend('jit', jitCounts)
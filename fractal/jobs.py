@@ -0,0 +1,260 @@
+#jobs.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Cancellable render jobs.
+
+A RenderJob renders one viewport through a TileCache, tile by tile. It
+carries an id, a state (pending, running, done, cancelled or failed) and a
+progress fraction (tiles finished / tiles), and is cancelled cooperatively:
+cancel() only sets a flag, which the job checks between tiles, so a stale
+render stops within one tile of being asked to.
+
+RenderJobs runs the jobs on one background thread, one at a time, and only
+ever keeps the newest request: submit() cancels the job running and any job
+still waiting, so a change of parameters never waits for a render which is
+no longer wanted.
+
+jobs = RenderJobs(TileCache(), onUpdate=lambda job: print(job.progress))
+job = jobs.submit(Viewport(800, 600), 'julia', (0.8, 0.12))
+frame = job.wait()
+
+onUpdate(job) is called on the render thread after the preview and after
+every tile, with job.frame holding the counts known so far: a 1/16
+resolution preview (with NumPy) overwritten by exact tiles as they finish.
+job.dirty is the (left, top, right, bottom) box of pixels changed by the
+update, the whole frame for the preview and the tile otherwise. The later
+tiles keep writing into the same counts, so the callback should color the
+box at once and hand the image over to the GUI's own thread, as frac1.py does
+with a queue polled by tkRoot.after().
+
+Under Python 3, job.asyncioFuture() wraps a job in an asyncio future, which
+is resolved with the frame (or cancelled) on the event loop, and cancelling
+the future cancels the job:
+
+frame = await jobs.submit(viewport).asyncioFuture()
+'''
+
+import itertools
+import threading
+
+from . import kernels
+from .cache import TileCache, newCounts
+from .progressive import progressivePasses
+from .render import Frame
+
+#job states
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+
+#spacing of the preview samples shown before the first tile
+PREVIEW_STEP = 16
+
+
+class JobCancelled(Exception):
+    #raised by RenderJob.wait() for a cancelled job
+    pass
+
+
+class RenderJob(object):
+    #one render request; see the module docstring
+
+    def __init__(self, number, cache, viewport, kind='mandelbrot',
+                 c=(0.0, 0.0), maxiter=20, backend=None, onUpdate=None,
+                 **options):
+        self.id = number
+        self.cache = cache
+        self.viewport = viewport
+        self.kind = kind
+        self.c = (float(c[0]), float(c[1]))
+        self.maxiter = maxiter
+        self.backend = backend
+        self.onUpdate = onUpdate
+        self.options = options
+        self.state = PENDING
+        self.progress = 0.0
+        self.frame = None
+        self.dirty = None
+        self.error = None
+        self.cancelRequested = False
+        self.finished = threading.Event()
+        self.lock = threading.Lock()
+        self.callbacks = []
+
+    def __repr__(self):
+        return '<RenderJob %d %s %s %.0f%%>' % (self.id, self.kind, self.state,
+                                               100*self.progress)
+
+    def cancel(self):
+        #ask the job to stop at the next tile; a pending job never starts
+        self.cancelRequested = True
+        with self.lock:
+            starting = self.state == PENDING
+            if starting:
+                self.state = CANCELLED
+        if starting:
+            self._finish(CANCELLED)
+
+    def cancelled(self):
+        return self.state == CANCELLED
+
+    def done(self):
+        return self.finished.is_set()
+
+    def wait(self, timeout=None):
+        #the finished Frame; raises JobCancelled, or the render's own error
+        if not self.finished.wait(timeout):
+            return None
+        if self.state == CANCELLED:
+            raise JobCancelled('render job %d was cancelled' % self.id)
+        if self.state == FAILED:
+            raise self.error
+        return self.frame
+
+    def addDoneCallback(self, callback):
+        #callback(job) once the job is done, cancelled or failed (at once if
+        #it already is), on the thread which finished it
+        with self.lock:
+            if not self.finished.is_set():
+                self.callbacks.append(callback)
+                return
+        callback(self)
+
+    def asyncioFuture(self, loop=None):
+        #asyncio future of the job's frame (Python 3)
+        import asyncio
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        future = loop.create_future()
+
+        def settle(job):
+            if future.done():
+                return
+            if job.state == DONE:
+                future.set_result(job.frame)
+            elif job.state == FAILED:
+                future.set_exception(job.error)
+            else:
+                future.cancel()
+
+        def cancelJob(future):
+            if future.cancelled():
+                self.cancel()
+
+        future.add_done_callback(cancelJob)
+        self.addDoneCallback(lambda job: loop.call_soon_threadsafe(settle,
+                                                                    job))
+        return future
+
+    def _finish(self, state):
+        with self.lock:
+            if self.finished.is_set():
+                return
+            self.state = state
+            self.finished.set()
+            callbacks = self.callbacks
+            self.callbacks = []
+        for callback in callbacks:
+            callback(self)
+
+    def _update(self):
+        if self.onUpdate is not None:
+            self.onUpdate(self)
+
+    def run(self):
+        #render on the calling thread, checking for cancellation between
+        #tiles; a job which was cancelled (or has run) before does nothing
+        with self.lock:
+            if self.state != PENDING or self.finished.is_set():
+                return
+            self.state = RUNNING
+        try:
+            viewport = self.viewport
+            counts = newCounts(viewport)
+            self.frame = Frame(counts, viewport, self.maxiter, self.kind,
+                               self.c)
+            if (kernels.numpy is not None and not self.cache.contains(
+                    viewport, self.kind, self.c, self.maxiter)):
+                for step, preview in progressivePasses(
+                        viewport, self.kind, self.c, self.maxiter,
+                        (PREVIEW_STEP,)):
+                    counts[...] = preview.counts
+                self.dirty = (0, 0, viewport.width, viewport.height)
+                self._update()
+            if self.cancelRequested:
+                self._finish(CANCELLED)
+                return
+            for done, total, box in self.cache.fillTiles(
+                    counts, viewport, self.kind, self.c, self.maxiter,
+                    self.backend, **self.options):
+                if self.cancelRequested:
+                    self._finish(CANCELLED)
+                    return
+                self.progress = float(done)/total
+                self.dirty = box
+                self._update()
+        except Exception as error:
+            self.error = error
+            self._finish(FAILED)
+            return
+        self._finish(DONE)
+
+
+class RenderJobs(object):
+    #runs RenderJobs on one daemon thread, newest request only
+
+    def __init__(self, cache=None, onUpdate=None):
+        self.cache = cache if cache is not None else TileCache()
+        self.onUpdate = onUpdate
+        self.numbers = itertools.count(1)
+        self.condition = threading.Condition()
+        self.pending = None
+        self.current = None
+        self.thread = None
+
+    def submit(self, viewport, kind='mandelbrot', c=(0.0, 0.0), maxiter=20,
+               backend=None, **options):
+        #start rendering viewport, superseding every earlier job; returns
+        #the new RenderJob
+        with self.condition:
+            job = RenderJob(next(self.numbers), self.cache, viewport, kind, c,
+                            maxiter, backend, self.onUpdate, **options)
+            self._cancelLocked()
+            self.pending = job
+            self.current = job
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._work)
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify()
+        return job
+
+    def cancel(self):
+        #cancel the job running and the one waiting, if any
+        with self.condition:
+            self._cancelLocked()
+            self.current = None
+
+    def isCurrent(self, job):
+        #True for the newest job submitted, which has not been cancelled
+        return job is self.current
+
+    def _cancelLocked(self):
+        if self.pending is not None:
+            self.pending.cancel()
+            self.pending = None
+        if self.current is not None:
+            self.current.cancel()
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                job = self.pending
+                self.pending = None
+            job.run()
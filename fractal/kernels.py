@@ -0,0 +1,416 @@
+#kernels.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Escape-time kernels.
+
+Every kernel iterates the function
+
+z_new = z*z - c
+
+in the form used by the original scripts
+
+x_new = x*x - y*y - a
+y_new = 2*x*y - b
+mzsq = x_new*x_new + y_new*y_new
+
+and returns the value of counter (0 to maxiter) at which mzsq first exceeded
+4.0 for each pixel. Pixels which never escape are given the value maxiter + 1.
+Counts are laid out row by row, n down the screen and m across, which is the
+order expected by Image.fromarray and Image.frombytes.
+
+For the Mandelbrot set z starts at 0 and c is the pixel; for the Julia set z
+starts at the pixel and c = c1 + i*c2 is fixed.
+
+Most of the interior of the Mandelbrot set lies in the main cardioid and the
+period-2 bulb. Since z_new = z*z - c is the usual z*z + c iteration for the
+point -c = -a - i*b, a pixel can be tested for membership of these two regions
+in closed form: with p = -a, q = -b and r = (p - 1/4)^2 + q^2, the point lies
+in the cardioid when r*(r + p - 1/4) <= q^2/4 and in the bulb when
+(p + 1)^2 + q^2 <= 1/16. Orbits of such points never leave the circle
+|z| = 2, so the numpy and python kernels mark them interior without iterating
+(interiorTest=False turns this off).
+
+For high iteration limits the remaining interior pixels can be caught with
+periodicity checking (periodicity=True). Following Brent's cycle detection,
+the orbit is saved at counters 0, 1, 3, 7, 15, ..., and every new value of z
+is compared with the saved one; when both parts agree to within tolerance the
+orbit has fallen into a cycle and the pixel is marked interior at once. A
+stats dictionary passed to the kernel receives the number of pixels caught
+this way (periodicPixels) and the iterations saved (iterationsSaved).
+
+The numpy kernel can also return the value of mzsq at which each pixel
+escaped, for smooth coloring and for storage (store.py): pass a float array
+of the frame's shape as magnitudes=, and it is filled in, with 0.0 for
+interior pixels.
+
+The "python" kernel needs nothing beyond the standard library. It stops
+iterating a pixel as soon as it escapes and stores the counts in a flat
+array('B') (array('H') or array('I') for iteration limits above 254), which
+render.Frame turns into an image with a single Image.frombytes call.
+
+The "putpixel" kernel is the loop from frac1.py, kept so that the faster
+kernels can be compared against it. It writes straight into a PIL image and
+has no count output.
+'''
+
+import importlib
+import os
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+KINDS = ('mandelbrot', 'julia')
+
+#number of pixels iterated together by the NumPy kernel. Larger frames are
+#processed in bands of rows so that memory use stays bounded at 8K and above.
+CHUNK_PIXELS = 1 << 20
+
+#largest difference in x and y at which two points of an orbit are taken to be
+#the same by the periodicity check
+PERIODICITY_TOLERANCE = 1e-12
+
+
+def inMainBulbs(a, b):
+    #closed-form test for the main cardioid and the period-2 bulb; works on
+    #floats and on NumPy arrays alike
+    p = -a
+    q = -b
+    qsq = q*q
+    xr = p - 0.25
+    r = xr*xr + qsq
+    return (r*(r + xr) <= 0.25*qsq) | ((p + 1.0)*(p + 1.0) + qsq <= 0.0625)
+
+
+def addStats(stats, **counters):
+    #add counters into the stats dictionary given to a kernel, if any
+    if stats is not None:
+        for name, value in counters.items():
+            stats[name] = stats.get(name, 0) + value
+
+
+def numpyPoints(a, b, kind='mandelbrot', c1=0.0, c2=0.0, maxiter=20,
+                interiorTest=True, periodicity=False,
+                tolerance=PERIODICITY_TOLERANCE, stats=None,
+                magnitudes=None):
+    #iteration counts of the points a + i*b given as flat float arrays;
+    #pixels are dropped from the working arrays as soon as they escape. The
+    #flat array magnitudes, if given, receives mzsq at escape.
+    if numpy is None:
+        raise ImportError('the numpy backend requires NumPy')
+
+    periodicPixels = 0
+    iterationsSaved = 0
+    out = numpy.empty(len(a), dtype=numpy.int32)
+    out.fill(maxiter + 1)
+    if magnitudes is not None:
+        magnitudes.fill(0.0)
+
+    if kind == 'mandelbrot':
+        x = numpy.zeros_like(a)
+        y = numpy.zeros_like(b)
+    else:
+        x = a
+        y = b
+        a = c1
+        b = c2
+    active = numpy.arange(out.size)
+    if kind == 'mandelbrot' and interiorTest:
+        outside = ~inMainBulbs(a, b)
+        active = active[outside]
+        x = x[outside]
+        y = y[outside]
+        a = a[outside]
+        b = b[outside]
+
+    #saved point of each orbit for the periodicity check, and the counter at
+    #which it is next replaced
+    xs = x
+    ys = y
+    check = 0
+
+    for counter in range(maxiter + 1):
+        if not active.size:
+            break
+
+        x_new = x*x - y*y - a
+        y_new = 2.00*x*y - b
+        mzsq = x_new*x_new + y_new*y_new
+
+        escaped = mzsq > 4.0
+        done = escaped
+        if periodicity:
+            cycled = ((abs(x_new - xs) < tolerance)
+                      & (abs(y_new - ys) < tolerance) & ~escaped)
+            caught = int(numpy.count_nonzero(cycled))
+            if caught:
+                periodicPixels = periodicPixels + caught
+                iterationsSaved = iterationsSaved + caught*(maxiter - counter)
+                done = escaped | cycled
+
+        if done.any():
+            out[active[escaped]] = counter
+            if magnitudes is not None:
+                magnitudes[active[escaped]] = mzsq[escaped]
+            inside = ~done
+            active = active[inside]
+            x_new = x_new[inside]
+            y_new = y_new[inside]
+            if kind == 'mandelbrot':
+                a = a[inside]
+                b = b[inside]
+            if periodicity:
+                xs = xs[inside]
+                ys = ys[inside]
+
+        if periodicity and counter == check:
+            xs = x_new
+            ys = y_new
+            check = 2*check + 1
+
+        x = x_new
+        y = y_new
+
+    addStats(stats, periodicPixels=periodicPixels,
+             iterationsSaved=iterationsSaved)
+    return out
+
+
+def numpyGridCounts(viewport, columns, rows, kind='mandelbrot', c1=0.0,
+                    c2=0.0, maxiter=20, magnitudes=None, **options):
+    #iteration counts of the pixels at the given columns (m) and rows (n) of
+    #viewport, as a len(rows) x len(columns) array; coordinates are computed
+    #exactly as for a full render, so the samples can be reused in one
+    if numpy is None:
+        raise ImportError('the numpy backend requires NumPy')
+    columns = numpy.asarray(columns)
+    rows = numpy.asarray(rows)
+    counts = numpy.empty((len(rows), len(columns)), dtype=numpy.int32)
+
+    aRow = viewport.left + (viewport.mOffset + columns)/viewport.scale
+    bColumn = viewport.top - (viewport.nOffset + rows)/viewport.scale
+
+    chunk = max(1, CHUNK_PIXELS // max(1, len(columns)))
+    for n in range(0, len(rows), chunk):
+        band = bColumn[n:n + chunk]
+        bandMagnitudes = None
+        if magnitudes is not None:
+            bandMagnitudes = numpy.empty(len(band)*len(columns))
+        counts[n:n + chunk] = numpyPoints(numpy.tile(aRow, len(band)),
+                                          numpy.repeat(band, len(columns)),
+                                          kind, c1, c2, maxiter,
+                                          magnitudes=bandMagnitudes,
+                                          **options).reshape(len(band), -1)
+        if magnitudes is not None:
+            magnitudes[n:n + chunk] = bandMagnitudes.reshape(len(band), -1)
+    return counts
+
+
+def numpyPixelCounts(viewport, columns, rows, kind='mandelbrot', c1=0.0,
+                     c2=0.0, maxiter=20, **options):
+    #iteration counts of the scattered pixels (columns[k], rows[k]) of
+    #viewport, as a flat array
+    if numpy is None:
+        raise ImportError('the numpy backend requires NumPy')
+    a = viewport.left + (viewport.mOffset + numpy.asarray(columns))/viewport.scale
+    b = viewport.top - (viewport.nOffset + numpy.asarray(rows))/viewport.scale
+    return numpyPoints(a, b, kind, c1, c2, maxiter, **options)
+
+
+def numpyCounts(viewport, kind='mandelbrot', c1=0.0, c2=0.0, maxiter=20,
+                **options):
+    #vectorized kernel: iterates a band of rows of the viewport at a time
+    if numpy is None:
+        raise ImportError('the numpy backend requires NumPy')
+    return numpyGridCounts(viewport, numpy.arange(viewport.width),
+                           numpy.arange(viewport.height), kind, c1, c2,
+                           maxiter, **options)
+
+
+def countTypecode(maxiter):
+    #smallest array typecode able to hold the interior value maxiter + 1
+    if maxiter + 1 <= 0xff:
+        return 'B'
+    if maxiter + 1 <= 0xffff:
+        return 'H'
+    return 'I'
+
+
+def pythonCounts(viewport, kind='mandelbrot', c1=0.0, c2=0.0, maxiter=20,
+                 interiorTest=True, periodicity=False,
+                 tolerance=PERIODICITY_TOLERANCE, stats=None):
+    #scalar kernel: one pixel at a time, leaving the loop at the first escape
+    #and writing a single byte per pixel into a flat row-major buffer. The
+    #first escape is kept on purpose: putpixelImage repaints a pixel after
+    #its escape until the orbit overflows, so the two pictures differ there
+    width = viewport.width
+    interior = maxiter + 1
+    counts = array(countTypecode(maxiter), [interior]) * (width*viewport.height)
+    aValues = viewport.aValues()
+    iterations = range(interior)
+    testBulbs = kind == 'mandelbrot' and interiorTest
+    periodicPixels = 0
+    iterationsSaved = 0
+
+    i = 0
+    for b in viewport.bValues():
+        for a in aValues:
+            if testBulbs and inMainBulbs(a, b):
+                i = i + 1
+                continue
+
+            if kind == 'mandelbrot':
+                x = 0.0
+                y = 0.0
+                ca = a
+                cb = b
+            else:
+                x = a
+                y = b
+                ca = c1
+                cb = c2
+
+            if not periodicity:
+                for counter in iterations:
+                    x_new = x*x - y*y - ca
+                    y_new = 2.00*x*y - cb
+                    if x_new*x_new + y_new*y_new > 4.0:
+                        counts[i] = counter
+                        break
+                    x = x_new
+                    y = y_new
+
+            else:
+                xs = x
+                ys = y
+                check = 0
+                for counter in iterations:
+                    x_new = x*x - y*y - ca
+                    y_new = 2.00*x*y - cb
+                    if x_new*x_new + y_new*y_new > 4.0:
+                        counts[i] = counter
+                        break
+                    if abs(x_new - xs) < tolerance and abs(y_new - ys) < tolerance:
+                        periodicPixels = periodicPixels + 1
+                        iterationsSaved = iterationsSaved + maxiter - counter
+                        break
+                    if counter == check:
+                        xs = x_new
+                        ys = y_new
+                        check = 2*check + 1
+                    x = x_new
+                    y = y_new
+
+            i = i + 1
+
+    addStats(stats, periodicPixels=periodicPixels,
+             iterationsSaved=iterationsSaved)
+    return counts
+
+
+def putpixelImage(viewport, kind='mandelbrot', c1=0.0, c2=0.0, maxiter=20):
+    #the original per-pixel loop from frac1.py, one putpixel per iteration
+    from PIL import Image
+    fracImage = Image.new("RGB", (viewport.width, viewport.height))
+
+    for m in range(viewport.width):
+        a = viewport.aValue(m)
+
+        for n in range(viewport.height):
+            b = viewport.bValue(n)
+            if kind == 'mandelbrot':
+                x = 0.0
+                y = 0.0
+                ca = a
+                cb = b
+            else:
+                x = a
+                y = b
+                ca = c1
+                cb = c2
+            mzsq = 0.00
+            counter = 0
+
+            while (counter <= maxiter):
+                x_new = x*x - y*y - ca
+                y_new = 2.00*x*y - cb
+                mzsq = x_new*x_new + y_new*y_new
+
+                if(mzsq>4.0 and 0 <= counter <= 13):
+                    fracImage.putpixel ( (m, n), (25, 15, 105))
+
+                elif(mzsq>4.0 and 14 <= counter <= 15):
+                    fracImage.putpixel ( (m, n), (45, 20, 160))
+
+                elif(mzsq>4.0 and 16 <= counter <= 17):
+                    fracImage.putpixel ( (m, n), (65, 25, 180))
+
+                elif(mzsq>4.0 and 18 <= counter <= 20):
+                    fracImage.putpixel ( (m, n), (75, 30, 235))
+
+                elif(mzsq<=4.0):
+                    fracImage.putpixel ( (m, n), (0, 0, 0))
+
+                x = x_new
+                y = y_new
+                counter = counter + 1
+
+    return fracImage
+
+
+#kernels which produce iteration counts, by name
+COUNT_BACKENDS = {'numpy': numpyCounts, 'python': pythonCounts}
+
+#kernels which only produce an image
+IMAGE_BACKENDS = {'putpixel': putpixelImage}
+
+
+#backends whose modules are imported the first time they are asked for, so
+#that importing the package does not load concurrent.futures and
+#multiprocessing, or Numba (name: module of the fractal package registering
+#it)
+LAZY_BACKENDS = {'parallel': 'parallel', 'scheduled': 'schedule',
+                 'jit': 'jit'}
+
+#backends able to return mzsq at escape (magnitudes=)
+MAGNITUDE_BACKENDS = ('numpy', 'jit')
+
+
+def registerBackend(name, function):
+    #add a counting kernel defined in another module (see parallel.py)
+    COUNT_BACKENDS[name] = function
+
+
+def loadBackend(name):
+    #import the module of a lazily registered backend, if it is one; raises
+    #ImportError where the module cannot run (Python 2 for parallel)
+    if name in LAZY_BACKENDS and name not in COUNT_BACKENDS:
+        importlib.import_module('.' + LAZY_BACKENDS[name], __package__)
+
+
+def countBackend(name):
+    #the counting kernel registered as name, loading its module if need be
+    loadBackend(name)
+    return COUNT_BACKENDS[name]
+
+
+def backendNames():
+    #every backend name, whether its module is loaded yet or not
+    return sorted(set(COUNT_BACKENDS) | set(LAZY_BACKENDS)
+                  | set(IMAGE_BACKENDS))
+
+
+def defaultBackend():
+    #the FRACTAL_BACKEND environment variable selects a kernel for every
+    #script, e.g. FRACTAL_BACKEND=putpixel ./frac1.py to compare with the old
+    #loop; otherwise NumPy is used where it is installed
+    backend = os.environ.get('FRACTAL_BACKEND')
+    if backend:
+        return backend
+    if numpy is not None:
+        return 'numpy'
+    return 'python'
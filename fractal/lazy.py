@@ -0,0 +1,62 @@
+#lazy.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Modules imported on first use.
+
+The scripts need Tkinter, ImageTk and tkSnack only once a window is opened
+or a sound is played, and importing them (tkSnack in particular, and
+Tkinter on a machine without a display) is slow or fails outright on a
+headless machine. lazyImport() returns a stand-in which imports the module
+the first time one of its attributes is used, so the scripts keep writing
+Tkinter.Tk() and ImageTk.PhotoImage() while importing them costs nothing:
+
+Tkinter = fractal.lazyImport('Tkinter', 'tkinter')
+ImageTk = fractal.lazyImport('PIL.ImageTk')
+
+With several names, the first one which imports is used (here Tkinter under
+Python 2, tkinter under Python 3).
+'''
+
+import importlib
+
+
+class LazyModule(object):
+    #stand-in for a module, imported when an attribute is first read
+
+    def __init__(self, *names):
+        self.__dict__['_names'] = names
+        self.__dict__['_module'] = None
+
+    def __repr__(self):
+        return '<lazy module %s>' % ' or '.join(self._names)
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            error = None
+            for name in self._names:
+                try:
+                    module = importlib.import_module(name)
+                    break
+                except ImportError as exception:
+                    error = exception
+            else:
+                raise error
+            self.__dict__['_module'] = module
+        return module
+
+    def loaded(self):
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._load(), attribute, value)
+
+
+def lazyImport(*names):
+    #LazyModule for the first of names which imports
+    return LazyModule(*names)
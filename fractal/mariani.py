@@ -0,0 +1,236 @@
+#mariani.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Mariani-Silver rectangle subdivision.
+
+Large parts of the image are a single color: the black interior of the set
+and the outer (25, 15, 105) band. The renderer starts with the whole frame as
+one rectangle and
+
+- computes the pixels on its border,
+- if every border pixel has the same count, fills the inside with it when
+  that is proven to be the count of every inside pixel (see below),
+- otherwise splits the rectangle in two along its longer side (the halves
+  share the dividing line) and repeats, down to rectangles of minSize pixels
+  across, whose insides are computed pixel by pixel.
+
+Equal counts on the border are not enough: a filament of the set, or a
+channel of escaping points, thinner than a pixel can slip between two border
+samples, and then pixels inside have other counts. So the border only picks
+the rectangles worth trying, and a fill is made only on a proof that the
+numpy kernel would give every inside pixel the fill count:
+
+- an escaped count k is proven with interval arithmetic. The pixels' values
+  of a and b (and so of x and y for a Julia set) lie between those of the
+  corner pixels, and the kernel's steps x*x - y*y - a, 2.00*x*y - b and
+  x_new*x_new + y_new*y_new are each monotonic in their arguments, rounding
+  included. Carrying out the same floating point operations on the lower and
+  upper bounds therefore bounds the kernel's own mzsq for every inside pixel
+  at every counter. If the upper bound stays <= 4.0 up to counter k - 1 and
+  the lower bound is > 4.0 at counter k, every inside pixel escapes at
+  exactly k. (With periodicity=True an orbit could be cut short by the
+  periodicity check, so escaped counts are then never filled.)
+- the interior count is proven, for the Mandelbrot set with interiorTest on,
+  by the closed-form cardioid and period-2 bulb test, which the kernel itself
+  uses to skip those pixels: every inside pixel must pass it. Other interior
+  components cannot be proven without iterating them, and are computed.
+
+The output is therefore identical to the numpy backend's, pixel for pixel.
+The proofs cost a few interval steps per candidate rectangle. They fail,
+leaving the rectangle to be split, near the set and in bands of high counts,
+where the bounds widen faster than the orbits part, so the pixels saved are
+mostly those of the outer bands, which the numpy kernel drops early anyway.
+
+Rectangles are processed a level at a time, as arrays, so that the border
+pixels of all rectangles of one level (with the insides of the small
+rectangles of the level before) go to the NumPy kernel in a single call, and
+the candidate fills of a level are proven together. The number of pixels
+evaluated is reported in stats.
+'''
+
+from . import kernels
+
+#rectangles this many pixels across (or fewer) are computed in full
+MIN_SIZE = 6
+
+
+def _square(low, high):
+    #bounds of x*x over low <= x <= high, as the kernel rounds it
+    numpy = kernels.numpy
+    lowSquare = low*low
+    highSquare = high*high
+    upper = numpy.maximum(lowSquare, highSquare)
+    lower = numpy.where(low >= 0.0, lowSquare,
+                        numpy.where(high <= 0.0, highSquare, 0.0))
+    return lower, upper
+
+
+def provenEscapes(x, y, a, b, targets):
+    #for candidate rectangles whose pixels have x, y, a and b within the
+    #given (low, high) arrays of bounds, True where every pixel provably
+    #escapes at counter targets[k] in the numpy kernel (see the module
+    #docstring)
+    numpy = kernels.numpy
+    xLow, xHigh = x
+    yLow, yHigh = y
+    aLow, aHigh = a
+    bLow, bHigh = b
+    proven = numpy.ones(len(targets), dtype=bool)
+    with numpy.errstate(over='ignore', invalid='ignore'):
+        for counter in range(int(targets.max()) + 1 if len(targets) else 0):
+            xSquare = _square(xLow, xHigh)
+            ySquare = _square(yLow, yHigh)
+            xNewLow = (xSquare[0] - ySquare[1]) - aHigh
+            xNewHigh = (xSquare[1] - ySquare[0]) - aLow
+            corners = (2.00*xLow*yLow, 2.00*xLow*yHigh, 2.00*xHigh*yLow,
+                       2.00*xHigh*yHigh)
+            yNewLow = numpy.minimum.reduce(corners) - bHigh
+            yNewHigh = numpy.maximum.reduce(corners) - bLow
+            xNewSquare = _square(xNewLow, xNewHigh)
+            yNewSquare = _square(yNewLow, yNewHigh)
+            mzsqLow = xNewSquare[0] + yNewSquare[0]
+            mzsqHigh = xNewSquare[1] + yNewSquare[1]
+            #comparisons with nan are False, so a nan bound never proves
+            proven = proven & numpy.where(counter < targets,
+                                          mzsqHigh <= 4.0,
+                                          (counter > targets)
+                                          | (mzsqLow > 4.0))
+            xLow, xHigh, yLow, yHigh = xNewLow, xNewHigh, yNewLow, yNewHigh
+    return proven
+
+
+def _spans(starts, lengths):
+    #the ranges starts[k] .. starts[k] + lengths[k] - 1 one after another, and
+    #the index k of the range each element comes from
+    numpy = kernels.numpy
+    index = numpy.repeat(numpy.arange(len(lengths)), lengths)
+    offsets = numpy.cumsum(lengths) - lengths
+    return index, starts[index] + numpy.arange(index.size) - offsets[index]
+
+
+def marianiCounts(viewport, kind='mandelbrot', c1=0.0, c2=0.0, maxiter=20,
+                  minSize=MIN_SIZE, stats=None, **options):
+    #iteration counts of viewport by rectangle subdivision, identical to
+    #numpyCounts
+    numpy = kernels.numpy
+    if numpy is None:
+        raise ImportError('the mariani backend requires NumPy')
+
+    width = viewport.width
+    height = viewport.height
+    counts = numpy.zeros((height, width), dtype=numpy.int32)
+    known = numpy.zeros((height, width), dtype=bool)
+    interior = maxiter + 1
+    interiorTest = kind == 'mandelbrot' and options.get('interiorTest', True)
+    fillEscaped = not options.get('periodicity', False)
+    #pixel coordinates exactly as the kernel computes them
+    aValues = viewport.left + (viewport.mOffset + numpy.arange(width)
+                               )/viewport.scale
+    bValues = viewport.top - (viewport.nOffset + numpy.arange(height)
+                              )/viewport.scale
+    #bulbs[n, m]: pixels above and left of (m, n) which the kernel skips as
+    #being in the main cardioid or the period-2 bulb
+    bulbs = numpy.zeros((height + 1, width + 1), dtype=numpy.int64)
+    if interiorTest:
+        inside = kernels.inMainBulbs(aValues[None, :], bValues[:, None])
+        bulbs[1:, 1:] = inside.cumsum(0).cumsum(1)
+    evaluated = [0]
+
+    def evaluate(rows, columns):
+        #compute the pixels (columns[k], rows[k]) which are not yet known
+        unknown = ~known[rows, columns]
+        rows = rows[unknown]
+        columns = columns[unknown]
+        if not rows.size:
+            return
+        #pixels shared by neighbouring borders appear more than once
+        flat = numpy.unique(rows*width + columns)
+        rows = flat // width
+        columns = flat % width
+        counts[rows, columns] = kernels.numpyPixelCounts(
+            viewport, columns, rows, kind, c1, c2, maxiter, stats=stats,
+            **options)
+        known[rows, columns] = True
+        evaluated[0] = evaluated[0] + len(flat)
+
+    #one row per rectangle: left, top, right and bottom pixel
+    rectangles = numpy.array([[0, 0, width - 1, height - 1]])
+    #insides of the small rectangles of the last level, computed with the
+    #borders of this one to save a pass of the kernel
+    insideRows = insideColumns = numpy.zeros(0, dtype=int)
+    while len(rectangles):
+        m0, n0, m1, n1 = rectangles.T
+
+        #border pixels of every rectangle of this level
+        across, columns = _spans(m0, m1 - m0 + 1)
+        down, rows = _spans(n0, n1 - n0 + 1)
+        evaluate(numpy.concatenate((n0[across], n1[across], rows, rows,
+                                    insideRows)),
+                 numpy.concatenate((columns, columns, m0[down], m1[down],
+                                    insideColumns)))
+        edges = (counts[n0[across], columns], counts[n1[across], columns],
+                 counts[rows, m0[down]], counts[rows, m1[down]])
+        acrossStarts = numpy.cumsum(m1 - m0 + 1) - (m1 - m0 + 1)
+        downStarts = numpy.cumsum(n1 - n0 + 1) - (n1 - n0 + 1)
+        starts = (acrossStarts, acrossStarts, downStarts, downStarts)
+        low = numpy.minimum.reduce([numpy.minimum.reduceat(edge, start)
+                                    for edge, start in zip(edges, starts)])
+        high = numpy.maximum.reduce([numpy.maximum.reduceat(edge, start)
+                                     for edge, start in zip(edges, starts)])
+
+        #rectangles with an inside, and how many of its pixels are in the
+        #bulbs
+        hasInside = (m1 - m0 >= 2) & (n1 - n0 >= 2)
+        insideBulbs = (bulbs[n1, m1] - bulbs[n0 + 1, m1] - bulbs[n1, m0 + 1]
+                       + bulbs[n0 + 1, m0 + 1])
+        uniform = hasInside & (low == high)
+        fill = uniform & (low == interior) & (insideBulbs == (m1 - m0 - 1)*(
+            n1 - n0 - 1))
+        if not interiorTest:
+            fill[:] = False
+        candidates = numpy.flatnonzero(uniform & (low < interior)
+                                       & (insideBulbs == 0))
+        if fillEscaped and len(candidates):
+            #a falls and b rises with the pixel's column and row
+            a = (aValues[m0[candidates] + 1], aValues[m1[candidates] - 1])
+            b = (bValues[n1[candidates] - 1], bValues[n0[candidates] + 1])
+            if kind == 'mandelbrot':
+                zero = numpy.zeros(len(candidates))
+                proven = provenEscapes((zero, zero), (zero, zero), a, b,
+                                       low[candidates])
+            else:
+                proven = provenEscapes(a, b, (c1, c1), (c2, c2),
+                                       low[candidates])
+            fill[candidates[proven]] = True
+        for k in numpy.flatnonzero(fill):
+            counts[n0[k] + 1:n1[k], m0[k] + 1:m1[k]] = low[k]
+            known[n0[k] + 1:n1[k], m0[k] + 1:m1[k]] = True
+
+        #small rectangles are computed in full, the others split along the
+        #longer side
+        unfilled = hasInside & ~fill
+        small = unfilled & ((m1 - m0 <= minSize) | (n1 - n0 <= minSize))
+        insideWidth = (m1 - m0 - 1)[small]
+        index, pixel = _spans(numpy.zeros(len(insideWidth), dtype=int),
+                              insideWidth*(n1 - n0 - 1)[small])
+        insideRows = n0[small][index] + 1 + pixel // insideWidth[index]
+        insideColumns = m0[small][index] + 1 + pixel % insideWidth[index]
+        split = unfilled & ~small
+        wide = split & (m1 - m0 >= n1 - n0)
+        tall = split & ~wide
+        middle = (m0 + m1)//2
+        centre = (n0 + n1)//2
+        rectangles = numpy.concatenate((
+            numpy.column_stack((m0, n0, middle, n1))[wide],
+            numpy.column_stack((middle, n0, m1, n1))[wide],
+            numpy.column_stack((m0, n0, m1, centre))[tall],
+            numpy.column_stack((m0, centre, m1, n1))[tall]))
+    evaluate(insideRows, insideColumns)
+
+    kernels.addStats(stats, evaluated=evaluated[0])
+    return counts
+
+
+kernels.registerBackend('mariani', marianiCounts)
@@ -0,0 +1,379 @@
+#music.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Note sequences derived from iteration counts, for mandel_music.py.
+
+The original script appended one float to a list for every step of the
+escape loop which met a condition, 500,000 times at most: counter being in
+the range of a rule (first, last, frequency) and mzsq > 4.0. The loop did not
+stop at the first escape, so a pixel's notes depend on its whole orbit, not
+just on its count: most escaped orbits grow until x*x overflows to inf, the
+next step gives inf - inf = nan, and from then on mzsq > 4.0 is false and the
+pixel adds no more notes (an orbit can also fall back inside the circle for
+a step). The default rules are those of the script:
+
+counter 16 - 17    E5 (2*329.6276 Hz)
+counter 18 - 20    C5 (2*261.6256 Hz)
+
+noteSequence() therefore replays the orbits, with NumPy all at once, of the
+pixels whose count shows they escaped in time to play a note, with the same
+arithmetic as the script, and keeps one note for every step at which mzsq >
+4.0 and counter is in a rule's range (the first such rule, as in the
+script's chain of elifs). The pixels are visited column by column as the
+script did (or row by row), so the notes come out in the script's order, and
+the result is stored run-length encoded: consecutive notes of the same
+frequency become one (frequency, repeats) pair, held in an array('f') and an
+array('I'). The default view gives 75,171 notes (39,469 E5 and 35,702 C5)
+in 27,065 pairs, note for note the list the script built.
+
+Player plays a NoteSequence without ever blocking the caller. A producer
+thread cuts the runs into chunks of at most chunkNotes notes, each a
+pre-synthesized buffer of 16-bit PCM (every distinct tone is synthesized
+once and repeated), and puts them on a bounded queue a few chunks ahead of
+playback. pump(), called from the GUI's event loop (root.after in
+mandel_music.py), hands the chunks to an output object which plays them one
+after another in the background:
+
+output.write(data)    queue a chunk of samples, returning at once
+output.pending()      chunks written and not yet finished
+output.stop()         silence at once and forget the queued chunks
+
+stop() and seek() silence the output and drop the queue, so they take
+effect immediately whatever the length of the sequence.
+'''
+
+import bisect
+import math
+import sys
+import threading
+from array import array
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from . import kernels
+
+#(first counter, last counter, frequency in Hz)
+NOTE_RULES = [(16, 17, 2*329.6276),     #E5
+              (18, 20, 2*261.6256)]     #C5
+
+#most notes kept, as maxarray in mandel_music.py
+MAX_NOTES = 500000
+
+#Snack's default sample rate, and the length and amplitude of the tones of
+#mandel_music.py (its generator filter made int(dur*11500) samples, dur = 2)
+SAMPLE_RATE = 16000
+NOTE_SAMPLES = 23000
+AMPLITUDE = 30000
+
+#notes per synthesized chunk, and chunks kept ready ahead of playback
+CHUNK_NOTES = 4
+AHEAD = 3
+
+
+class NoteSequence(object):
+    #run-length encoded notes: frequencies[k] repeated repeats[k] times
+
+    def __init__(self, frequencies=None, repeats=None):
+        self.frequencies = frequencies if frequencies is not None else array('f')
+        self.repeats = repeats if repeats is not None else array('I')
+        #number of notes before each run, for note() and seeking
+        self.starts = array('L')
+        total = 0
+        for repeat in self.repeats:
+            self.starts.append(total)
+            total = total + repeat
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        for frequency, repeat in zip(self.frequencies, self.repeats):
+            for step in range(repeat):
+                yield frequency
+
+    def runs(self, start=0):
+        #(frequency, repeats) pairs from note number start on, the first one
+        #shortened if start falls inside it
+        if start >= self.total:
+            return
+        run = bisect.bisect_right(self.starts, start) - 1
+        skip = start - self.starts[run]
+        for k in range(run, len(self.repeats)):
+            yield self.frequencies[k], self.repeats[k] - skip
+            skip = 0
+
+    def note(self, number):
+        #frequency of note number (counting from 0)
+        if not 0 <= number < self.total:
+            raise IndexError('note %d of %d' % (number, self.total))
+        return self.frequencies[bisect.bisect_right(self.starts, number) - 1]
+
+    __getitem__ = note
+
+
+def _append(frequencies, repeats, frequency, count):
+    if count <= 0:
+        return
+    if frequencies and frequencies[-1] == frequency:
+        repeats[-1] = repeats[-1] + count
+    else:
+        frequencies.append(frequency)
+        repeats.append(count)
+
+
+def _stepTones(rules, maxiter):
+    #frequency of the note played at each counter 0..last (0.0 for none),
+    #from the first rule whose range holds it, as the script's elifs
+    last = min(max([rule[1] for rule in rules] + [-1]), maxiter)
+    tones = [0.0]*(last + 1)
+    for counter in range(last + 1):
+        for first, ruleLast, frequency in rules:
+            if first <= counter <= ruleLast:
+                tones[counter] = frequency
+                break
+    return tones
+
+
+def noteSequence(frame, rules=NOTE_RULES, limit=MAX_NOTES, order='columns'):
+    #NoteSequence of the orbits of frame's pixels; order is 'columns' (m
+    #outer, as in mandel_music.py) or 'rows'; limit=None keeps every note
+    if order not in ('columns', 'rows'):
+        raise ValueError("order must be 'columns' or 'rows'")
+    tones = _stepTones(rules, frame.maxiter)
+    numpy = kernels.numpy
+    if numpy is None or isinstance(frame.counts, array):
+        return _pythonNotes(frame, tones, limit, order)
+
+    viewport = frame.viewport
+    width = viewport.width
+    height = viewport.height
+    counts = numpy.asarray(frame.counts).reshape(height, width)
+    columns = numpy.arange(width)
+    rows = numpy.arange(height)
+    if order == 'columns':
+        counts = counts.T
+        columns, rows = numpy.meshgrid(columns, rows, indexing='ij')
+    else:
+        rows, columns = numpy.meshgrid(rows, columns, indexing='ij')
+    #until its first escape an orbit is inside the circle, so only pixels
+    #which escaped by the last counter with a note can play one
+    playing = [counter for counter in range(len(tones)) if tones[counter]]
+    if not playing:
+        return NoteSequence()
+    pixels = numpy.flatnonzero(counts.reshape(-1) <= playing[-1])
+    columns = columns.reshape(-1)[pixels]
+    rows = rows.reshape(-1)[pixels]
+    a = viewport.left + (viewport.mOffset + columns)/viewport.scale
+    b = viewport.top - (viewport.nOffset + rows)/viewport.scale
+    if frame.kind == 'mandelbrot':
+        x = numpy.zeros_like(a)
+        y = numpy.zeros_like(b)
+        ca = a
+        cb = b
+    else:
+        x = a
+        y = b
+        ca = frame.c[0]
+        cb = frame.c[1]
+
+    #notes[k, s]: frequency of the note of pixel k at the s-th counter with
+    #a note, or 0.0 for none
+    notes = numpy.zeros((len(pixels), len(playing)), dtype=numpy.float32)
+    with numpy.errstate(over='ignore', invalid='ignore'):
+        for counter in range(playing[-1] + 1):
+            x_new = x*x - y*y - ca
+            y_new = 2.00*x*y - cb
+            mzsq = x_new*x_new + y_new*y_new
+            if tones[counter]:
+                notes[:, playing.index(counter)] = numpy.where(
+                    mzsq > 4.0, numpy.float32(tones[counter]), 0.0)
+            x = x_new
+            y = y_new
+    notes = notes.reshape(-1)
+    notes = notes[notes != 0.0]
+    if limit is not None:
+        notes = notes[:limit]
+
+    if not notes.size:
+        return NoteSequence()
+    #merge neighbouring notes of the same frequency into runs
+    starts = numpy.flatnonzero(numpy.concatenate(([True],
+                                                  notes[1:] != notes[:-1])))
+    repeats = numpy.diff(numpy.append(starts, notes.size))
+    return NoteSequence(array('f', notes[starts].tobytes()),
+                        array('I', repeats.astype(numpy.uint32).tobytes()))
+
+
+def _pythonNotes(frame, tones, limit, order):
+    #the script's loop, pixel by pixel
+    viewport = frame.viewport
+    width = viewport.width
+    height = viewport.height
+    frequencies = array('f')
+    repeats = array('I')
+    total = 0
+    if order == 'columns':
+        pixels = ((m, n) for m in range(width) for n in range(height))
+    else:
+        pixels = ((m, n) for n in range(height) for m in range(width))
+    for m, n in pixels:
+        if frame.count(m, n) >= len(tones):
+            continue
+        a = viewport.aValue(m)
+        b = viewport.bValue(n)
+        if frame.kind == 'mandelbrot':
+            x = 0.0
+            y = 0.0
+            ca = a
+            cb = b
+        else:
+            x = a
+            y = b
+            ca, cb = frame.c
+        for counter in range(len(tones)):
+            x_new = x*x - y*y - ca
+            y_new = 2.00*x*y - cb
+            mzsq = x_new*x_new + y_new*y_new
+            if mzsq > 4.0 and tones[counter]:
+                _append(frequencies, repeats, array('f', [tones[counter]])[0],
+                        1)
+                total = total + 1
+                if limit is not None and total >= limit:
+                    return NoteSequence(frequencies, repeats)
+            x = x_new
+            y = y_new
+    return NoteSequence(frequencies, repeats)
+
+
+def toneSamples(frequency, length=NOTE_SAMPLES, amplitude=AMPLITUDE,
+                rate=SAMPLE_RATE):
+    #length samples of a sine wave as 16-bit little-endian PCM bytes
+    numpy = kernels.numpy
+    if numpy is not None:
+        phase = (2*math.pi*frequency/rate)*numpy.arange(length)
+        return (amplitude*numpy.sin(phase)).astype('<i2').tobytes()
+    samples = array('h', [int(amplitude*math.sin(2*math.pi*frequency*k/rate))
+                          for k in range(length)])
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    if hasattr(samples, 'tobytes'):
+        return samples.tobytes()
+    return samples.tostring()
+
+
+class Player(object):
+    #plays a NoteSequence through an output (see the module docstring);
+    #pump() must be called regularly from the thread which owns the output
+
+    def __init__(self, notes, output, noteSamples=NOTE_SAMPLES,
+                 amplitude=AMPLITUDE, rate=SAMPLE_RATE,
+                 chunkNotes=CHUNK_NOTES, ahead=AHEAD):
+        self.notes = notes
+        self.output = output
+        self.noteSamples = noteSamples
+        self.amplitude = amplitude
+        self.rate = rate
+        self.chunkNotes = chunkNotes
+        self.ahead = ahead
+        #synthesized tone of each frequency
+        self.tones = {}
+        self.toneLock = threading.Lock()
+        self.queue = None
+        self.halt = None
+        #first note of each chunk written to the output and not yet finished
+        self.written = []
+        self.finished = False
+        self.start = 0
+
+    def tone(self, frequency):
+        with self.toneLock:
+            samples = self.tones.get(frequency)
+            if samples is None:
+                samples = self.tones[frequency] = toneSamples(
+                    frequency, self.noteSamples, self.amplitude, self.rate)
+        return samples
+
+    def play(self, start=0):
+        #start playing from note number start, stopping anything playing
+        self.stop()
+        self.start = start
+        self.finished = False
+        self.queue = queue.Queue(self.ahead)
+        self.halt = threading.Event()
+        producer = threading.Thread(target=self._produce,
+                                    args=(start, self.queue, self.halt))
+        producer.daemon = True
+        producer.start()
+
+    def seek(self, note):
+        self.play(max(0, min(note, len(self.notes))))
+
+    def stop(self):
+        if self.halt is not None:
+            self.halt.set()
+        self.queue = None
+        self.halt = None
+        self.written = []
+        self.output.stop()
+
+    def playing(self):
+        return self.queue is not None
+
+    def position(self):
+        #number of the first note of the chunk now playing
+        pending = self.output.pending()
+        if pending and pending <= len(self.written):
+            return self.written[-pending]
+        return self.start
+
+    def pump(self):
+        #hand the chunks ready to the output until it holds ahead of them;
+        #returns False once the sequence has been played or stopped
+        if self.queue is None:
+            return False
+        while not self.finished and self.output.pending() < self.ahead:
+            try:
+                chunk = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if chunk is None:
+                self.finished = True
+                break
+            number, data = chunk
+            self.output.write(data)
+            self.written.append(number)
+        del self.written[:-self.ahead]
+        if self.finished and not self.output.pending():
+            self.start = len(self.notes)
+            self.queue = None
+            self.halt = None
+            return False
+        return True
+
+    def _put(self, chunks, halt, chunk):
+        #put chunk on the bounded queue, waiting for room unless halted
+        while not halt.is_set():
+            try:
+                chunks.put(chunk, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self, start, chunks, halt):
+        number = start
+        for frequency, repeats in self.notes.runs(start):
+            tone = self.tone(frequency)
+            while repeats > 0:
+                count = min(repeats, self.chunkNotes)
+                if not self._put(chunks, halt, (number, tone*count)):
+                    return
+                number = number + count
+                repeats = repeats - count
+        self._put(chunks, halt, None)
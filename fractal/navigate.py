@@ -0,0 +1,142 @@
+#navigate.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Panning and zooming that reuse the counts already computed.
+
+All the views reached by panning and zooming keep the left and top of the
+view they started from and change only the scale and the pixel offsets
+(Viewport.mOffset and nOffset), so a pixel's value of a is always
+
+a = left + (mOffset + m)/scale
+
+Panning by whole pixels moves the offsets, and every pixel still on screen
+has exactly the coordinates it had before. Zooming by a power of two keeps
+the old pixels on the new grid: zooming in by 2 puts old pixel p at new
+pixel 2*p (2*p/(2*scale) is p/scale to the last bit), zooming out by 2 puts
+new pixel P at old pixel 2*P.
+
+reuseFrame() therefore builds a frame for the new viewport by copying every
+pixel which lines up with one of the old frame, and computing only the rest
+with the numpy kernel: the exposed strips after a pan, three pixels in four
+after zooming in by 2. The reused pixels are identical to a full render, so
+the result is exact. panFrame() and zoomFrame() work out the viewport, and
+linesUp() tells whether any other viewport (a rubber-band zoom, say) can be
+built this way or needs a render of its own:
+
+frame = computeFrame()
+frame = panFrame(frame, 10, -4)               #10 pixels right, 4 up
+frame = zoomFrame(frame, 400, 300, 2)         #zoom in about the center
+'''
+
+from . import kernels
+from .render import Frame
+from .viewport import Viewport
+
+
+def panViewport(viewport, dm, dn):
+    #viewport moved dm pixels right and dn pixels down
+    return Viewport(viewport.width, viewport.height, viewport.left,
+                    viewport.top, viewport.scale, viewport.mOffset + dm,
+                    viewport.nOffset + dn)
+
+
+def zoomViewport(viewport, m, n, zoom):
+    #viewport zoomed by zoom (2 zooms in, 0.5 out) keeping pixel (m, n) at
+    #the same place on screen (to the nearest pixel)
+    return Viewport(viewport.width, viewport.height, viewport.left,
+                    viewport.top, viewport.scale*zoom,
+                    int(round((viewport.mOffset + m)*zoom - m)),
+                    int(round((viewport.nOffset + n)*zoom - n)))
+
+
+def _powerOfTwo(ratio):
+    #k such that ratio == 2**k, or None
+    k = 0
+    while ratio > 1.0 and k < 64:
+        ratio = ratio/2.0
+        k = k + 1
+    while ratio < 1.0 and k > -64:
+        ratio = ratio*2.0
+        k = k - 1
+    return k if ratio == 1.0 else None
+
+
+def _sourcePixels(numpy, count, offset, oldOffset, oldCount, k):
+    #for each new pixel 0..count-1, the old pixel with the same coordinate,
+    #or -1 if none lines up
+    pixels = numpy.arange(count) + offset
+    if k >= 0:
+        #zoomed in (or panned): new pixel P is old pixel P/2**k when exact
+        step = 1 << k
+        lined = pixels % step == 0
+        old = pixels // step - oldOffset
+    else:
+        lined = True
+        old = pixels*(1 << -k) - oldOffset
+    return numpy.where(lined & (old >= 0) & (old < oldCount), old, -1)
+
+
+def linesUp(source, viewport):
+    #True if viewport shares source's left and top and its scale is a power
+    #of two times source's, so that reuseFrame() can build it from source
+    old = source.viewport
+    return (viewport.left == old.left and viewport.top == old.top
+            and _powerOfTwo(viewport.scale/old.scale) is not None)
+
+
+def reuseFrame(source, viewport, **options):
+    #Frame of viewport reusing every pixel of source which lines up with one
+    #of its own (see the module docstring); stats['reusedPixels'] counts
+    #them. viewport must share source's left and top, with a scale a power
+    #of two times source's. options go to the numpy kernel.
+    numpy = kernels.numpy
+    if numpy is None:
+        raise ImportError('reusing counts requires NumPy')
+    if not linesUp(source, viewport):
+        raise ValueError('the viewport does not line up with the frame')
+    old = source.viewport
+    k = _powerOfTwo(viewport.scale/old.scale)
+    c1, c2 = source.c
+    oldColumns = _sourcePixels(numpy, viewport.width, viewport.mOffset,
+                               old.mOffset, old.width, k)
+    oldRows = _sourcePixels(numpy, viewport.height, viewport.nOffset,
+                            old.nOffset, old.height, k)
+    reusedColumns = numpy.flatnonzero(oldColumns >= 0)
+    reusedRows = numpy.flatnonzero(oldRows >= 0)
+    newColumns = numpy.flatnonzero(oldColumns < 0)
+    newRows = numpy.flatnonzero(oldRows < 0)
+
+    counts = numpy.empty((viewport.height, viewport.width), dtype=numpy.int32)
+    oldCounts = numpy.asarray(source.counts).reshape(old.height, old.width)
+    if len(reusedRows) and len(reusedColumns):
+        counts[numpy.ix_(reusedRows, reusedColumns)] = oldCounts[
+            numpy.ix_(oldRows[reusedRows], oldColumns[reusedColumns])]
+
+    #as in progressive.py: rows with nothing to reuse in full, the other
+    #rows only in the columns with nothing to reuse
+    stats = {}
+    allColumns = numpy.arange(viewport.width)
+    for gridRows, gridColumns in ((newRows, allColumns),
+                                  (reusedRows, newColumns)):
+        if len(gridRows) and len(gridColumns):
+            counts[numpy.ix_(gridRows, gridColumns)] = \
+                kernels.numpyGridCounts(viewport, gridColumns, gridRows,
+                                        source.kind, c1, c2, source.maxiter,
+                                        stats=stats, **options)
+    stats['reusedPixels'] = len(reusedRows)*len(reusedColumns)
+    return Frame(counts, viewport, source.maxiter, source.kind, source.c,
+                 stats)
+
+
+def panFrame(frame, dm, dn, **options):
+    #frame moved dm pixels right and dn pixels down, computing only the
+    #strips which come into view
+    return reuseFrame(frame, panViewport(frame.viewport, dm, dn), **options)
+
+
+def zoomFrame(frame, m, n, zoom, **options):
+    #frame zoomed by a power of two about pixel (m, n)
+    return reuseFrame(frame, zoomViewport(frame.viewport, m, n, zoom),
+                      **options)
@@ -0,0 +1,141 @@
+#palette.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Colors used for the escape-time images.
+
+The scripts color a pixel according to the value of counter at which the
+square modulus mzsq first exceeds 4.0:
+
+counter  0 - 13    (25, 15, 105)
+counter 14 - 15    (45, 20, 160)
+counter 16 - 17    (65, 25, 180)
+counter 18 - 20    (75, 30, 235)
+never escaped      (0, 0, 0)
+
+When the iteration limit is raised above 20 the last band is extended to cover
+every escaped pixel from counter 18 upwards.
+
+Coloring is kept apart from the kernels, which only produce counts. A palette
+turns maxiter into a lookup table with one color per counter (and the interior
+color at maxiter + 1), which Frame.image() applies to the whole frame in one
+NumPy indexing operation (or, for the python kernel's counts, as the palette
+of a "P" image). Recoloring a frame therefore takes a few milliseconds and
+never touches the orbits. Two kinds of palette are provided:
+
+BandPalette(bands, interior)
+    the scheme above for any list of (last counter, color) bands; the
+    default is BandPalette(BANDS, INTERIOR)
+
+GradientPalette(colors, period, interior, smooth)
+    a cyclic gradient through colors, repeating every period counters. With
+    smooth=True and a frame computed with magnitudes=True, every pixel is
+    colored at its fractional escape count
+
+    nu = counter + 1 - log2(log2(mzsq)/2)
+
+    which removes the steps between the bands (log2(mzsq)/2 is log2|z|, and
+    the bailout radius is 2).
+
+frame.image(GradientPalette(GRADIENT, 32, smooth=True))
+'''
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BANDS = [(13, (25, 15, 105)),
+         (15, (45, 20, 160)),
+         (17, (65, 25, 180)),
+         (20, (75, 30, 235))]
+
+INTERIOR = (0, 0, 0)
+
+#stops of a blue-white-orange gradient for GradientPalette
+GRADIENT = [(0, 7, 100), (32, 107, 203), (237, 255, 255), (255, 170, 0),
+            (0, 2, 0)]
+
+
+def bandColor(counter, maxiter=20):
+    #color of a pixel which escaped at counter, or INTERIOR if it never did
+    return DEFAULT_PALETTE.color(counter, maxiter)
+
+
+def colorTable(maxiter=20):
+    #list of colors indexed by counter, with the interior color at maxiter + 1
+    return DEFAULT_PALETTE.table(maxiter)
+
+
+class BandPalette(object):
+    #one color per band of counters, as in the original scripts
+
+    smooth = False
+
+    def __init__(self, bands=BANDS, interior=INTERIOR):
+        self.bands = list(bands)
+        self.interior = interior
+
+    def color(self, counter, maxiter=20):
+        if counter > maxiter:
+            return self.interior
+        for upper, color in self.bands:
+            if counter <= upper:
+                return color
+        return self.bands[-1][1]
+
+    def table(self, maxiter=20):
+        return [self.color(counter, maxiter) for counter in range(maxiter + 2)]
+
+
+class GradientPalette(object):
+    #cyclic gradient through colors, period counters per cycle
+
+    def __init__(self, colors=GRADIENT, period=32, interior=INTERIOR,
+                 smooth=False):
+        if len(colors) < 2:
+            raise ValueError('a gradient needs at least two colors')
+        self.colors = list(colors)
+        self.period = float(period)
+        self.interior = interior
+        self.smooth = smooth
+
+    def _position(self, value):
+        #gradient color at fractional counter value
+        steps = len(self.colors)
+        where = (value/self.period % 1.0)*steps
+        k = int(where)
+        t = where - k
+        start = self.colors[k % steps]
+        end = self.colors[(k + 1) % steps]
+        return tuple(int(round(start[i] + (end[i] - start[i])*t))
+                     for i in range(3))
+
+    def color(self, counter, maxiter=20):
+        if counter > maxiter:
+            return self.interior
+        return self._position(counter)
+
+    def table(self, maxiter=20):
+        return [self.color(counter, maxiter) for counter in range(maxiter + 2)]
+
+    def smoothColors(self, counts, magnitudes, maxiter=20):
+        #height x width x 3 uint8 colors at the fractional escape counts
+        if numpy is None:
+            raise ImportError('smooth coloring requires NumPy')
+        escaped = counts <= maxiter
+        mzsq = numpy.where(escaped, magnitudes, 16.0).astype(numpy.float64)
+        nu = counts + 1 - numpy.log2(numpy.log2(mzsq)/2)
+        steps = len(self.colors)
+        where = (nu/self.period % 1.0)*steps
+        k = numpy.floor(where).astype(numpy.intp) % steps
+        t = (where - numpy.floor(where))[..., None]
+        stops = numpy.array(self.colors, dtype=numpy.float64)
+        rgb = stops[k] + (stops[(k + 1) % steps] - stops[k])*t
+        rgb = numpy.rint(rgb).astype(numpy.uint8)
+        rgb[~escaped] = self.interior
+        return rgb
+
+
+DEFAULT_PALETTE = BandPalette()
@@ -0,0 +1,223 @@
+#parallel.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Multi-core rendering.
+
+The viewport is cut into tiles (by default bands of whole rows), and each
+tile is handed to a worker from a concurrent.futures pool. The workers run one
+of the counting kernels on their tile and write the counts straight into a
+single int32 framebuffer held in multiprocessing.shared_memory, so nothing but
+the tile description travels between processes and no counts are pickled back
+to the parent.
+
+A thread pool can be used instead of processes. The NumPy kernel spends most
+of its time in array operations which release the GIL, so threads avoid the
+cost of starting processes for small frames; the pure-Python kernel holds the
+GIL and should always be run in processes.
+
+The number of workers defaults to the number of CPUs and can be set with the
+FRACTAL_WORKERS environment variable or the workers argument. Pools are kept
+between renders so that the GUI does not pay for starting them every time;
+call shutdown() to release them.
+
+Requires Python 3.8 or later (multiprocessing.shared_memory).
+'''
+
+import os
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+from . import instrument
+from . import kernels
+
+#bands handed out per worker; more bands than workers evens out the cost of
+#bands which fall across the interior of the set
+BANDS_PER_WORKER = 4
+
+_pools = {}
+
+
+def workerCount(workers=None):
+    if workers is None:
+        workers = os.environ.get('FRACTAL_WORKERS') or os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def getPool(workers, threads=False):
+    #one pool per (threads, workers), reused between renders
+    key = (threads, workers)
+    if key not in _pools:
+        if threads:
+            _pools[key] = ThreadPoolExecutor(workers)
+        else:
+            _pools[key] = ProcessPoolExecutor(workers)
+    return _pools[key]
+
+
+def shutdown():
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
+
+
+def _storeCounts(buf, frameWidth, m, n, tile, counts):
+    #copy the counts of tile into the int32 framebuffer buf, whose rows are
+    #frameWidth pixels wide, with the top left pixel of the tile at (m, n)
+    if isinstance(counts, array):
+        counts = array('i', counts)
+    else:
+        counts = counts.astype('int32').reshape(-1)
+    width = tile.width
+    with memoryview(counts) as source, buf.cast('B') as raw:
+        with raw.cast('i') as target:
+            for row in range(tile.height):
+                start = (n + row)*frameWidth + m
+                target[start:start + width] = source[row*width:(row + 1)*width]
+
+
+def renderTile(shmName, frameWidth, m, n, tile, kind, c1, c2, maxiter,
+               kernel, options):
+    #process worker: iterate one tile and write it into the shared framebuffer,
+    #returning the time spent in the worker and the kernel's stats
+    start = time.time()
+    stats = {}
+    counts = kernels.countBackend(kernel)(tile, kind, c1, c2, maxiter,
+                                          stats=stats, **options)
+    shm = shared_memory.SharedMemory(name=shmName)
+    try:
+        _storeCounts(shm.buf, frameWidth, m, n, tile, counts)
+    finally:
+        shm.close()
+    return time.time() - start, stats
+
+
+def renderTileLocal(buf, frameWidth, m, n, tile, kind, c1, c2, maxiter,
+                    kernel, options):
+    #thread worker: as renderTile, with the framebuffer in this process
+    start = time.time()
+    stats = {}
+    counts = kernels.countBackend(kernel)(tile, kind, c1, c2, maxiter,
+                                          stats=stats, **options)
+    _storeCounts(buf, frameWidth, m, n, tile, counts)
+    return time.time() - start, stats
+
+
+def copyCounts(buf, viewport):
+    #copy the framebuffer out into the count type used by the kernels
+    if kernels.numpy is not None:
+        counts = kernels.numpy.frombuffer(buf, dtype=kernels.numpy.int32)
+        frameCounts = counts.reshape(viewport.height, viewport.width).copy()
+        del counts
+        return frameCounts
+    frameCounts = array('i')
+    frameCounts.frombytes(bytes(buf))
+    return frameCounts
+
+
+def splitRows(viewport, workers):
+    #bands of whole rows, BANDS_PER_WORKER per worker
+    count = min(viewport.height, workers*BANDS_PER_WORKER)
+    rows = -(-viewport.height // max(1, count))
+    return viewport.rowBands(rows)
+
+
+class Framebuffer(object):
+    #int32 count buffer for one frame, shared with the pool workers: held in
+    #shared memory for a process pool, in an ordinary bytearray for threads
+
+    def __init__(self, viewport, threads=False):
+        self.viewport = viewport
+        self.threads = threads
+        #kernel stats summed over the tiles collected so far
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.size = viewport.pixels*4
+        self.shm = None
+        if threads:
+            self.buf = memoryview(bytearray(self.size))
+        else:
+            if shared_memory is None:
+                raise ImportError('process rendering requires '
+                                  'multiprocessing.shared_memory (Python 3.8+)')
+            self.shm = shared_memory.SharedMemory(create=True,
+                                                  size=max(1, self.size))
+
+    def submit(self, pool, tile, kind, c1, c2, maxiter, kernel, options=None):
+        #start rendering tile (a sub-viewport of the frame) on pool, passing
+        #options on to the kernel; see collect()
+        options = options or {}
+        m = tile.mOffset - self.viewport.mOffset
+        n = tile.nOffset - self.viewport.nOffset
+        if self.threads:
+            return pool.submit(renderTileLocal, self.buf, self.viewport.width,
+                               m, n, tile, kind, c1, c2, maxiter, kernel,
+                               options)
+        return pool.submit(renderTile, self.shm.name, self.viewport.width,
+                           m, n, tile, kind, c1, c2, maxiter, kernel, options)
+
+    def collect(self, future):
+        #wait for a tile started by submit() and return the seconds the worker
+        #spent on it
+        seconds, stats = future.result()
+        with self.lock:
+            kernels.addStats(self.stats, **stats)
+        instrument.record('tile', seconds)
+        return seconds
+
+    def counts(self):
+        if self.threads:
+            return copyCounts(self.buf, self.viewport)
+        with self.shm.buf[:self.size] as buf:
+            return copyCounts(buf, self.viewport)
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+def defaultKernel():
+    #kernel run inside the workers
+    if kernels.numpy is not None:
+        return 'numpy'
+    return 'python'
+
+
+def parallelCounts(viewport, kind='mandelbrot', c1=0.0, c2=0.0, maxiter=20,
+                   workers=None, kernel=None, threads=False, tiles=None,
+                   stats=None, **options):
+    #iteration counts of viewport, computed tile by tile on a worker pool
+    #
+    #kernel names the counting kernel run by the workers (numpy if installed,
+    #otherwise python) and options are passed on to it; tiles is an optional
+    #list of sub-viewports of viewport to use instead of the default row bands
+    workers = workerCount(workers)
+    if kernel is None:
+        kernel = defaultKernel()
+    if tiles is None:
+        tiles = splitRows(viewport, workers)
+    pool = getPool(workers, threads)
+
+    framebuffer = Framebuffer(viewport, threads)
+    try:
+        futures = [framebuffer.submit(pool, tile, kind, c1, c2, maxiter, kernel,
+                                      options) for tile in tiles]
+        for future in futures:
+            framebuffer.collect(future)
+        kernels.addStats(stats, **framebuffer.stats)
+        return framebuffer.counts()
+    finally:
+        framebuffer.close()
+
+
+kernels.registerBackend('parallel', parallelCounts)
@@ -0,0 +1,114 @@
+#progressive.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Progressive, coarse-to-fine rendering.
+
+The first pass computes one pixel in 16 x 16 and shows each sample as a
+16 x 16 block, which takes a few milliseconds even at 800 x 600. Every
+following pass halves the spacing (8, 4, 2 and finally 1) and computes only
+the pixels which are not already on the coarser grid, so no sample is ever
+computed twice and the last pass leaves exactly the counts of a full render.
+
+progressivePasses() is a generator yielding (step, frame) after each pass,
+where frame holds the counts known so far spread over the blocks they stand
+for. ProgressiveRender runs the passes on a background thread and hands each
+frame to a callback, so that a Tk window can keep its event loop running while
+it renders (the callback is called on the render thread and must not touch Tk
+itself; see frac1.py for the queue and tkRoot.after() polling used there,
+and jobs.py, whose render jobs show a first pass as their preview).
+'''
+
+import threading
+
+from . import kernels
+from .render import Frame
+
+#spacing of the samples in each pass
+PASS_STEPS = (16, 8, 4, 2, 1)
+
+
+def progressivePasses(viewport, kind='mandelbrot', c=(0.0, 0.0), maxiter=20,
+                      steps=PASS_STEPS, **options):
+    #yield (step, Frame) after each pass; options go to the NumPy kernel
+    numpy = kernels.numpy
+    if numpy is None:
+        raise ImportError('progressive rendering requires NumPy')
+    for coarse, fine in zip(steps, steps[1:]):
+        if coarse % fine:
+            raise ValueError('each step must divide the one before it')
+
+    c1, c2 = float(c[0]), float(c[1])
+    width = viewport.width
+    height = viewport.height
+    counts = numpy.empty((height, width), dtype=numpy.int32)
+    stats = {}
+    samples = 0
+    previous = None
+
+    for step in steps:
+        rows = numpy.arange(0, height, step)
+        columns = numpy.arange(0, width, step)
+        if previous is None:
+            counts[numpy.ix_(rows, columns)] = \
+                kernels.numpyGridCounts(viewport, columns, rows, kind, c1, c2,
+                                        maxiter, stats=stats, **options)
+            samples = samples + len(rows)*len(columns)
+        else:
+            #rows not on the coarser grid are new in every column, rows on
+            #it only in the columns between the coarser samples
+            newRows = rows[rows % previous != 0]
+            oldRows = rows[rows % previous == 0]
+            newColumns = columns[columns % previous != 0]
+            for gridRows, gridColumns in ((newRows, columns),
+                                          (oldRows, newColumns)):
+                if len(gridRows) and len(gridColumns):
+                    counts[numpy.ix_(gridRows, gridColumns)] = \
+                        kernels.numpyGridCounts(viewport, gridColumns,
+                                                gridRows, kind, c1, c2,
+                                                maxiter, stats=stats,
+                                                **options)
+                    samples = samples + len(gridRows)*len(gridColumns)
+        previous = step
+
+        if step == 1:
+            shown = counts.copy()
+        else:
+            shown = counts[((numpy.arange(height)//step)*step)[:, None],
+                           ((numpy.arange(width)//step)*step)[None, :]]
+        passStats = dict(stats)
+        passStats['samples'] = samples
+        yield step, Frame(shown, viewport, maxiter, kind, (c1, c2), passStats)
+
+
+class ProgressiveRender(threading.Thread):
+    #runs progressivePasses() on a daemon thread, calling onPass(render, step,
+    #frame) after each pass; cancel() stops it at the end of the current pass
+
+    def __init__(self, viewport, kind='mandelbrot', c=(0.0, 0.0), maxiter=20,
+                 onPass=None, steps=PASS_STEPS, **options):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.viewport = viewport
+        self.kind = kind
+        self.c = c
+        self.maxiter = maxiter
+        self.onPass = onPass
+        self.steps = steps
+        self.options = options
+        self.cancelled = False
+        self.frame = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        for step, frame in progressivePasses(self.viewport, self.kind, self.c,
+                                             self.maxiter, self.steps,
+                                             **self.options):
+            if self.cancelled:
+                return
+            self.frame = frame
+            if self.onPass is not None:
+                self.onPass(self, step, frame)
@@ -0,0 +1,204 @@
+#render.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Front end to the kernels.
+
+computeFrame() runs a counting kernel over a viewport and returns a Frame,
+which holds the iteration counts and knows how to turn them into an image.
+renderImage() does both steps and returns a PIL image, and also accepts the
+image-only "putpixel" backend so that the old loop can be run side by side
+with the new ones.
+'''
+
+from array import array
+
+from . import instrument
+from . import kernels
+from .palette import DEFAULT_PALETTE
+from .symmetry import symmetricCounts
+from .viewport import Viewport
+
+
+class Frame(object):
+    #iteration counts for one viewport, interior pixels hold maxiter + 1
+
+    def __init__(self, counts, viewport, maxiter=20, kind='mandelbrot',
+                 c=(0.0, 0.0), stats=None, magnitudes=None):
+        self.counts = counts
+        self.viewport = viewport
+        self.maxiter = maxiter
+        self.kind = kind
+        self.c = c
+        #counters reported by the kernel, e.g. iterationsSaved
+        self.stats = stats if stats is not None else {}
+        #mzsq at escape of each pixel, if the kernel was asked for it
+        self.magnitudes = magnitudes
+
+    def count(self, m, n):
+        #iteration count of screen pixel (m, n)
+        if isinstance(self.counts, array):
+            return self.counts[n*self.viewport.width + m]
+        return int(self.counts[n, m])
+
+    def crop(self, m, n, width, height):
+        #Frame of the width x height pixels from (m, n); with NumPy counts
+        #(including memory-mapped ones) nothing is copied
+        if (m < 0 or n < 0 or width <= 0 or height <= 0
+                or m + width > self.viewport.width
+                or n + height > self.viewport.height):
+            raise ValueError('crop lies outside the %d x %d frame'
+                             % (self.viewport.width, self.viewport.height))
+        viewport = self.viewport.subViewport(m, n, width, height)
+        if isinstance(self.counts, array):
+            counts = array(self.counts.typecode)
+            for row in range(n, n + height):
+                start = row*self.viewport.width + m
+                counts.extend(self.counts[start:start + width])
+        else:
+            counts = self.counts[n:n + height, m:m + width]
+        magnitudes = None
+        if self.magnitudes is not None:
+            magnitudes = self.magnitudes[n:n + height, m:m + width]
+        return Frame(counts, viewport, self.maxiter, self.kind, self.c,
+                     dict(self.stats), magnitudes)
+
+    def iterations(self):
+        #iterations a first-escape loop spends on the frame, counting pixels
+        #skipped by the cardioid test or periodicity checking in full
+        maxiter = self.maxiter
+        if isinstance(self.counts, array):
+            return (sum(min(counter, maxiter) for counter in self.counts)
+                    + self.viewport.pixels)
+        return (int(kernels.numpy.minimum(self.counts, maxiter).sum(
+            dtype=kernels.numpy.int64)) + self.viewport.pixels)
+
+    def escaped(self):
+        #mask of the pixels whose orbit left the circle |z| = 2: a boolean
+        #array for NumPy counts, a bytearray of 0/1 for the python kernel
+        if isinstance(self.counts, array):
+            maxiter = self.maxiter
+            return bytearray(counter <= maxiter for counter in self.counts)
+        return self.counts <= self.maxiter
+
+    def image(self, palette=None):
+        #RGB image of the counts colored with palette (default: the five
+        #bands); a smooth palette needs the frame's magnitudes
+        if palette is None:
+            palette = DEFAULT_PALETTE
+        with instrument.stage('color'):
+            return self._image(palette)
+
+    def _image(self, palette):
+        #PIL is imported here, so that computing counts never loads it
+        from PIL import Image
+        if not isinstance(self.counts, array):
+            if palette.smooth and self.magnitudes is not None:
+                return Image.fromarray(palette.smoothColors(
+                    self.counts, self.magnitudes, self.maxiter), 'RGB')
+            lut = kernels.numpy.array(palette.table(self.maxiter),
+                                      dtype=kernels.numpy.uint8)
+            return Image.fromarray(lut[self.counts], 'RGB')
+
+        #counts from the python kernel are used directly as palette indices
+        #of a "P" image; above 254 iterations they are first folded onto the
+        #distinct colors of the table, and only tables of more than 256
+        #distinct colors are applied pixel by pixel
+        table = palette.table(self.maxiter)
+        size = (self.viewport.width, self.viewport.height)
+        if self.counts.typecode == 'B':
+            if hasattr(self.counts, 'tobytes'):
+                indices = self.counts.tobytes()
+            else:
+                indices = self.counts.tostring()
+        else:
+            colors = []
+            for color in table:
+                if color not in colors:
+                    colors.append(color)
+            if len(colors) > 256:
+                rgb = [bytes(bytearray(color)) for color in table]
+                return Image.frombytes('RGB', size, b''.join(
+                    rgb[counter] for counter in self.counts))
+            bands = [colors.index(color) for color in table]
+            indices = bytes(bytearray(bands[counter] for counter in self.counts))
+            table = colors
+        fracImage = Image.frombytes('P', size, indices)
+        fracImage.putpalette([value for color in table for value in color])
+        return fracImage.convert('RGB')
+
+
+def _checkArguments(kind, backend):
+    if kind not in kernels.KINDS:
+        raise ValueError('unknown fractal kind %r, expected one of %s'
+                         % (kind, ', '.join(kernels.KINDS)))
+    if backend is None:
+        backend = kernels.defaultBackend()
+    kernels.loadBackend(backend)
+    if (backend not in kernels.COUNT_BACKENDS
+            and backend not in kernels.IMAGE_BACKENDS):
+        raise ValueError('unknown backend %r' % (backend,))
+    return backend
+
+
+def computeFrame(viewport=None, kind='mandelbrot', c=(0.0, 0.0), maxiter=20,
+                 backend=None, symmetry=False, magnitudes=False, **options):
+    #iteration counts for every pixel of viewport (default: the 800 x 600
+    #window of frac1.py); options are passed on to the kernel, e.g.
+    #workers=8 for the parallel backend. symmetry=True copies the mirrored
+    #half of a viewport which straddles an axis of symmetry (symmetry.py),
+    #which is faster but not exact to the last pixel, so it is off by default.
+    #magnitudes=True also keeps mzsq at escape for smooth coloring, which
+    #the numpy and jit backends compute; with symmetry=True it is mirrored
+    #along with the counts.
+    if viewport is None:
+        viewport = Viewport()
+    backend = _checkArguments(kind, backend)
+    if backend not in kernels.COUNT_BACKENDS:
+        raise ValueError('backend %r does not produce iteration counts'
+                         % (backend,))
+    c1, c2 = float(c[0]), float(c[1])
+    stats = {}
+    kernel = kernels.COUNT_BACKENDS[backend]
+    if magnitudes and backend not in kernels.MAGNITUDE_BACKENDS:
+        raise ValueError('magnitudes are only computed by the %s backends, '
+                         'not %r' % (' and '.join(kernels.MAGNITUDE_BACKENDS),
+                                     backend))
+    with instrument.stage('compute') as timing:
+        mzsq = None
+        if magnitudes:
+            mzsq = kernels.numpy.empty((viewport.height, viewport.width))
+            options['magnitudes'] = mzsq
+        if symmetry:
+            counts = symmetricCounts(kernel, viewport, kind, c1, c2, maxiter,
+                                     stats=stats, **options)
+        else:
+            counts = kernel(viewport, kind, c1, c2, maxiter, stats=stats,
+                            **options)
+        frame = Frame(counts, viewport, maxiter, kind, (c1, c2), stats, mzsq)
+        if timing.active:
+            escaped = frame.escaped()
+            escaped = (sum(escaped) if isinstance(escaped, bytearray)
+                       else int(kernels.numpy.count_nonzero(escaped)))
+            timing.count(pixels=viewport.pixels,
+                         iterations=frame.iterations(), escaped=escaped,
+                         interior=viewport.pixels - escaped, **stats)
+    return frame
+
+
+def renderImage(viewport=None, kind='mandelbrot', c=(0.0, 0.0), maxiter=20,
+                backend=None, palette=None, **options):
+    #RGB image of the Mandelbrot or Julia set over viewport
+    if viewport is None:
+        viewport = Viewport()
+    backend = _checkArguments(kind, backend)
+    if backend in kernels.IMAGE_BACKENDS:
+        if palette is not None:
+            raise ValueError('the %r backend has no palette' % (backend,))
+        return kernels.IMAGE_BACKENDS[backend](viewport, kind, float(c[0]),
+                                               float(c[1]), maxiter)
+    if palette is not None and palette.smooth:
+        options['magnitudes'] = True
+    return computeFrame(viewport, kind, c, maxiter, backend,
+                        **options).image(palette)
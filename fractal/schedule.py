@@ -0,0 +1,248 @@
+#schedule.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Cost-aware scheduling of tiles for the parallel renderer.
+
+Pixels inside the set cost the full iteration budget while pixels outside the
+cardioid escape after one or two iterations, so equal bands of rows leave some
+workers idle while others are still working through the interior. The
+scheduler works in three steps:
+
+1. A cost probe renders the viewport at 1/PROBE_STEP of its resolution, and
+   takes min(counter, maxiter) + 1 (the iterations actually spent) as the
+   cost of each probe cell.
+
+2. The frame is cut into weighted tiles by repeatedly splitting the most
+   expensive tile in two along its longer side, at the point where the
+   estimated cost of the two halves is as even as possible. Cheap regions end
+   up as a few large tiles and the interior as many small ones.
+
+3. Each worker gets a queue of tiles, dealt out heaviest first to the least
+   loaded queue. A worker takes tiles from the front of its own queue, and
+   when that is empty steals from the back of the queue with the most
+   estimated cost left.
+
+One dispatcher thread runs per worker and keeps exactly one of its tiles in
+flight on the process (or thread) pool of parallel.py, so a dispatcher and
+its queue stand for one core. The report returned with the counts gives, for
+each worker, the tiles it rendered, how many of them were stolen, the time it
+spent rendering and its utilization (render time / wall time of the frame).
+'''
+
+import threading
+import time
+from collections import deque
+
+from . import kernels
+from . import parallel
+from .render import computeFrame
+from .viewport import Viewport
+
+#the probe renders one pixel in PROBE_STEP x PROBE_STEP
+PROBE_STEP = 8
+
+#tiles cut per worker
+TILES_PER_WORKER = 8
+
+#report of the last scheduledCounts() call
+lastReport = None
+
+
+def costProbe(viewport, kind='mandelbrot', c1=0.0, c2=0.0, maxiter=20,
+              step=PROBE_STEP, kernel=None, **options):
+    #estimated iterations for each step x step cell of viewport, as a list of
+    #rows
+    columns = -(-viewport.width // step)
+    rows = -(-viewport.height // step)
+    probe = Viewport(columns, rows, viewport.aValue(0), viewport.bValue(0),
+                     viewport.scale/step)
+    if kernel is None:
+        kernel = parallel.defaultKernel()
+    frame = computeFrame(probe, kind, (c1, c2), maxiter, kernel, **options)
+    interior = maxiter + 1
+    if kind == 'mandelbrot' and options.get('interiorTest', True):
+        #cells the kernel will skip with the cardioid and bulb test cost
+        #next to nothing, however many iterations they stand for
+        return [[1 if frame.count(i, j) == interior
+                 and kernels.inMainBulbs(probe.aValue(i), probe.bValue(j))
+                 else min(frame.count(i, j), maxiter) + 1
+                 for i in range(columns)] for j in range(rows)]
+    return [[min(frame.count(i, j), maxiter) + 1 for i in range(columns)]
+            for j in range(rows)]
+
+
+def _cellCost(costs, cell):
+    i0, j0, i1, j1 = cell
+    return sum(sum(row[i0:i1]) for row in costs[j0:j1])
+
+
+def _split(costs, cell):
+    #split cell in two along its longer side (in pixels), as evenly by cost
+    #as the probe grid allows; returns None for a single probe cell
+    i0, j0, i1, j1 = cell
+    across = (i1 - i0) >= (j1 - j0) and i1 - i0 > 1
+    if across:
+        lines = [sum(row[i] for row in costs[j0:j1]) for i in range(i0, i1)]
+    elif j1 - j0 > 1:
+        lines = [sum(row[i0:i1]) for row in costs[j0:j1]]
+    else:
+        return None
+
+    total = sum(lines)
+    running = 0
+    cut = 1
+    best = None
+    for k in range(1, len(lines)):
+        running = running + lines[k - 1]
+        difference = abs(total - 2*running)
+        if best is None or difference < best:
+            best = difference
+            cut = k
+
+    if across:
+        return (i0, j0, i0 + cut, j1), (i0 + cut, j0, i1, j1)
+    return (i0, j0, i1, j0 + cut), (i0, j0 + cut, i1, j1)
+
+
+def weightedTiles(viewport, costs, count, step=PROBE_STEP):
+    #cut viewport into at most count tiles of roughly equal estimated cost;
+    #returns a list of (sub-viewport, estimated cost) pairs
+    cells = [(0, 0, len(costs[0]), len(costs))]
+    weights = [_cellCost(costs, cells[0])]
+    while len(cells) < count:
+        order = sorted(range(len(cells)), key=lambda k: -weights[k])
+        for k in order:
+            halves = _split(costs, cells[k])
+            if halves is not None:
+                break
+        else:
+            break
+        cells[k:k + 1] = halves
+        weights[k:k + 1] = [_cellCost(costs, half) for half in halves]
+
+    tiles = []
+    for (i0, j0, i1, j1), weight in zip(cells, weights):
+        m0 = i0*step
+        n0 = j0*step
+        m1 = min(i1*step, viewport.width)
+        n1 = min(j1*step, viewport.height)
+        tiles.append((viewport.subViewport(m0, n0, m1 - m0, n1 - n0), weight))
+    return tiles
+
+
+class WorkQueues(object):
+    #one deque of (tile, cost) per worker, with stealing from the back of the
+    #busiest queue once a worker's own queue runs dry
+
+    def __init__(self, tiles, workers):
+        self.queues = [deque() for worker in range(workers)]
+        self.remaining = [0]*workers
+        self.lock = threading.Lock()
+        for tile, cost in sorted(tiles, key=lambda item: -item[1]):
+            worker = self.remaining.index(min(self.remaining))
+            self.queues[worker].append((tile, cost))
+            self.remaining[worker] = self.remaining[worker] + cost
+
+    def take(self, worker):
+        #next (tile, stolen) for worker, or (None, False) when all are done
+        with self.lock:
+            if self.queues[worker]:
+                tile, cost = self.queues[worker].popleft()
+                self.remaining[worker] = self.remaining[worker] - cost
+                return tile, False
+            victim = self.remaining.index(max(self.remaining))
+            if not self.queues[victim]:
+                return None, False
+            tile, cost = self.queues[victim].pop()
+            self.remaining[victim] = self.remaining[victim] - cost
+            return tile, True
+
+
+def scheduledRender(viewport, kind='mandelbrot', c1=0.0, c2=0.0, maxiter=20,
+                    workers=None, kernel=None, threads=False,
+                    tilesPerWorker=TILES_PER_WORKER, step=PROBE_STEP,
+                    stats=None, **options):
+    #iteration counts of viewport rendered with cost-weighted tiles and work
+    #stealing; returns (counts, report). options are passed on to the kernel.
+    workers = parallel.workerCount(workers)
+    if kernel is None:
+        kernel = parallel.defaultKernel()
+
+    start = time.time()
+    costs = costProbe(viewport, kind, c1, c2, maxiter, step, kernel, **options)
+    probeTime = time.time() - start
+    tiles = weightedTiles(viewport, costs, workers*tilesPerWorker, step)
+    queues = WorkQueues(tiles, workers)
+    pool = parallel.getPool(workers, threads)
+    workerStats = [{'tiles': 0, 'stolen': 0, 'busy': 0.0}
+                   for worker in range(workers)]
+    errors = []
+
+    framebuffer = parallel.Framebuffer(viewport, threads)
+
+    def dispatch(worker):
+        try:
+            while True:
+                tile, stolen = queues.take(worker)
+                if tile is None:
+                    return
+                future = framebuffer.submit(pool, tile, kind, c1, c2, maxiter,
+                                            kernel, options)
+                seconds = framebuffer.collect(future)
+                workerStats[worker]['busy'] = workerStats[worker]['busy'] + seconds
+                workerStats[worker]['tiles'] = workerStats[worker]['tiles'] + 1
+                if stolen:
+                    workerStats[worker]['stolen'] = workerStats[worker]['stolen'] + 1
+        except Exception as error:
+            errors.append(error)
+
+    try:
+        renderStart = time.time()
+        dispatchers = [threading.Thread(target=dispatch, args=(worker,))
+                       for worker in range(workers)]
+        for dispatcher in dispatchers:
+            dispatcher.start()
+        for dispatcher in dispatchers:
+            dispatcher.join()
+        if errors:
+            raise errors[0]
+        counts = framebuffer.counts()
+        wall = time.time() - renderStart
+        kernels.addStats(stats, **framebuffer.stats)
+    finally:
+        framebuffer.close()
+
+    for worker in workerStats:
+        worker['utilization'] = worker['busy']/wall if wall else 1.0
+    report = {'workers': workerStats,
+              'tiles': len(tiles),
+              'probeTime': probeTime,
+              'renderTime': wall,
+              'estimatedIterations': sum(cost for tile, cost in tiles)*step*step}
+    return counts, report
+
+
+def scheduledCounts(viewport, kind='mandelbrot', c1=0.0, c2=0.0, maxiter=20,
+                    **options):
+    #counting backend: as scheduledRender, keeping the report in lastReport
+    global lastReport
+    counts, lastReport = scheduledRender(viewport, kind, c1, c2, maxiter,
+                                         **options)
+    return counts
+
+
+def formatReport(report):
+    #one line per worker, for printing
+    lines = ['%d tiles, probe %.3f s, render %.3f s'
+             % (report['tiles'], report['probeTime'], report['renderTime'])]
+    for number, worker in enumerate(report['workers']):
+        lines.append('worker %2d: %3d tiles (%d stolen), busy %.3f s, '
+                     'utilization %5.1f%%'
+                     % (number, worker['tiles'], worker['stolen'],
+                        worker['busy'], 100.0*worker['utilization']))
+    return '\n'.join(lines)
+
+
+kernels.registerBackend('scheduled', scheduledCounts)
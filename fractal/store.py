@@ -0,0 +1,181 @@
+#store.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Iteration counts kept on disk.
+
+Coloring only needs the counts, so a render can be saved once and recolored,
+cropped or re-displayed later without iterating a single orbit again. A
+stored render is three files sharing a base name:
+
+render.json          header: viewport, kind, c, maxiter, data types
+render.counts.npy    counts, height x width, in the smallest unsigned type
+                     able to hold maxiter + 1
+render.mzsq.npy      mzsq at escape as float32 (only with magnitudes=True)
+
+The .npy files are opened with numpy.load(mmap_mode='r'), so loading takes
+no time whatever the size of the render, and only the pages of the file that
+are actually read (for example by a crop) are brought into memory:
+
+renderToFile('render', Viewport(40000, 30000, -1.5, 1.5, 10000.0))
+frame = loadFrame('render')
+frame.crop(20000, 15000, 800, 600).image().save('detail.png')
+streamFrame('whole.png', frame)
+
+renderToFile() writes the counts strip by strip into the memory-mapped file,
+so like streamImage() it never holds more than a strip in memory.
+'''
+
+import json
+import os
+
+try:
+    import numpy
+    from numpy.lib.format import open_memmap
+except ImportError:
+    numpy = None
+
+from . import kernels
+from .render import Frame, computeFrame
+from .stream import STRIP_PIXELS
+from .viewport import Viewport
+
+#version of the header layout
+STORE_VERSION = 1
+
+
+def _paths(path):
+    #header, counts and magnitudes file names for a base name
+    base = path[:-len('.json')] if path.endswith('.json') else path
+    return base + '.json', base + '.counts.npy', base + '.mzsq.npy'
+
+
+def countDtype(maxiter):
+    #smallest unsigned type holding the interior value maxiter + 1
+    return {'B': numpy.uint8, 'H': numpy.uint16,
+            'I': numpy.uint32}[kernels.countTypecode(maxiter)]
+
+
+def _writeHeader(path, viewport, kind, c, maxiter, dtype, magnitudes):
+    headerPath, countsPath, magnitudesPath = _paths(path)
+    header = {'version': STORE_VERSION,
+              'width': viewport.width,
+              'height': viewport.height,
+              'left': viewport.left,
+              'top': viewport.top,
+              'scale': viewport.scale,
+              'mOffset': viewport.mOffset,
+              'nOffset': viewport.nOffset,
+              'kind': kind,
+              'c': [float(c[0]), float(c[1])],
+              'maxiter': maxiter,
+              'counts': os.path.basename(countsPath),
+              'countsDtype': numpy.dtype(dtype).name,
+              'magnitudes': (os.path.basename(magnitudesPath) if magnitudes
+                             else None)}
+    with open(headerPath, 'w') as headerFile:
+        json.dump(header, headerFile, indent=1, sort_keys=True)
+
+
+def saveFrame(path, frame):
+    #store a frame computed in memory (with its magnitudes, if it has them)
+    if numpy is None:
+        raise ImportError('storing counts requires NumPy')
+    viewport = frame.viewport
+    headerPath, countsPath, magnitudesPath = _paths(path)
+    dtype = countDtype(frame.maxiter)
+    counts = numpy.asarray(frame.counts).reshape(viewport.height,
+                                                 viewport.width)
+    numpy.save(countsPath, counts.astype(dtype))
+    if frame.magnitudes is not None:
+        numpy.save(magnitudesPath,
+                   numpy.asarray(frame.magnitudes, dtype=numpy.float32))
+    _writeHeader(path, viewport, frame.kind, frame.c, frame.maxiter, dtype,
+                 frame.magnitudes is not None)
+
+
+def renderToFile(path, viewport, kind='mandelbrot', c=(0.0, 0.0), maxiter=20,
+                 backend=None, magnitudes=False, stripRows=None, **options):
+    #render viewport strip by strip straight into memory-mapped files;
+    #returns the kernels' stats summed over the strips. magnitudes=True also
+    #stores mzsq at escape, which needs the numpy backend.
+    if numpy is None:
+        raise ImportError('storing counts requires NumPy')
+    if magnitudes:
+        if backend not in (None, 'numpy'):
+            raise ValueError('magnitudes are only computed by the numpy '
+                             'backend')
+        #the numpy kernel is called directly, without computeFrame
+        options.pop('symmetry', None)
+    headerPath, countsPath, magnitudesPath = _paths(path)
+    width = viewport.width
+    height = viewport.height
+    dtype = countDtype(maxiter)
+    if stripRows is None:
+        stripRows = max(1, STRIP_PIXELS // width)
+
+    counts = open_memmap(countsPath, mode='w+', dtype=dtype,
+                         shape=(height, width))
+    mzsq = None
+    if magnitudes:
+        mzsq = open_memmap(magnitudesPath, mode='w+', dtype=numpy.float32,
+                           shape=(height, width))
+    stats = {}
+    try:
+        for strip in viewport.rowBands(stripRows):
+            n = strip.nOffset - viewport.nOffset
+            if magnitudes:
+                stripMagnitudes = numpy.empty((strip.height, width))
+                stripCounts = kernels.numpyCounts(strip, kind, float(c[0]),
+                                                  float(c[1]), maxiter,
+                                                  stats=stats,
+                                                  magnitudes=stripMagnitudes,
+                                                  **options)
+                mzsq[n:n + strip.height] = stripMagnitudes
+            else:
+                frame = computeFrame(strip, kind, c, maxiter, backend,
+                                     **options)
+                stripCounts = numpy.asarray(frame.counts).reshape(strip.height,
+                                                                  width)
+                for name, value in frame.stats.items():
+                    stats[name] = stats.get(name, 0) + value
+            counts[n:n + strip.height] = stripCounts
+        counts.flush()
+        if mzsq is not None:
+            mzsq.flush()
+    finally:
+        del counts
+        del mzsq
+
+    _writeHeader(path, viewport, kind, c, maxiter, dtype, magnitudes)
+    return stats
+
+
+def loadFrame(path, mode='r'):
+    #Frame of a stored render whose counts (and magnitudes) are memory-mapped
+    #from disk; mode is numpy.load's mmap_mode, 'r+' to allow writing
+    if numpy is None:
+        raise ImportError('stored counts require NumPy')
+    headerPath = _paths(path)[0]
+    with open(headerPath) as headerFile:
+        header = json.load(headerFile)
+    if header.get('version') != STORE_VERSION:
+        raise ValueError('%s: unsupported store version %r'
+                         % (headerPath, header.get('version')))
+    directory = os.path.dirname(headerPath)
+    viewport = Viewport(header['width'], header['height'], header['left'],
+                        header['top'], header['scale'], header['mOffset'],
+                        header['nOffset'])
+    counts = numpy.load(os.path.join(directory, header['counts']),
+                        mmap_mode=mode)
+    if counts.shape != (viewport.height, viewport.width):
+        raise ValueError('%s: counts are %r, expected %d x %d'
+                         % (headerPath, counts.shape, viewport.height,
+                            viewport.width))
+    magnitudes = None
+    if header.get('magnitudes'):
+        magnitudes = numpy.load(os.path.join(directory, header['magnitudes']),
+                                mmap_mode=mode)
+    return Frame(counts, viewport, header['maxiter'], header['kind'],
+                 tuple(header['c']), magnitudes=magnitudes)
@@ -0,0 +1,202 @@
+#stream.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Out-of-core rendering of images too large to hold in memory.
+
+Image.new("RGB", (width, height)) needs 3 bytes per pixel, and the counts
+another 4, so a 100000 x 100000 print would need 700 GB. streamImage()
+instead renders the image in horizontal strips of about STRIP_PIXELS pixels,
+colors each strip and hands its rows to an incremental encoder before the
+next strip is computed. Peak memory is that of one strip whatever the size of
+the image:
+
+streamImage('print.png', Viewport(100000, 100000, -2.0, 1.25, 40000.0),
+            maxiter=200, backend='parallel')
+
+Three encoders are provided, chosen by the file extension or format:
+
+- PngWriter deflates the rows with one zlib compressor as they arrive and
+  writes its output as IDAT chunks of about CHUNK_BYTES,
+- PpmWriter writes binary PPM (P6), a header followed by the raw rows,
+- BmpWriter writes a 24-bit BMP with a negative height, which marks the rows
+  as top-down so that they can be written in the order they are computed.
+  BMP stores sizes in 32 bits, so BMP files are limited to 4 GB.
+
+streamFrame() encodes a frame which has already been computed in the same
+way, for instance a memory-mapped one reloaded with store.loadFrame().
+'''
+
+import os
+import struct
+import zlib
+
+from . import instrument
+from .render import computeFrame
+
+#pixels rendered per strip
+STRIP_PIXELS = 1 << 22
+
+#compressed bytes collected before a PNG IDAT chunk is written
+CHUNK_BYTES = 1 << 20
+
+
+class PngWriter(object):
+    #8-bit RGB PNG written a row at a time
+
+    def __init__(self, output, width, height, level=6):
+        self.output = output
+        self.width = width
+        self.compressor = zlib.compressobj(level)
+        self.pending = []
+        self.pendingBytes = 0
+        output.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0,
+                                         0, 0))
+
+    def _chunk(self, kind, data):
+        self.output.write(struct.pack('>I', len(data)))
+        self.output.write(kind)
+        self.output.write(data)
+        self.output.write(struct.pack('>I',
+                                      zlib.crc32(kind + data) & 0xffffffff))
+
+    def _deflate(self, data):
+        compressed = self.compressor.compress(data)
+        if compressed:
+            self.pending.append(compressed)
+            self.pendingBytes = self.pendingBytes + len(compressed)
+        if self.pendingBytes >= CHUNK_BYTES:
+            self._flush()
+
+    def _flush(self):
+        if self.pending:
+            self._chunk(b'IDAT', b''.join(self.pending))
+            self.pending = []
+            self.pendingBytes = 0
+
+    def writeRows(self, data):
+        #data holds whole rows of RGB bytes; each row gets filter type 0
+        stride = 3*self.width
+        self._deflate(b''.join(b'\x00' + data[start:start + stride]
+                               for start in range(0, len(data), stride)))
+
+    def close(self):
+        self.pending.append(self.compressor.flush())
+        self._flush()
+        self._chunk(b'IEND', b'')
+
+
+class PpmWriter(object):
+    #binary PPM (P6)
+
+    def __init__(self, output, width, height):
+        self.output = output
+        output.write(('P6\n%d %d\n255\n' % (width, height)).encode('ascii'))
+
+    def writeRows(self, data):
+        self.output.write(data)
+
+    def close(self):
+        pass
+
+
+class BmpWriter(object):
+    #24-bit top-down BMP; rows are BGR and padded to a multiple of 4 bytes
+
+    def __init__(self, output, width, height):
+        self.output = output
+        self.width = width
+        self.padding = b'\x00'*(-3*width % 4)
+        imageBytes = (3*width + len(self.padding))*height
+        if imageBytes + 54 > 0xffffffff:
+            raise ValueError('a %d x %d image is too large for BMP'
+                             % (width, height))
+        output.write(struct.pack('<2sIHHI', b'BM', imageBytes + 54, 0, 0, 54))
+        output.write(struct.pack('<IiiHHIIiiII', 40, width, -height, 1, 24, 0,
+                                 imageBytes, 2835, 2835, 0, 0))
+
+    def writeRows(self, data):
+        #data holds whole rows of BGR bytes
+        stride = 3*self.width
+        if not self.padding:
+            self.output.write(data)
+            return
+        self.output.write(b''.join(data[start:start + stride] + self.padding
+                                   for start in range(0, len(data), stride)))
+
+    def close(self):
+        pass
+
+
+WRITERS = {'png': PngWriter, 'ppm': PpmWriter, 'bmp': BmpWriter}
+
+
+def streamFormat(path, format=None):
+    #encoder name for path, from format or the file extension
+    if format is None:
+        format = os.path.splitext(path)[1][1:]
+    format = format.lower()
+    if format not in WRITERS:
+        raise ValueError('streaming supports %s, not %r'
+                         % (', '.join(sorted(WRITERS)), format))
+    return format
+
+
+def _writeFrames(path, format, width, height, frames, onStrip, palette):
+    #encode the strips yielded by frames, top to bottom, into path
+    with open(path, 'wb') as output:
+        writer = WRITERS[format](output, width, height)
+        done = 0
+        for frame in frames:
+            image = frame.image(palette)
+            with instrument.stage('encode'):
+                if format == 'bmp':
+                    writer.writeRows(image.tobytes('raw', 'BGR'))
+                else:
+                    writer.writeRows(image.tobytes())
+            del image
+            done = done + frame.viewport.height
+            if onStrip is not None:
+                onStrip(done, frame)
+        writer.close()
+
+
+def streamImage(path, viewport, kind='mandelbrot', c=(0.0, 0.0), maxiter=20,
+                backend=None, format=None, stripRows=None, onStrip=None,
+                palette=None, **options):
+    #render viewport strip by strip into the image file path; onStrip(rows
+    #done, frame) is called after each strip. Returns the kernels' stats
+    #summed over the strips.
+    format = streamFormat(path, format)
+    if stripRows is None:
+        stripRows = max(1, STRIP_PIXELS // viewport.width)
+    stats = {}
+    if palette is not None and palette.smooth:
+        options['magnitudes'] = True
+
+    def frames():
+        for strip in viewport.rowBands(stripRows):
+            frame = computeFrame(strip, kind, c, maxiter, backend, **options)
+            for name, value in frame.stats.items():
+                stats[name] = stats.get(name, 0) + value
+            yield frame
+
+    _writeFrames(path, format, viewport.width, viewport.height, frames(),
+                 onStrip, palette)
+    return stats
+
+
+def streamFrame(path, frame, format=None, stripRows=None, onStrip=None,
+                palette=None):
+    #encode an existing frame strip by strip, e.g. a memory-mapped one from
+    #store.loadFrame() which is too large to color in one piece
+    format = streamFormat(path, format)
+    width = frame.viewport.width
+    height = frame.viewport.height
+    if stripRows is None:
+        stripRows = max(1, STRIP_PIXELS // width)
+    frames = (frame.crop(0, n, width, min(stripRows, height - n))
+              for n in range(0, height, stripRows))
+    _writeFrames(path, format, width, height, frames, onStrip, palette)
@@ -0,0 +1,148 @@
+#symmetry.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Symmetric rendering.
+
+The iteration z_new = z*z - c commutes with complex conjugation when c is
+real, and with z -> -z always. So
+
+- the Mandelbrot set (z starts at 0, c is the pixel) is symmetric about the
+  real axis: (a, b) and (a, -b) have the same count,
+- a Julia set (z starts at the pixel) has 180 degree rotational symmetry about
+  0: (a, b) and (-a, -b) have the same count, and a Julia set with a real
+  constant (c2 = 0) is also symmetric about the real axis.
+
+The default window, for example, has b = 0 on row 300 and a = 0 in column
+300, so rows 301-599 of the Mandelbrot set are rows 299-1 read backwards.
+
+symmetricCounts() finds the pixel rows (and columns) the axis maps onto each
+other. It computes the rows above the axis and everything outside the
+symmetric part of the frame, and copies the rest from its mirror image. The
+axis must fall on a pixel or halfway between two, so that pixels map onto
+pixels; otherwise, or if the viewport does not straddle the axis, the frame
+is computed in full.
+
+The copied half is the exact mirror image of the computed half. Its pixel
+coordinates, computed as top - n/scale, can differ from the negated ones in
+the last bit, so a Mandelbrot frame can differ from a full render in a few
+boundary pixels (1 pixel of the default view at 20 iterations, 12 at 2000),
+and the result would depend on how the frame is cut into tiles or strips.
+Mirroring is therefore only done when asked for, with
+computeFrame(..., symmetry=True) or the command line's --symmetry, where
+twice the speed matters more than the last pixel.
+'''
+
+from array import array
+
+from . import kernels
+
+#how close (in pixels) the axis must be to a pixel or half pixel
+AXIS_TOLERANCE = 1e-9
+
+
+def _axis(position):
+    #2*position as an integer if position is a whole or half pixel
+    twice = round(2*position)
+    if abs(2*position - twice) > AXIS_TOLERANCE:
+        return None
+    return int(twice)
+
+
+def symmetryAxes(viewport, kind='mandelbrot', c1=0.0, c2=0.0):
+    #(k, j) such that pixel (m, n) has the count of pixel (j - m, k - n), with
+    #j None when only the rows are mirrored; None if there is no usable axis
+    k = _axis(viewport.top*viewport.scale - viewport.nOffset)
+    if k is None:
+        return None
+    if kind == 'mandelbrot' or c2 == 0.0:
+        return k, None
+    j = _axis(-viewport.left*viewport.scale - viewport.mOffset)
+    if j is None:
+        return None
+    return k, j
+
+
+def symmetricCounts(kernel, viewport, kind='mandelbrot', c1=0.0, c2=0.0,
+                    maxiter=20, stats=None, magnitudes=None, **options):
+    #counts of viewport from the counting backend kernel, computing the
+    #mirrored half only once; the height x width array magnitudes, if given,
+    #receives mzsq at escape, mirrored like the counts (the mirrored orbit
+    #is the original with signs flipped, so its mzsq is the same)
+    width = viewport.width
+    height = viewport.height
+    axes = symmetryAxes(viewport, kind, c1, c2)
+    if axes is not None:
+        k, j = axes
+        #rows k//2 + 1 to last are copied from rows k - first to k - last
+        first = k//2 + 1
+        last = min(height - 1, k)
+        if j is None:
+            left = 0
+            right = width - 1
+        else:
+            left = max(0, j - width + 1)
+            right = min(width - 1, j)
+    if axes is None or first > last or first < 1 or left > right:
+        if magnitudes is not None:
+            options['magnitudes'] = magnitudes
+        return kernel(viewport, kind, c1, c2, maxiter, stats=stats, **options)
+
+    #rectangles (m, n, width, height) computed by the kernel
+    pieces = [(0, 0, width, first)]
+    if left > 0:
+        pieces.append((0, first, left, last + 1 - first))
+    if right < width - 1:
+        pieces.append((right + 1, first, width - 1 - right, last + 1 - first))
+    if last < height - 1:
+        pieces.append((0, last + 1, width, height - 1 - last))
+
+    counts = None
+    for m, n, pieceWidth, pieceHeight in pieces:
+        if magnitudes is not None:
+            options['magnitudes'] = magnitudes[n:n + pieceHeight,
+                                               m:m + pieceWidth]
+        piece = kernel(viewport.subViewport(m, n, pieceWidth, pieceHeight),
+                       kind, c1, c2, maxiter, stats=stats, **options)
+        if counts is None:
+            if isinstance(piece, array):
+                counts = array(piece.typecode, [0])*viewport.pixels
+            else:
+                counts = kernels.numpy.empty((height, width), dtype=piece.dtype)
+        _place(counts, width, piece, m, n, pieceWidth, pieceHeight)
+
+    if isinstance(counts, array):
+        for n in range(first, last + 1):
+            source = (k - n)*width
+            if j is None:
+                counts[n*width:(n + 1)*width] = counts[source:source + width]
+            else:
+                row = counts[source + j - right:source + j - left + 1]
+                row.reverse()
+                counts[n*width + left:n*width + right + 1] = row
+    else:
+        for target in (counts, magnitudes):
+            if target is None:
+                continue
+            mirror = target[k - last:k - first + 1][::-1]
+            if j is None:
+                target[first:last + 1] = mirror
+            else:
+                target[first:last + 1, left:right + 1] = \
+                    mirror[:, j - right:j - left + 1][:, ::-1]
+
+    kernels.addStats(stats, mirroredPixels=(last + 1 - first)*(right + 1 - left))
+    return counts
+
+
+def _place(counts, width, piece, m, n, pieceWidth, pieceHeight):
+    #copy the counts of a pieceWidth x pieceHeight rectangle to (m, n)
+    if isinstance(counts, array):
+        for row in range(pieceHeight):
+            start = (n + row)*width + m
+            counts[start:start + pieceWidth] = \
+                piece[row*pieceWidth:(row + 1)*pieceWidth]
+    else:
+        counts[n:n + pieceHeight, m:m + pieceWidth] = \
+            kernels.numpy.asarray(piece).reshape(pieceHeight, pieceWidth)
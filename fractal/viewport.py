@@ -0,0 +1,97 @@
+#viewport.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Mapping between screen pixels (m, n) and points c = a + i*b of the complex
+plane.
+
+The original scripts hard-code the transform
+
+a = -1.5 + m/200.00
+b = 1.5 - n/200.00
+
+for an 800 x 600 window. A Viewport carries the same four numbers (the value
+of a at the left edge, the value of b at the top edge, and the number of
+pixels per unit) together with the image size, so that the kernels can render
+any window at any resolution.
+
+The pixel values are always computed as left + m/scale and top - n/scale, in
+that order, so that a render of the default viewport is bit-for-bit the same as
+the loops in frac1.py. Tiles of a larger frame keep the parent's left, top and
+scale and only record their pixel offset, for the same reason.
+'''
+
+
+class Viewport(object):
+    #window onto the complex plane, sized in screen pixels
+
+    def __init__(self, width=800, height=600, left=-1.5, top=1.5,
+                 scale=200.0, mOffset=0, nOffset=0):
+        self.width = int(width)
+        self.height = int(height)
+        self.left = float(left)
+        self.top = float(top)
+        self.scale = float(scale)
+        #offset of pixel (0, 0) of this viewport within the parent frame
+        self.mOffset = int(mOffset)
+        self.nOffset = int(nOffset)
+
+    @classmethod
+    def centered(cls, centerA, centerB, span, width=800, height=600):
+        #viewport of width x height pixels around the point centerA +
+        #i*centerB, span units wide; the default window is
+        #Viewport.centered(0.5, 0.0, 4.0)
+        scale = width/float(span)
+        return cls(width, height, centerA - (width/2.0)/scale,
+                   centerB + (height/2.0)/scale, scale)
+
+    def __repr__(self):
+        return ('Viewport(%d, %d, left=%r, top=%r, scale=%r, mOffset=%d, '
+                'nOffset=%d)' % (self.width, self.height, self.left, self.top,
+                                 self.scale, self.mOffset, self.nOffset))
+
+    def __eq__(self, other):
+        return isinstance(other, Viewport) and self.key() == other.key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def key(self):
+        #tuple identifying the pixels covered by this viewport
+        return (self.width, self.height, self.left, self.top, self.scale,
+                self.mOffset, self.nOffset)
+
+    @property
+    def pixels(self):
+        return self.width * self.height
+
+    def aValue(self, m):
+        #transforms screen column m to the real value a
+        return self.left + (self.mOffset + m)/self.scale
+
+    def bValue(self, n):
+        #transforms screen row n to the imaginary value b
+        return self.top - (self.nOffset + n)/self.scale
+
+    def aValues(self):
+        return [self.aValue(m) for m in range(self.width)]
+
+    def bValues(self):
+        return [self.bValue(n) for n in range(self.height)]
+
+    def subViewport(self, m, n, width, height):
+        #tile of this viewport whose top left pixel is (m, n)
+        return Viewport(width, height, self.left, self.top, self.scale,
+                        self.mOffset + m, self.nOffset + n)
+
+    def rowBands(self, rows):
+        #split the viewport into horizontal bands of at most rows rows
+        bands = []
+        for n in range(0, self.height, rows):
+            bands.append(self.subViewport(0, n, self.width,
+                                          min(rows, self.height - n)))
+        return bands
@@ -106,61 +106,25 @@ edition, 1988.
 '''
 
 import math
-from PIL import Image, ImageTk
-import Tkinter
+
+import fractal
+
+#imported when the window is first opened (see fractal/lazy.py)
+Tkinter = fractal.lazyImport('Tkinter')
+ImageTk = fractal.lazyImport('PIL.ImageTk')
 
 def Mandelbrot():
     #function to test values of c = a + i*b for inclusion in Mandelbrot set
     canvasWidth = 800
     canvasHeight = 600
     global canvas
-    canvas = Image.new("RGB", (canvasWidth, canvasHeight))
-
-    for m in range(800):
-        a_system = m
-        a = -1.5 + a_system/200.00
-        #transforms m to a value in the complex plane with the origin placed
-        #somewhat ofset from the center of the window, to provide a good image
-        #of the set
-
-        for n in range(600):
-            b_system = n
-            b = 1.5 - b_system/200.00
-            #transforms n to a value in the complex plane
-            x = 0.0
-            y = 0.0
-            mzsq = 0.00
-            counter = 0
-
-            while (counter <= 20):
-                #loop to iterate function z = z*z - c
-                x_new = x*x - y*y - a
-                y_new = 2.00*x*y - b
-                #calculate square of the modulus of z
-                mzsq = x_new*x_new + y_new*y_new
-
-                #series of tests to determine if c is a member of he Mandelbrot
-                #set and to color the screen pixels according to whether or not
-                #the value of c is included in the set, and how many iterations
-                #have been performed
-                if(mzsq>4.0 and 0 <= counter <= 13):
-                    canvas.putpixel ( (m, n), (25, 15, 105))
-
-                elif(mzsq>4.0 and 14 <= counter <= 15):
-                    canvas.putpixel ( (m, n), (45, 20, 160))
-
-                elif(mzsq>4.0 and 16 <= counter <= 17):
-                    canvas.putpixel ( (m, n), (65, 25, 180))
-
-                elif(mzsq>4.0 and 18 <= counter <= 20):
-                    canvas.putpixel ( (m, n), (75, 30, 235))
-
-                elif(mzsq<=4.0):
-                    canvas.putpixel ( (m, n), (0, 0, 0))
-
-                x = x_new
-                y = y_new
-                counter = counter + 1
+
+    #m runs across the 800 columns with a = -1.5 + m/200.00 and n down the 600
+    #rows with b = 1.5 - n/200.00. The fractal engine iterates the whole grid
+    #at once and colors each pixel by the iteration at which the square
+    #modulus of z first exceeded 4.0.
+    viewport = fractal.Viewport(canvasWidth, canvasHeight)
+    canvas = fractal.renderImage(viewport, 'mandelbrot')
 
 def displayTkWindow():
     #function to display results of Mandelbrot in a simple Tk window
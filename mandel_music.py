@@ -137,22 +137,29 @@ is available at http://www.speech.kth.se/snack/man/snack2.2/python-man.html.
 '''
 
 import math
-from PIL import Image, ImageTk
-import Tkinter
-from tkSnack import *
-from time import sleep
+import os
+import tempfile
+import wave
 
-root = Tkinter.Tk()
+import fractal
 
-initializeSnack(root)
+#imported when the window is first opened (see fractal/lazy.py), so that
+#the notes can be worked out headless; the Tk root and Snack are set up in
+#displayTkWindow()
+Tkinter = fractal.lazyImport('Tkinter')
+ImageTk = fractal.lazyImport('PIL.ImageTk')
+tkSnack = fractal.lazyImport('tkSnack')
+
+root = None
 
-s = Sound() #tksnack Sound object
-filt = Filter('generator', 220.0) #sound Filter object, initialized
 freq = 440.0 #A4
 dur  = 2.0 #duration of sound produced in seconds
-frequencyarray = [] #python list stores frequencies
-interrupt = 1
-maxarray = 500000 #upper limit for frequency list size
+frequencyarray = fractal.NoteSequence() #run-length encoded frequencies
+player = None #fractal.Player feeding the notes to Snack
+maxarray = 500000 #upper limit for the number of notes
+#(first counter, last counter, frequency) of each tone, see fractal/music.py
+NOTE_RULES = [(16, 17, 2*329.6276),  #E5
+              (18, 20, 2*261.6256)]  #C5
 #frequencyarray = [2*391.9954, 2*440.0000, 2*349.2282, 2*174.6141]
 
 
@@ -161,107 +168,106 @@ def Mandelbrot():
     canvasWidth = 800
     canvasHeight = 600
     global canvas
-    canvas = Image.new("RGB", (canvasWidth, canvasHeight))
-
-    for m in range(800):
-        a_system = m
-        a = -1.5 + a_system/200.00
-        #transforms m to a value in the complex plane with the origin placed
-        #somewhat ofset from the center of the window, to provide a good image
-        #of the set
-
-        for n in range(600):
-            b_system = n
-            b = 1.5 - b_system/200.00
-            #transforms n to a value in the complex plane
-            x = 0.0
-            y = 0.0
-            mzsq = 0.00
-            counter = 0
-
-            while (counter <= 20):
-                #loop to iterate function z = z*z - c
-                x_new = x*x - y*y - a
-                y_new = 2.00*x*y - b
-                #calculate square of the modulus of z
-                mzsq = x_new*x_new + y_new*y_new
-
-                #series of tests to determine if c is a member of he Mandelbrot
-                #set and to color the screen pixels according to whether or not
-                #the value of c is included in the set, and how many iterations
-                #have been performed
-                if mzsq>4.0 and 0 <= counter <= 13:
-                    canvas.putpixel ( (m, n), (25, 15, 105))
-
-                elif mzsq>4.0 and 14 <= counter <= 15:
-                    canvas.putpixel ( (m, n), (45, 20, 160))
-
-                elif mzsq>4.0 and 16 <= counter <= 17:
-                    canvas.putpixel ( (m, n), (65, 25, 180))
-                    if len(frequencyarray) < maxarray:
-                        frequencyarray.append(2*329.6276)#E5
-
-                elif mzsq>4.0 and 18 <= counter <= 20:
-                    canvas.putpixel ( (m, n), (75, 30, 235))
-                    if len(frequencyarray) < maxarray:
-                        frequencyarray.append(2*261.6256)#c5
-
-                elif mzsq<=4.0:
-                    canvas.putpixel ( (m, n), (0, 0, 0))
-                    #if len(frequencyarray) < maxarray:
-                        #frequencyarray.append(2*391.9954)#G5
-
-                x = x_new
-                y = y_new
-                counter = counter + 1
-
-
-def tone(freq, dur):
-    s.stop()
-    filt.configure(freq, 30000, 0.0, 'sine', int(dur*11500))
-    s.play(filter=filt, blocking=1)
-
-
-def music(n): #recursive function, not used due to python's maximum recursion
-              #depth of 1000.
-    root.update()
-    if interrupt == 0 and n<=(len(frequencyarray) - 1):
-        tone(frequencyarray[n], dur)
-        root.after(1, music(n+1))
-
-#contains for loop which polls the OS for events prior to each iteration
-def music2():
-    for i in frequencyarray:
-        if interrupt == 0:
-            tone(i, dur)
-            root.update()
-
-
-def music3():# does not allowing ermination by stop function
-    while interrupt == 0:
-        for i in frequencyarray:
-            tone(i, dur)
-            root.update()
-            sleep(1)
+    global frequencyarray
+
+    #the fractal engine iterates the whole grid at once (a = -1.5 + m/200.00,
+    #b = 1.5 - n/200.00) and returns, for each pixel, the value of counter at
+    #which the square modulus of z first exceeded 4.0 (21 if it never did)
+    viewport = fractal.Viewport(canvasWidth, canvasHeight)
+    frame = fractal.computeFrame(viewport, 'mandelbrot')
+    canvas = frame.image()
+
+    #the tones are those of the old loop, which kept iterating after an
+    #escape: one E5 for every counter from 16 to 17 and one C5 for every
+    #counter from 18 to 20 at which mzsq > 4.0, until the orbit overflows to
+    #nan. noteSequence() replays the orbits of the pixels which escaped in
+    #time (see fractal/music.py), column by column, and stores the notes
+    #run-length encoded.
+    frequencyarray = fractal.noteSequence(frame, NOTE_RULES, maxarray)
+
+
+class SnackOutput(object):
+    #plays chunks of 16-bit PCM one after another with Snack. Each chunk
+    #becomes a Sound played with blocking=0, and its command starts the next,
+    #so the Tk event loop is never held up.
+
+    def __init__(self, rate=fractal.music.SAMPLE_RATE):
+        self.rate = rate
+        self.sounds = [] #the first one is playing
+
+    def write(self, data):
+        handle, path = tempfile.mkstemp(suffix='.wav')
+        os.close(handle)
+        try:
+            wavefile = wave.open(path, 'wb')
+            wavefile.setnchannels(1)
+            wavefile.setsampwidth(2)
+            wavefile.setframerate(self.rate)
+            wavefile.writeframes(data)
+            wavefile.close()
+            sound = tkSnack.Sound(load=path) #load= reads the file into memory
+        finally:
+            os.remove(path)
+        self.sounds.append(sound)
+        if len(self.sounds) == 1:
+            self.playFirst()
+
+    def playFirst(self):
+        sound = self.sounds[0]
+        sound.play(blocking=0, command=lambda: self.finished(sound))
+
+    def finished(self, sound):
+        #ignore the callbacks of sounds already stopped
+        if self.sounds and self.sounds[0] is sound:
+            self.sounds.pop(0).destroy()
+            if self.sounds:
+                self.playFirst()
+
+    def pending(self):
+        return len(self.sounds)
+
+    def stop(self):
+        sounds = self.sounds
+        self.sounds = []
+        for sound in sounds:
+            sound.stop()
+            sound.destroy()
+
+
+def pumpMusic():
+    #move synthesized chunks to Snack every 20 ms while the music plays, and
+    #follow the playing note with the position slider, which goes back to
+    #the first note at the end
+    if player.pump():
+        position.set(player.position())
+        root.after(20, pumpMusic)
+    elif player.position() >= len(frequencyarray):
+        position.set(0)
 
 
 def start():
-    global interrupt
-    interrupt=0
-    #music(0)
-    music2()
-    #music3()
+    if not player.playing():
+        player.seek(position.get())
+        pumpMusic()
 
 def stop():
-    global interrupt
-    interrupt=1
+    player.stop()
+
+
+def seek(event):
+    #jump to the note under the slider when it is released
+    if player.playing():
+        player.seek(position.get())
 
 
 def displayTkWindow():
     #function to display results of Mandelbrot in a simple Tk window
+    global root
     tkcanvas_width = 800
     tkcanvas_height = 600
 
+    root = Tkinter.Tk()
+    tkSnack.initializeSnack(root)
     root.title ("Mandelbrot")
 
     tkcanvas = Tkinter.Canvas(root, width=tkcanvas_width,
@@ -272,10 +278,21 @@ def displayTkWindow():
     tkcanvas.create_image(400, 300, image=img)
     tkcanvas.image = img
 
+    global player
+    global position
+    player = fractal.Player(frequencyarray, SnackOutput(),
+                            noteSamples=int(dur*11500))
+
     playbutton=Tkinter.Button(root, text='Music', command=start)
     playbutton.pack(side='left')
     stopbutton=Tkinter.Button(root, text='Stop', command=stop)
     stopbutton.pack(side='left')
+    position = Tkinter.IntVar(root)
+    slider = Tkinter.Scale(root, variable=position, orient='horizontal',
+                           from_=0, to=max(0, len(frequencyarray) - 1),
+                           showvalue=1, length=600, label='note')
+    slider.bind('<ButtonRelease-1>', seek)
+    slider.pack(side='left', fill='x', expand=1)
 
     root.mainloop()
 
@@ -0,0 +1,77 @@
+#test_animate.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Zoom paths, the resampled frames of a preview, and the command line's
+checks of its arguments.
+'''
+
+import pytest
+
+import fractal
+from fractal.animate import main, resampleFrame, zoomPath
+
+numpy = pytest.importorskip('numpy')
+
+START = fractal.Viewport.centered(0.5, 0.0, 4.0, 80, 60)
+END = fractal.Viewport.centered(0.745, -0.113, 0.02, 80, 60)
+
+
+def test_zoom_keeps_its_fixed_point_still():
+    s0 = START.scale
+    s1 = END.scale
+    a = (s1*0.745 - s0*0.5)/(s1 - s0)
+    b = (s1*-0.113 - s0*0.0)/(s1 - s0)
+    screen = [((a - viewport.left)*viewport.scale,
+               (viewport.top - b)*viewport.scale)
+              for viewport in zoomPath(START, END, 9)]
+    for m, n in screen:
+        assert m == pytest.approx(screen[0][0], abs=1e-6)
+        assert n == pytest.approx(screen[0][1], abs=1e-6)
+
+
+def test_resampled_frame_keeps_magnitudes():
+    #zooming out, so that the resampled frame also has computed pixels
+    key = fractal.computeFrame(END, maxiter=100, magnitudes=True)
+    viewport = zoomPath(END, START, 5)[1]
+    frame = resampleFrame(key, viewport, magnitudes=True)
+    assert 0 < frame.stats['reusedPixels'] < viewport.pixels
+    full = fractal.computeFrame(viewport, maxiter=100, magnitudes=True)
+    computed = numpy.ones((viewport.height, viewport.width), dtype=bool)
+    rows = numpy.rint((key.viewport.top - numpy.array(
+        [viewport.bValue(n) for n in range(viewport.height)]))*END.scale)
+    columns = numpy.rint((numpy.array(
+        [viewport.aValue(m) for m in range(viewport.width)])
+        - key.viewport.left)*END.scale)
+    computed[numpy.ix_((rows >= 0) & (rows < END.height),
+                       (columns >= 0) & (columns < END.width))] = False
+    assert (frame.magnitudes[computed] == full.magnitudes[computed]).all()
+    assert (frame.counts[computed] == full.counts[computed]).all()
+
+
+def test_preview_frames_are_smooth(tmp_path):
+    pytest.importorskip('PIL')
+    palette = fractal.GradientPalette(fractal.GRADIENT, 32.0, smooth=True)
+    viewports = zoomPath(START, END, 3)
+    key = fractal.computeFrame(viewports[0], maxiter=50, magnitudes=True)
+    frame = resampleFrame(key, viewports[1], magnitudes=True)
+    banded = fractal.Frame(frame.counts, frame.viewport, frame.maxiter)
+    assert frame.image(palette).tobytes() != banded.image(palette).tobytes()
+    report = fractal.animate.renderAnimation(
+        str(tmp_path / 'frame%02d.png'), START, END, 3, maxiter=50,
+        preview=True, keyEvery=2, palette=palette)
+    assert report['reusedPixels'] > 0
+
+
+@pytest.mark.parametrize('argv', [['--from', '0.5,0,0'],
+                                  ['--to', '0.745,-0.113,-0.02'],
+                                  ['--frames', '0'], ['--frames', '-3']])
+def test_bad_arguments_are_usage_errors(argv, tmp_path, capsys):
+    output = tmp_path / 'frames' / 'zoom%04d.png'
+    with pytest.raises(SystemExit) as exit:
+        main(argv + ['-o', str(output)])
+    assert exit.value.code == 2
+    assert 'usage:' in capsys.readouterr().err
+    #nothing was created for the frames
+    assert not (tmp_path / 'frames').exists()
@@ -0,0 +1,118 @@
+#test_backends.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Every counting backend, and every path which reuses counts, against the
+numpy kernel on a few fixed viewports; and counts and images written to disk
+read back unchanged.
+'''
+
+import pytest
+
+import fractal
+from fractal import kernels
+
+numpy = pytest.importorskip('numpy')
+
+#name: (viewport, kind, c, maxiter)
+VIEWS = {'default': (fractal.Viewport(96, 72, scale=24.0), 'mandelbrot',
+                     (0.0, 0.0), 20),
+         'boundary': (fractal.Viewport.centered(0.745, -0.113, 0.02, 96, 72),
+                      'mandelbrot', (0.0, 0.0), 200),
+         'julia': (fractal.Viewport(96, 72, scale=24.0), 'julia', (0.8, 0.12),
+                   50)}
+
+#options keeping the process pools small
+OPTIONS = {'parallel': {'workers': 2}, 'scheduled': {'workers': 2}}
+
+
+def expected(view):
+    viewport, kind, c, maxiter = VIEWS[view]
+    return kernels.numpyCounts(viewport, kind, c[0], c[1], maxiter)
+
+
+def asCounts(frame):
+    viewport = frame.viewport
+    return numpy.asarray(frame.counts).reshape(viewport.height,
+                                               viewport.width)
+
+
+@pytest.mark.parametrize('view', sorted(VIEWS))
+@pytest.mark.parametrize('backend', [name for name in kernels.backendNames()
+                                     if name not in kernels.IMAGE_BACKENDS])
+def test_backend_matches_numpy(backend, view):
+    viewport, kind, c, maxiter = VIEWS[view]
+    frame = fractal.computeFrame(viewport, kind, c, maxiter, backend,
+                                 **OPTIONS.get(backend, {}))
+    assert (asCounts(frame) == expected(view)).all()
+
+
+@pytest.mark.parametrize('view', sorted(VIEWS))
+def test_symmetry_keeps_counts_within_the_view(view):
+    #opt-in mirroring: the mirrored half may differ in a boundary pixel or
+    #two, never more
+    viewport, kind, c, maxiter = VIEWS[view]
+    frame = fractal.computeFrame(viewport, kind, c, maxiter, symmetry=True)
+    assert numpy.count_nonzero(asCounts(frame) != expected(view)) <= 2
+
+
+@pytest.mark.parametrize('view', sorted(VIEWS))
+def test_progressive_and_cached_tiles_match_numpy(view):
+    viewport, kind, c, maxiter = VIEWS[view]
+    for step, frame in fractal.progressivePasses(viewport, kind, c, maxiter):
+        pass
+    assert step == 1
+    assert (asCounts(frame) == expected(view)).all()
+
+    cache = fractal.TileCache(tileSize=32)
+    for attempt in range(2):
+        #computed, then straight from the cache
+        frame = cache.frame(viewport, kind, c, maxiter)
+        assert (asCounts(frame) == expected(view)).all()
+    assert cache.stats()['hits'] > 0
+
+
+def test_pan_and_zoom_match_a_full_render():
+    viewport, kind, c, maxiter = VIEWS['boundary']
+    frame = fractal.computeFrame(viewport, kind, c, maxiter)
+    for move in (lambda frame: fractal.panFrame(frame, 10, -7),
+                 lambda frame: fractal.zoomFrame(frame, 30, 40, 2),
+                 lambda frame: fractal.zoomFrame(frame, 50, 20, 0.5)):
+        frame = move(frame)
+        assert frame.stats['reusedPixels'] > 0
+        full = kernels.numpyCounts(frame.viewport, kind, c[0], c[1], maxiter)
+        assert (asCounts(frame) == full).all()
+
+
+def test_store_round_trip(tmp_path):
+    viewport, kind, c, maxiter = VIEWS['julia']
+    frame = fractal.computeFrame(viewport, kind, c, maxiter, magnitudes=True)
+    fractal.saveFrame(str(tmp_path / 'saved'), frame)
+    loaded = fractal.loadFrame(str(tmp_path / 'saved'))
+    assert loaded.viewport == viewport
+    assert (loaded.kind, loaded.c, loaded.maxiter) == (kind, c, maxiter)
+    assert (asCounts(loaded) == asCounts(frame)).all()
+    #magnitudes are stored as float32
+    assert (numpy.asarray(loaded.magnitudes)
+            == frame.magnitudes.astype(numpy.float32)).all()
+
+    fractal.renderToFile(str(tmp_path / 'strips'), viewport, kind, c, maxiter,
+                         stripRows=5)
+    strips = fractal.loadFrame(str(tmp_path / 'strips'))
+    assert (asCounts(strips) == asCounts(frame)).all()
+
+
+@pytest.mark.parametrize('extension', ['png', 'ppm', 'bmp'])
+def test_stream_round_trip(tmp_path, extension):
+    Image = pytest.importorskip('PIL.Image')
+    viewport, kind, c, maxiter = VIEWS['default']
+    image = fractal.computeFrame(viewport, kind, c, maxiter).image()
+    path = str(tmp_path / ('streamed.' + extension))
+    fractal.streamImage(path, viewport, kind, c, maxiter, stripRows=7)
+    assert Image.open(path).convert('RGB').tobytes() == image.tobytes()
+
+    frame = fractal.computeFrame(viewport, kind, c, maxiter)
+    path = str(tmp_path / ('frame.' + extension))
+    fractal.streamFrame(path, frame, stripRows=11)
+    assert Image.open(path).convert('RGB').tobytes() == image.tobytes()
@@ -0,0 +1,68 @@
+#test_cli.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Command-line arguments out of range, and outputs which cannot be written, end
+in a usage message or an error, not a traceback.
+'''
+
+import pytest
+
+from fractal import cli
+
+
+@pytest.mark.parametrize('argv', [['--maxiter', '-5'], ['--maxiter', '0'],
+                                  ['--scale', '0'], ['--scale', '-200'],
+                                  ['--workers', '0'], ['--workers', '-1'],
+                                  ['--strip-rows', '0'], ['--period', '0']])
+def test_bad_values_are_usage_errors(argv, capsys):
+    with pytest.raises(SystemExit) as exit:
+        cli.parseArgs(argv)
+    assert exit.value.code == 2
+    assert 'usage:' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('argv', [['-o', 'fractal.unknown'],
+                                  ['--format', 'NOSUCH'],
+                                  ['--stream', '-o', 'fractal.jpg'],
+                                  ['-o', 'missing/fractal.png']])
+def test_bad_outputs_are_usage_errors(argv, capsys, tmp_path, monkeypatch):
+    pytest.importorskip('PIL')
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit) as exit:
+        cli.parseArgs(argv)
+    assert exit.value.code == 2
+    assert 'usage:' in capsys.readouterr().err
+
+
+def test_failed_save_is_an_error(tmp_path, capsys):
+    pytest.importorskip('PIL')
+    #a directory where the image should go
+    path = tmp_path / 'taken.png'
+    path.mkdir()
+    assert cli.main(['--size', '8x6', '--maxiter', '1', '-q', '-o',
+                     str(path)]) == 2
+    assert capsys.readouterr().err.startswith('error: ')
+
+
+def test_render(tmp_path):
+    pytest.importorskip('PIL')
+    path = tmp_path / 'small.png'
+    assert cli.main(['--size', '80x60', '--scale', '20', '--maxiter', '1',
+                     '-q', '-o', str(path)]) == 0
+    assert path.stat().st_size > 0
+
+
+def test_workers_need_a_backend_which_takes_them(capsys):
+    assert cli.main(['--workers', '2', '--backend', 'numpy', '-q']) == 2
+    assert '--workers needs' in capsys.readouterr().err
+
+
+def test_jit_takes_workers(tmp_path):
+    pytest.importorskip('numpy')
+    pytest.importorskip('PIL')
+    path = tmp_path / 'small.png'
+    assert cli.main(['--size', '80x60', '--scale', '20', '--backend', 'jit',
+                     '--workers', '2', '-q', '-o', str(path)]) == 0
+    assert path.stat().st_size > 0
@@ -0,0 +1,78 @@
+#test_deepzoom.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Perturbation against the float kernel at moderate zooms, where doubles are
+still good enough, and against orbits iterated in Decimal at a depth where
+they are not.
+'''
+
+import decimal
+from decimal import Decimal
+
+import pytest
+
+import fractal
+from fractal import kernels
+from fractal.deepzoom import deepZoomCounts
+
+numpy = pytest.importorskip('numpy')
+
+#(center a, center b, scale, maxiter)
+MODERATE = [('0.745', '-0.113', '1e4', 300),
+            ('0.5', '0', '1e2', 100),
+            ('-0.25', '0.6', '1e3', 200)]
+
+#next to the point c = i of the boundary, far below the pixel spacing a
+#double can resolve there
+DEEP = ('0', '-1', '1e20', 1000)
+DEEP_PIXELS = [(0, 0), (3, 20), (16, 12), (31, 23), (25, 7)]
+
+WIDTH = 32
+HEIGHT = 24
+
+
+def decimalCount(centerA, centerB, scale, m, n, maxiter):
+    #the count of pixel (m, n), iterated directly in 60 digits
+    context = decimal.Context(prec=60)
+    a = context.add(Decimal(centerA),
+                    context.divide(Decimal(m - WIDTH//2), Decimal(scale)))
+    b = context.subtract(Decimal(centerB),
+                         context.divide(Decimal(n - HEIGHT//2), Decimal(scale)))
+    x = Decimal(0)
+    y = Decimal(0)
+    for counter in range(maxiter + 1):
+        x, y = (context.subtract(context.subtract(context.multiply(x, x),
+                                                  context.multiply(y, y)), a),
+                context.subtract(context.multiply(context.multiply(2, x), y),
+                                 b))
+        if context.add(context.multiply(x, x), context.multiply(y, y)) > 4:
+            return counter
+    return maxiter + 1
+
+
+@pytest.mark.parametrize('centerA, centerB, scale, maxiter', MODERATE)
+def test_moderate_zoom_matches_the_float_kernel(centerA, centerB, scale,
+                                                maxiter):
+    counts = deepZoomCounts(centerA, centerB, scale, WIDTH, HEIGHT,
+                            maxiter=maxiter)
+    scale = float(scale)
+    viewport = fractal.Viewport(WIDTH, HEIGHT,
+                                float(centerA) - (WIDTH//2)/scale,
+                                float(centerB) + (HEIGHT//2)/scale, scale)
+    assert (counts == kernels.numpyCounts(viewport, maxiter=maxiter)).all()
+
+
+def test_deep_zoom_matches_decimal_orbits():
+    centerA, centerB, scale, maxiter = DEEP
+    stats = {}
+    counts = deepZoomCounts(centerA, centerB, scale, WIDTH, HEIGHT,
+                            maxiter=maxiter, stats=stats)
+    for m, n in DEEP_PIXELS:
+        assert counts[n, m] == decimalCount(centerA, centerB, scale, m, n,
+                                            maxiter)
+    #the view has structure, which plain doubles could not show
+    assert len(numpy.unique(counts)) > 10
+    #orbits passing near 0 had to be rebased onto the reference
+    assert stats['rebases'] > 0
@@ -0,0 +1,51 @@
+#test_imports.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Importing the package stays light: none of the GUI, sound or process pool
+modules, and none of the lazily registered backends, are loaded until they
+are used.
+'''
+
+import os
+import subprocess
+import sys
+
+from fractal import benchmark, kernels
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = '''
+import sys
+import fractal
+print(' '.join(sorted(sys.modules)))
+'''
+
+
+def loadedModules(script):
+    #names in sys.modules after running script in a fresh interpreter
+    environment = dict(os.environ)
+    environment.pop('FRACTAL_BACKEND', None)
+    environment.pop('FRACTAL_PROFILE', None)
+    output = subprocess.check_output([sys.executable, '-c', script], cwd=ROOT,
+                                     env=environment)
+    return set(output.decode('ascii').split())
+
+
+def test_import_loads_no_heavy_modules():
+    loaded = loadedModules(SCRIPT)
+    assert 'fractal' in loaded
+    assert not loaded.intersection(benchmark.HEAVY_MODULES)
+    assert 'numba' not in loaded
+    for module in kernels.LAZY_BACKENDS.values():
+        assert 'fractal.' + module not in loaded
+
+
+def test_backends_are_loaded_when_asked_for():
+    loaded = loadedModules(SCRIPT + '''
+from fractal import kernels
+kernels.countBackend('parallel')
+print(' '.join(sorted(sys.modules)))
+''')
+    assert 'fractal.parallel' in loaded
@@ -0,0 +1,111 @@
+#test_instrument.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Stage timers and counters: the totals a render reports while instrumentation
+is on, and nothing at all while it is off.
+'''
+
+import json
+
+import pytest
+
+import fractal
+from fractal import instrument
+from fractal.cache import TileCache
+
+VIEWPORT = fractal.Viewport(48, 36, scale=12.0)
+
+
+@pytest.fixture
+def enabled():
+    #instrumentation on with fresh totals, and back as it was afterwards
+    previous = instrument.recorder
+    instrument.recorder = None
+    yield instrument.enable()
+    instrument.recorder = previous
+
+
+@pytest.fixture
+def disabled():
+    previous = instrument.recorder
+    instrument.disable()
+    yield
+    instrument.recorder = previous
+
+
+def test_disabled_records_nothing(disabled):
+    assert not instrument.enabled()
+    assert instrument.stage('compute') is instrument.NULL_STAGE
+    with instrument.stage('compute', pixels=1) as timing:
+        assert not timing.active
+        timing.count(pixels=1)
+    instrument.record('tile', 1.0, pixels=1)
+    instrument.count(cacheHits=1)
+    fractal.computeFrame(VIEWPORT, maxiter=20)
+    assert instrument.snapshot() == {'stages': {}, 'counters': {}}
+
+
+def test_compute_and_color_totals(enabled):
+    pytest.importorskip('PIL')
+    frame = fractal.computeFrame(VIEWPORT, maxiter=20, backend='python')
+    frame.image()
+    frame = fractal.computeFrame(VIEWPORT, maxiter=20, backend='python')
+    totals = instrument.snapshot()
+    assert totals['stages']['compute']['calls'] == 2
+    assert totals['stages']['color']['calls'] == 1
+    compute = totals['stages']['compute']
+    assert 0.0 <= compute['max'] <= compute['seconds']
+    counters = totals['counters']
+    assert counters['pixels'] == 2*VIEWPORT.pixels
+    assert counters['iterations'] == 2*frame.iterations()
+    assert counters['escaped'] + counters['interior'] == 2*VIEWPORT.pixels
+    assert 0 < counters['interior'] < VIEWPORT.pixels*2
+
+
+def test_stages_counters_and_callbacks(enabled):
+    seen = []
+
+    def callback(name, seconds, counters):
+        seen.append((name, dict(counters)))
+
+    instrument.addCallback(callback)
+    with instrument.stage('encode', rows=2) as timing:
+        assert timing.active
+        timing.count(rows=3)
+    instrument.record('tile', 0.5, pixels=10)
+    instrument.record('tile', 0.25, pixels=5)
+    instrument.count(cacheHits=2)
+    instrument.removeCallback(callback)
+    instrument.record('tile', 0.125)
+
+    assert seen == [('encode', {'rows': 5}), ('tile', {'pixels': 10}),
+                    ('tile', {'pixels': 5})]
+    totals = instrument.snapshot()
+    assert totals['stages']['tile'] == {'calls': 3, 'seconds': 0.875,
+                                        'max': 0.5}
+    assert totals['counters'] == {'rows': 5, 'pixels': 15, 'cacheHits': 2}
+    assert 'tile' in instrument.formatSnapshot()
+    instrument.reset()
+    assert instrument.snapshot() == {'stages': {}, 'counters': {}}
+
+
+def test_cache_counts_hits_and_misses(enabled):
+    pytest.importorskip('numpy')
+    cache = TileCache(tileSize=16)
+    cache.frame(VIEWPORT, maxiter=20)
+    cache.frame(VIEWPORT, maxiter=20)
+    totals = instrument.snapshot()
+    #three columns by three rows of tiles, computed once and then found
+    assert totals['counters']['cacheMisses'] == 9
+    assert totals['counters']['cacheHits'] == 9
+    assert totals['stages']['cacheFill']['calls'] == 9
+
+
+def test_dump_writes_the_snapshot(enabled, tmp_path):
+    instrument.record('save', 0.5, bytes=100)
+    path = tmp_path / 'timings.json'
+    instrument.dump(str(path))
+    with open(str(path)) as source:
+        assert json.load(source) == instrument.snapshot()
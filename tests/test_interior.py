@@ -0,0 +1,41 @@
+#test_interior.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+The cardioid and bulb test only skips iterations: counts with it on are the
+counts with it off, in the numpy and python kernels alike.
+'''
+
+import pytest
+
+import fractal
+from fractal import kernels
+
+numpy = pytest.importorskip('numpy')
+
+#views taking in the main cardioid, the period-2 bulb and the boundary
+#between them
+VIEWPORTS = [fractal.Viewport(48, 36, scale=12.0),
+             fractal.Viewport.centered(0.75, 0.0, 0.2, 48, 36),
+             fractal.Viewport.centered(-0.25, 0.0, 0.05, 48, 36)]
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'python'])
+@pytest.mark.parametrize('viewport', VIEWPORTS)
+def test_interior_test_keeps_the_counts(viewport, backend):
+    count = kernels.countBackend(backend)
+    tested = numpy.asarray(count(viewport, 'mandelbrot', 0.0, 0.0, 500))
+    iterated = numpy.asarray(count(viewport, 'mandelbrot', 0.0, 0.0, 500,
+                                   interiorTest=False))
+    assert (tested == iterated).all()
+    #the view does reach the bulbs, or the test would prove nothing
+    assert (tested == 501).any()
+
+
+def test_interior_test_ignores_julia_sets():
+    viewport = fractal.Viewport(48, 36, scale=12.0)
+    tested = kernels.numpyCounts(viewport, 'julia', 0.123, -0.745, 200)
+    iterated = kernels.numpyCounts(viewport, 'julia', 0.123, -0.745, 200,
+                                   interiorTest=False)
+    assert (tested == iterated).all()
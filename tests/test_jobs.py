@@ -0,0 +1,127 @@
+#test_jobs.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Render jobs: a new request supersedes the old one, cancellation takes effect
+between tiles, and a finished job is seen the same way through wait(),
+asyncioFuture() and its done callbacks.
+'''
+
+import threading
+
+import pytest
+
+import fractal
+from fractal import kernels
+from fractal.cache import TileCache
+from fractal.jobs import (CANCELLED, DONE, JobCancelled, RenderJob,
+                          RenderJobs)
+
+numpy = pytest.importorskip('numpy')
+
+#four tiles of 32 x 32
+VIEWPORT = fractal.Viewport(64, 64, scale=20.0)
+
+
+def newJob(onUpdate=None):
+    return RenderJob(1, TileCache(tileSize=32), VIEWPORT, maxiter=20,
+                     onUpdate=onUpdate)
+
+
+def test_job_renders_the_viewport():
+    job = newJob()
+    job.run()
+    assert job.state == DONE
+    assert job.progress == 1.0
+    assert (job.wait().counts == kernels.numpyCounts(VIEWPORT,
+                                                     maxiter=20)).all()
+
+
+def test_cancel_stops_between_tiles():
+    boxes = []
+
+    def onUpdate(job):
+        boxes.append(job.dirty)
+        if job.progress > 0.0:
+            job.cancel()
+
+    job = newJob(onUpdate)
+    job.run()
+    assert job.state == CANCELLED
+    #the preview and one tile were shown, then the job stopped
+    assert len(boxes) == 2
+    assert job.progress == 0.25
+    with pytest.raises(JobCancelled):
+        job.wait()
+
+
+def test_cancelled_job_never_starts():
+    updates = []
+    job = newJob(updates.append)
+    job.cancel()
+    job.run()
+    assert job.state == CANCELLED
+    assert job.frame is None
+    assert updates == []
+
+
+def test_submit_supersedes_the_running_job():
+    started = threading.Event()
+    proceed = threading.Event()
+
+    def onUpdate(job):
+        if job.id == 1:
+            started.set()
+            proceed.wait(10)
+
+    jobs = RenderJobs(TileCache(tileSize=32), onUpdate)
+    first = jobs.submit(VIEWPORT, maxiter=20)
+    assert started.wait(10)
+    second = jobs.submit(VIEWPORT, maxiter=30)
+    assert first.cancelRequested
+    assert not jobs.isCurrent(first)
+    assert jobs.isCurrent(second)
+    proceed.set()
+    with pytest.raises(JobCancelled):
+        first.wait(10)
+    assert first.progress < 1.0
+    frame = second.wait(10)
+    assert (frame.counts == kernels.numpyCounts(VIEWPORT, maxiter=30)).all()
+
+
+def test_done_callbacks_and_asyncio_future():
+    asyncio = pytest.importorskip('asyncio')
+    finished = []
+    job = newJob()
+    job.addDoneCallback(finished.append)
+    loop = asyncio.new_event_loop()
+    try:
+        future = job.asyncioFuture(loop)
+        thread = threading.Thread(target=job.run)
+        thread.start()
+        frame = loop.run_until_complete(future)
+        thread.join()
+    finally:
+        loop.close()
+    assert finished == [job]
+    assert frame is job.wait()
+    #a callback added afterwards runs at once
+    job.addDoneCallback(finished.append)
+    assert finished == [job, job]
+
+
+def test_cancelling_the_future_cancels_the_job():
+    asyncio = pytest.importorskip('asyncio')
+    job = newJob()
+    loop = asyncio.new_event_loop()
+    try:
+        future = job.asyncioFuture(loop)
+        future.cancel()
+        loop.run_until_complete(asyncio.sleep(0))
+    finally:
+        loop.close()
+    assert job.cancelRequested
+    assert job.state == CANCELLED
+    job.run()
+    assert job.frame is None
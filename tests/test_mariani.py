@@ -0,0 +1,78 @@
+#test_mariani.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+The mariani backend against a full render with the numpy kernel, on views
+where filling on equal border counts alone left escaped pixels interior, on
+zoomed views of the boundary, and with the kernel options.
+'''
+
+import pytest
+
+import fractal
+from fractal import kernels
+
+numpy = pytest.importorskip('numpy')
+
+#(kind, c, center a, center b, span, maxiter)
+VIEWS = [('mandelbrot', (0.0, 0.0), 0.5, 0.0, 4.0, 20),
+         ('mandelbrot', (0.0, 0.0), 0.5, 0.0, 4.0, 500),
+         ('mandelbrot', (0.0, 0.0), 0.4208551189, 0.7852880791, 1.2734418, 100),
+         ('mandelbrot', (0.0, 0.0), -0.0980712624, -0.5385245401, 1.2399892,
+          500),
+         ('mandelbrot', (0.0, 0.0), 0.4758374227, -0.2634934730, 1.8293783,
+          100),
+         ('mandelbrot', (0.0, 0.0), 0.1, 0.65, 0.3, 1000),
+         ('julia', (0.8, 0.12), 0.0, 0.0, 3.0, 200),
+         ('julia', (0.123, -0.745), 0.1, 0.3, 0.2, 500),
+         #a filament slipped between the border samples and the ring of
+         #pixels around them
+         ('mandelbrot', (0.0, 0.0), 1.2420462434716364, 0.06078471159727594,
+          0.19227121870110445, 1000)]
+
+#zoomed views of the boundary: (center a, center b, span, maxiter)
+ZOOMS = [(0.745, -0.113, 0.02, 1000),
+         (0.7436438870, -0.1318259042, 1e-4, 2000),
+         (1.7685, -0.0012, 1e-3, 1000),
+         (0.1011, -0.9563, 1e-5, 3000),
+         (-0.2501, 0.0, 1e-6, 5000)]
+
+
+@pytest.mark.parametrize('kind, c, a, b, span, maxiter', VIEWS)
+def test_mariani_matches_numpy(kind, c, a, b, span, maxiter):
+    viewport = fractal.Viewport.centered(a, b, span, 200, 150)
+    expected = kernels.numpyCounts(viewport, kind, c[0], c[1], maxiter)
+    counts = kernels.countBackend('mariani')(viewport, kind, c[0], c[1],
+                                             maxiter)
+    assert (counts == expected).all()
+
+
+def test_mariani_fills_the_outer_bands_and_the_cardioid():
+    viewport = fractal.Viewport(800, 600)
+    stats = {}
+    kernels.countBackend('mariani')(viewport, 'mandelbrot', 0.0, 0.0, 500,
+                                    stats=stats)
+    assert stats['evaluated'] < viewport.pixels//2
+
+
+@pytest.mark.parametrize('a, b, span, maxiter', ZOOMS)
+def test_mariani_matches_numpy_on_zoomed_boundary(a, b, span, maxiter):
+    viewport = fractal.Viewport.centered(a, b, span, 160, 120)
+    expected = kernels.numpyCounts(viewport, 'mandelbrot', 0.0, 0.0, maxiter)
+    counts = kernels.countBackend('mariani')(viewport, 'mandelbrot', 0.0, 0.0,
+                                             maxiter)
+    assert (counts == expected).all()
+
+
+@pytest.mark.parametrize('options', [{'interiorTest': False},
+                                     {'periodicity': True},
+                                     {'interiorTest': False,
+                                      'periodicity': True}])
+def test_mariani_matches_numpy_with_options(options):
+    viewport = fractal.Viewport.centered(0.5, 0.0, 4.0, 200, 150)
+    expected = kernels.numpyCounts(viewport, 'mandelbrot', 0.0, 0.0, 200,
+                                   **options)
+    counts = kernels.countBackend('mariani')(viewport, 'mandelbrot', 0.0, 0.0,
+                                             200, **options)
+    assert (counts == expected).all()
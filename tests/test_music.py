@@ -0,0 +1,159 @@
+#test_music.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+noteSequence() against the loop mandel_music.py used to run, which kept
+iterating after an escape until the orbit overflowed; and Player, through
+an output which only records what it is given.
+'''
+
+import time
+from array import array
+
+import pytest
+
+import fractal
+from fractal import kernels
+from fractal.music import NoteSequence, Player, toneSamples
+
+
+def scriptNotes(viewport, maxarray):
+    #the old Mandelbrot() loop of mandel_music.py, on any viewport
+    frequencyarray = []
+    for m in range(viewport.width):
+        a = viewport.aValue(m)
+        for n in range(viewport.height):
+            b = viewport.bValue(n)
+            x = 0.0
+            y = 0.0
+            counter = 0
+            while (counter <= 20):
+                x_new = x*x - y*y - a
+                y_new = 2.00*x*y - b
+                mzsq = x_new*x_new + y_new*y_new
+                if mzsq>4.0 and 16 <= counter <= 17:
+                    if len(frequencyarray) < maxarray:
+                        frequencyarray.append(2*329.6276)#E5
+                elif mzsq>4.0 and 18 <= counter <= 20:
+                    if len(frequencyarray) < maxarray:
+                        frequencyarray.append(2*261.6256)#c5
+                x = x_new
+                y = y_new
+                counter = counter + 1
+    return list(array('f', frequencyarray))
+
+
+#the default window at a tenth of the resolution, and a view of the boundary
+VIEWPORTS = [fractal.Viewport(80, 60, scale=20.0),
+             fractal.Viewport.centered(0.75, 0.1, 0.5, 64, 48)]
+
+
+@pytest.mark.parametrize('viewport', VIEWPORTS)
+@pytest.mark.parametrize('limit', [500000, 100])
+def test_notes_match_script(viewport, limit):
+    expected = scriptNotes(viewport, limit)
+    frame = fractal.computeFrame(viewport, backend='python')
+    assert list(fractal.noteSequence(frame, limit=limit)) == expected
+    if kernels.numpy is not None:
+        frame = fractal.computeFrame(viewport, backend='numpy')
+        notes = fractal.noteSequence(frame, limit=limit)
+        assert list(notes) == expected
+        assert len(notes) == len(expected)
+
+
+class FakeOutput(object):
+    #an output playing nothing: chunks stay pending until finish()
+
+    def __init__(self):
+        self.chunks = []
+        self.played = []
+        self.stops = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+
+    def pending(self):
+        return len(self.chunks)
+
+    def stop(self):
+        self.stops = self.stops + 1
+        self.chunks = []
+
+    def finish(self):
+        self.played.append(self.chunks.pop(0))
+
+
+#five A4 and three A5, as tones of four samples
+NOTES = NoteSequence(array('f', [440.0, 880.0]), array('I', [5, 3]))
+SAMPLES = 4
+
+
+def newPlayer(output):
+    return Player(NOTES, output, noteSamples=SAMPLES, chunkNotes=2, ahead=2)
+
+
+def pumpUntilPending(player, output, timeout=10.0):
+    #pump until the producer thread has handed the output a chunk
+    deadline = time.time() + timeout
+    while not output.pending():
+        assert player.pump()
+        assert time.time() < deadline
+        time.sleep(0.001)
+
+
+def playToEnd(player, output, timeout=10.0):
+    deadline = time.time() + timeout
+    while player.pump():
+        if output.pending():
+            output.finish()
+        assert time.time() < deadline
+        time.sleep(0.001)
+    return b''.join(output.played)
+
+
+def tones(*notes):
+    return b''.join(toneSamples(frequency, SAMPLES) for frequency in notes)
+
+
+def test_player_plays_every_note_in_chunks():
+    output = FakeOutput()
+    player = newPlayer(output)
+    player.play()
+    assert playToEnd(player, output) == tones(*list(NOTES))
+    assert all(len(chunk) <= 2*len(tones(440.0)) for chunk in output.played)
+    assert not player.playing()
+    assert player.position() == len(NOTES)
+
+
+def test_stop_silences_the_output_at_once():
+    output = FakeOutput()
+    player = newPlayer(output)
+    player.play()
+    pumpUntilPending(player, output)
+    stops = output.stops
+    player.stop()
+    assert output.stops == stops + 1
+    assert output.pending() == 0
+    assert not player.playing()
+    assert not player.pump()
+    assert output.played == []
+
+
+def test_seek_restarts_from_the_note():
+    output = FakeOutput()
+    player = newPlayer(output)
+    player.play()
+    pumpUntilPending(player, output)
+    output.finish()
+    assert output.played == [tones(440.0, 440.0)]
+    output.played = []
+    player.seek(6)
+    assert output.pending() == 0
+    pumpUntilPending(player, output)
+    assert player.position() == 6
+    assert playToEnd(player, output) == tones(880.0, 880.0)
+    #past the end plays nothing
+    output.played = []
+    player.seek(100)
+    assert playToEnd(player, output) == b''
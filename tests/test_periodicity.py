@@ -0,0 +1,42 @@
+#test_periodicity.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+The periodicity check only saves iterations: counts with it on are the counts
+with it off, in the numpy and python kernels alike, and both report the same
+savings.
+'''
+
+import pytest
+
+import fractal
+from fractal import kernels
+
+numpy = pytest.importorskip('numpy')
+
+#name: (viewport, kind, c)
+VIEWS = {'default': (fractal.Viewport(48, 36, scale=12.0), 'mandelbrot',
+                     (0.0, 0.0)),
+         'bulbs': (fractal.Viewport.centered(0.1, 0.75, 0.5, 48, 36),
+                   'mandelbrot', (0.0, 0.0)),
+         'julia': (fractal.Viewport(48, 36, scale=12.0), 'julia',
+                   (0.123, -0.745))}
+
+
+@pytest.mark.parametrize('maxiter', [200, 2000])
+@pytest.mark.parametrize('view', sorted(VIEWS))
+def test_periodicity_keeps_the_counts(view, maxiter):
+    viewport, kind, c = VIEWS[view]
+    saved = []
+    for backend in ('numpy', 'python'):
+        count = kernels.countBackend(backend)
+        stats = {}
+        checked = count(viewport, kind, c[0], c[1], maxiter, periodicity=True,
+                        stats=stats)
+        plain = count(viewport, kind, c[0], c[1], maxiter)
+        assert (numpy.asarray(checked) == numpy.asarray(plain)).all()
+        assert stats['periodicPixels'] > 0
+        assert stats['iterationsSaved'] >= stats['periodicPixels']
+        saved.append(stats)
+    assert saved[0] == saved[1]
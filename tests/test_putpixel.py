@@ -0,0 +1,86 @@
+#test_putpixel.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+The original putpixel loop against the first-escape coloring of the engine.
+The old loop repaints a pixel at every iteration until its orbit overflows
+to nan, so it shows the band of the last iteration painted; the two pictures
+agree exactly where that is the band of the first escape.
+'''
+
+import pytest
+
+import fractal
+from fractal import kernels
+from fractal.render import Frame
+
+numpy = pytest.importorskip('numpy')
+pytest.importorskip('PIL')
+
+#the default window at a tenth of the size
+VIEWPORT = fractal.Viewport(80, 60, scale=20.0)
+MAXITER = 20
+
+
+def lastPainted(a, b, maxiter):
+    #counter of the putpixel loop's last paint of the pixel for c = (a, b),
+    #or maxiter + 1 if that paint was black
+    x = 0.0
+    y = 0.0
+    last = maxiter + 1
+    for counter in range(maxiter + 1):
+        x, y = x*x - y*y - a, 2.00*x*y - b
+        mzsq = x*x + y*y
+        if mzsq > 4.0 and counter <= 20:
+            last = counter
+        elif mzsq <= 4.0:
+            last = maxiter + 1
+    return last
+
+
+def repaintedCounts(viewport, maxiter):
+    return numpy.array([[lastPainted(float(viewport.aValue(m)),
+                                     float(viewport.bValue(n)), maxiter)
+                         for m in range(viewport.width)]
+                        for n in range(viewport.height)])
+
+
+def pixels(image):
+    return numpy.asarray(image, dtype=numpy.uint8)
+
+
+def test_putpixel_shows_the_band_of_the_last_paint():
+    repainted = Frame(repaintedCounts(VIEWPORT, MAXITER), VIEWPORT, MAXITER)
+    old = pixels(kernels.putpixelImage(VIEWPORT, maxiter=MAXITER))
+    assert (old == pixels(repainted.image())).all()
+
+
+def test_first_escape_differs_only_by_the_repaint():
+    frame = fractal.computeFrame(VIEWPORT, maxiter=MAXITER)
+    new = pixels(frame.image())
+    old = pixels(kernels.putpixelImage(VIEWPORT, maxiter=MAXITER))
+    repainted = Frame(repaintedCounts(VIEWPORT, MAXITER), VIEWPORT, MAXITER)
+    #pixels whose orbit overflows within the band of its first escape
+    sameBand = (pixels(repainted.image()) == new).all(2)
+    assert (old[sameBand] == new[sameBand]).all()
+    assert (old[~sameBand] != new[~sameBand]).any(1).all()
+    #the repaint only happens after the escape, never before it
+    counts = numpy.asarray(frame.counts).reshape(VIEWPORT.height,
+                                                 VIEWPORT.width)
+    assert (repaintedCounts(VIEWPORT, MAXITER) >= counts).all()
+    assert 0 < numpy.count_nonzero(~sameBand) < VIEWPORT.pixels
+
+
+def test_python_backend_differs_only_by_the_repaint():
+    frame = fractal.computeFrame(VIEWPORT, maxiter=MAXITER, backend='python')
+    counts = numpy.asarray(frame.counts).reshape(VIEWPORT.height,
+                                                 VIEWPORT.width)
+    repainted = repaintedCounts(VIEWPORT, MAXITER)
+    differs = (pixels(kernels.putpixelImage(VIEWPORT, maxiter=MAXITER))
+               != pixels(frame.image())).any(2)
+    #where the last paint was the escape itself the pictures agree, and
+    #every pixel that differs was painted again later
+    assert not differs[repainted == counts].any()
+    assert (repainted[differs] > counts[differs]).all()
+    assert differs.any()
@@ -0,0 +1,55 @@
+#test_symmetry.py
+#Jack Foust
+#foustja@gmail.com
+
+'''
+Mirroring is opt-in, so that a frame does not depend on how it is tiled.
+'''
+
+import pytest
+
+import fractal
+from fractal import kernels
+
+numpy = pytest.importorskip('numpy')
+
+
+def test_default_frame_is_a_full_render():
+    viewport = fractal.Viewport(800, 600)
+    frame = fractal.computeFrame(viewport, maxiter=20)
+    assert 'mirroredPixels' not in frame.stats
+    assert (frame.counts == kernels.numpyCounts(viewport, maxiter=20)).all()
+
+
+def test_strips_match_the_whole_frame(tmp_path):
+    viewport = fractal.Viewport(800, 600)
+    frame = fractal.computeFrame(viewport, maxiter=20)
+    path = str(tmp_path / 'default')
+    fractal.renderToFile(path, viewport, maxiter=20, stripRows=64)
+    assert (fractal.loadFrame(path).counts == frame.counts).all()
+
+
+def test_symmetry_mirrors_when_asked():
+    viewport = fractal.Viewport(800, 600)
+    frame = fractal.computeFrame(viewport, maxiter=20, symmetry=True)
+    assert frame.stats['mirroredPixels'] == 299*800
+    #row 300 is the axis
+    assert (frame.counts[301:] == frame.counts[299:0:-1]).all()
+
+
+@pytest.mark.parametrize('kind, c', [('mandelbrot', (0.0, 0.0)),
+                                     ('julia', (0.8, 0.12))])
+def test_symmetry_mirrors_magnitudes(kind, c):
+    viewport = fractal.Viewport(800, 600)
+    frame = fractal.computeFrame(viewport, kind, c, 50, symmetry=True,
+                                 magnitudes=True)
+    assert frame.stats['mirroredPixels'] > 0
+    full = fractal.computeFrame(viewport, kind, c, 50, magnitudes=True)
+    same = frame.counts == full.counts
+    #a few boundary pixels may differ, as for the counts alone
+    assert numpy.count_nonzero(~same) <= 2
+    #and the mirrored coordinates differ in the last bit
+    assert numpy.allclose(frame.magnitudes[same], full.magnitudes[same],
+                          rtol=1e-6)
+    if kind == 'mandelbrot':
+        assert (frame.magnitudes[301:] == frame.magnitudes[299:0:-1]).all()